@@ -0,0 +1,355 @@
+# api.py — headless JSON API over the backend (ASGI, FastAPI)
+#
+# Run:
+#     python api.py --workers 4 --port 8000
+#     uvicorn api:app --workers 4 --port 8000
+#
+# Each uvicorn worker is a separate process with its own connection pool and
+# caches, so throughput scales with cores. Inside a worker the event loop
+# never blocks: SQLite calls run on a bounded thread pool (DB_THREADS),
+# text analysis on a small CPU thread pool, and ReportLab rendering on a
+# process pool (PDF_PROCESSES), so a slow PDF never stalls cheap requests.
+# Every pool also has a cap on queued requests; past it the API answers 503
+# instead of queueing without bound.
+#
+# Everything except /health, /login and /metrics needs a bearer token from
+# POST /login (the same accounts as the Streamlit app). History is limited to
+# the caller's own username; admins (HEALTHCARE_ADMINS, as in app.py) may read
+# and write any user's, and only admins may bulk export or import (history
+# and appointments; users only through the bulk_io CLI). Tokens are
+# HMAC-signed with HEALTHCARE_API_SECRET, which every worker must share:
+# `python api.py` generates one for its workers if it is unset, while a bare
+# `uvicorn api:app` refuses to start without it.
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
+
+DB_THREADS = int(os.environ.get("API_DB_THREADS", 8))
+CPU_THREADS = int(os.environ.get("API_CPU_THREADS", 2))
+PDF_PROCESSES = int(os.environ.get("API_PDF_PROCESSES", 1))
+QUEUE_FACTOR = 4            # requests allowed to wait per pool slot before 503
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+TOKEN_TTL = int(os.environ.get("API_TOKEN_TTL", 8 * 3600))     # seconds
+SECRET_ENV = "HEALTHCARE_API_SECRET"
+ADMIN_USERS = {u.strip() for u in os.environ.get("HEALTHCARE_ADMINS", "").split(",") if u.strip()}
+
+
+# -------------------------------------------------------
+# BOUNDED POOLS
+# -------------------------------------------------------
+class BoundedPool:
+    def __init__(self, executor, slots, name):
+        self.executor = executor
+        self.name = name
+        self._slots = asyncio.Semaphore(slots * QUEUE_FACTOR)
+
+    async def run(self, fn, *args):
+        if self._slots.locked():
+            raise HTTPException(503, f"{self.name} pool is saturated, retry shortly")
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+
+pools = {}
+
+
+def _warm_pdf_worker():
+    # import ReportLab and build the shared styles once per process
+    from backend.pdf_module import get_styles
+    get_styles()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    from backend.database import ensure_db
+
+    if not os.environ.get(SECRET_ENV):
+        raise RuntimeError(f"set {SECRET_ENV} (shared by every worker) to sign API tokens")
+    ensure_db()     # schema check once per worker, before the first request
+    pools["db"] = BoundedPool(ThreadPoolExecutor(DB_THREADS, thread_name_prefix="api-db"), DB_THREADS, "database")
+    pools["cpu"] = BoundedPool(ThreadPoolExecutor(CPU_THREADS, thread_name_prefix="api-cpu"), CPU_THREADS, "analysis")
+    pools["pdf"] = BoundedPool(ProcessPoolExecutor(PDF_PROCESSES, initializer=_warm_pdf_worker), PDF_PROCESSES, "pdf")
+    try:
+        yield
+    finally:
+        for pool in pools.values():
+            pool.executor.shutdown(wait=False, cancel_futures=True)
+        pools.clear()
+
+
+app = FastAPI(title="Telemed Unified AI Assistant API", lifespan=lifespan)
+
+
+# -------------------------------------------------------
+# AUTH
+# -------------------------------------------------------
+def _sign(payload):
+    return hmac.new(os.environ[SECRET_ENV].encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_token(username, ttl=TOKEN_TTL):
+    """Signed "<base64 username>.<expiry>.<hmac>" bearer token."""
+    name = base64.urlsafe_b64encode(username.encode()).decode()
+    payload = f"{name}.{int(time.time()) + ttl}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token):
+    """Username the token was issued to, or None if it is forged, malformed or expired."""
+    try:
+        name, expires, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(f"{name}.{expires}")) or int(expires) < time.time():
+            return None
+        return base64.urlsafe_b64decode(name.encode()).decode()
+    except (ValueError, KeyError):
+        return None
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> str:
+    username = verify_token(credentials.credentials) if credentials else None
+    if username is None:
+        raise HTTPException(401, "Log in first (POST /login).", headers={"WWW-Authenticate": "Bearer"})
+    return username
+
+
+def admin_user(username: str = Depends(current_user)) -> str:
+    if username not in ADMIN_USERS:
+        raise HTTPException(403, "Admins only.")
+    return username
+
+
+def _check_owner(caller, username):
+    if caller != username and caller not in ADMIN_USERS:
+        raise HTTPException(403, "You can only access your own history.")
+
+
+# -------------------------------------------------------
+# REQUEST BODIES
+# -------------------------------------------------------
+class LoginIn(BaseModel):
+    username: str
+    password: str
+
+
+class TextIn(BaseModel):
+    text: str
+
+
+class AppointmentIn(BaseModel):
+    name: str
+    date: str
+    time: str
+    notes: str = ""
+    duration_min: int = 30
+
+
+class HistoryIn(BaseModel):
+    username: str
+    event_type: str
+    content: str
+
+
+class ReportIn(BaseModel):
+    patient: str
+    text: str
+
+
+class PrescriptionIn(BaseModel):
+    patient: str
+    doctor: str
+    symptoms: str = ""
+    diagnosis: str = ""
+    medicines: List[str] = []
+
+
+def _limit(limit):
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+# -------------------------------------------------------
+# ANALYSIS
+# -------------------------------------------------------
+@app.get("/health")
+async def health():
+    return {"status": "ok", "pid": os.getpid()}
+
+
+@app.post("/login")
+async def login(body: LoginIn):
+    from backend.database import validate_user
+
+    if not await pools["db"].run(validate_user, body.username, body.password):
+        raise HTTPException(401, "Invalid username or password.")
+    return {"access_token": issue_token(body.username), "token_type": "bearer", "expires_in": TOKEN_TTL}
+
+
+@app.post("/symptoms", dependencies=[Depends(current_user)])
+async def symptoms(body: TextIn):
+    from backend.ai_model import analyze_symptoms
+    return {"result": await pools["cpu"].run(analyze_symptoms, body.text or "no symptoms")}
+
+
+@app.post("/mood", dependencies=[Depends(current_user)])
+async def mood(body: TextIn):
+    from backend.ai_model import analyze_mood
+    return {"result": await pools["cpu"].run(analyze_mood, body.text or "no input")}
+
+
+@app.post("/chat-prescription", dependencies=[Depends(current_user)])
+async def chat_prescription(body: TextIn):
+    from backend.chat_prescription_ai import chat_to_prescription
+    return await pools["cpu"].run(chat_to_prescription, body.text)
+
+
+# -------------------------------------------------------
+# APPOINTMENTS
+# -------------------------------------------------------
+@app.post("/appointments", status_code=201, dependencies=[Depends(current_user)])
+async def create_appointment(body: AppointmentIn):
+    from backend.appointments import BOOKED, INVALID, OVERLAP, save_appointment
+
+    booking = await pools["db"].run(save_appointment, body.name, body.date, body.time, body.notes, body.duration_min)
+    if booking.reason == INVALID:
+        raise HTTPException(422, booking.detail)
+    if booking.reason == OVERLAP:
+        raise HTTPException(409, f"That time slot overlaps an existing appointment ({booking.detail}).")
+    if booking.reason != BOOKED:
+        raise HTTPException(503, "The appointment could not be saved, retry shortly.")
+    return {"id": booking.id}
+
+
+@app.get("/appointments", dependencies=[Depends(current_user)])
+async def list_appointments(start: Optional[str] = None, end: Optional[str] = None,
+                            limit: int = PAGE_SIZE, cursor: Optional[str] = None):
+    from backend.appointments import get_appointments, next_appointment_cursor
+
+    limit = _limit(limit)
+    rows = await pools["db"].run(get_appointments, start, end, limit, cursor)
+    return {"rows": rows, "next_cursor": next_appointment_cursor(rows, limit)}
+
+
+# -------------------------------------------------------
+# HISTORY
+# -------------------------------------------------------
+@app.post("/history", status_code=201)
+async def create_history(body: HistoryIn, caller: str = Depends(current_user)):
+    from backend.database import add_history
+
+    _check_owner(caller, body.username)
+    if not await pools["db"].run(add_history, body.username, body.event_type, body.content):
+        raise HTTPException(500, "Could not save history.")
+    return {"ok": True}
+
+
+@app.get("/history/{username}")
+async def list_history(username: str, limit: int = PAGE_SIZE, before: Optional[str] = None,
+                       event_type: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                       caller: str = Depends(current_user)):
+    from backend.database import get_history, next_history_cursor
+
+    _check_owner(caller, username)
+    limit = _limit(limit)
+    rows = await pools["db"].run(get_history, username, limit, before, event_type, start, end)
+    return {"rows": rows, "next_cursor": next_history_cursor(rows, limit)}
+
+
+# -------------------------------------------------------
+# PDF GENERATION
+# -------------------------------------------------------
+def _report_pdf(patient, text):
+    from backend.pdf_module import generate_pdf
+    return generate_pdf(patient, text)
+
+
+def _prescription_pdf(patient, doctor, symptoms, diagnosis, medicines):
+    from backend.pdf_module import generate_prescription_pdf
+    return generate_prescription_pdf(patient, doctor, symptoms, diagnosis, medicines)
+
+
+@app.post("/pdf/report", dependencies=[Depends(current_user)])
+async def report_pdf(body: ReportIn):
+    pdf = await pools["pdf"].run(_report_pdf, body.patient, body.text)
+    return Response(pdf, media_type="application/pdf")
+
+
+@app.post("/pdf/prescription", dependencies=[Depends(current_user)])
+async def prescription_pdf(body: PrescriptionIn):
+    pdf = await pools["pdf"].run(_prescription_pdf, body.patient, body.doctor, body.symptoms, body.diagnosis, body.medicines)
+    return Response(pdf, media_type="application/pdf")
+
+
+# -------------------------------------------------------
+# BULK IMPORT / EXPORT
+# -------------------------------------------------------
+# admins only; users (password hashes) stay CLI-only: python -m backend.bulk_io
+BULK_TABLES = ("history", "appointments")
+BULK_MEDIA = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+
+@app.get("/export/{table}", dependencies=[Depends(admin_user)])
+async def export_table(table: str, format: str = "jsonl", start: Optional[str] = None, end: Optional[str] = None):
+    from backend.bulk_io import export_lines
+
+    if table not in BULK_TABLES or format not in BULK_MEDIA:
+        raise HTTPException(404, f"export one of {', '.join(BULK_TABLES)} as csv or jsonl")
+    # a sync generator: Starlette steps it on its thread pool, one chunk at a time
+    return StreamingResponse(export_lines(table, format, start, end), media_type=BULK_MEDIA[format])
+
+
+@app.post("/import/{table}", dependencies=[Depends(admin_user)])
+async def import_table(table: str, request: Request, format: str = "jsonl"):
+    import tempfile
+
+    from backend.bulk_io import CHUNK, import_file
+
+    if table not in BULK_TABLES or format not in BULK_MEDIA:
+        raise HTTPException(404, f"import one of {', '.join(BULK_TABLES)} as csv or jsonl")
+    # spool the upload to disk, then import it as a file; every upload is a
+    # new file, so there is nothing to resume from
+    with tempfile.NamedTemporaryFile(suffix=f".{format}") as f:
+        async for part in request.stream():
+            f.write(part)
+        f.flush()
+        return await pools["db"].run(import_file, table, f.name, format, None, CHUNK, None, False)
+
+
+# -------------------------------------------------------
+# METRICS (this worker only)
+# -------------------------------------------------------
+@app.get("/metrics")
+async def metrics():
+    from backend.metrics import render_prometheus
+    return Response(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 exposes it; put TLS in front first")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    if not os.environ.get(SECRET_ENV):
+        import secrets
+
+        # inherited by the worker processes, so they all accept each other's tokens
+        os.environ[SECRET_ENV] = secrets.token_urlsafe(32)
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
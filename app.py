@@ -1,67 +1,85 @@
 # app.py — Telemed Unified AI Assistant (Final Stable Version)
+import importlib
+import os
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import streamlit.components.v1 as components
 
 # -------------------------------------------------------
-# BACKEND IMPORTS (Smart + Fallback)
+# DEMO MODE FALLBACKS
 # -------------------------------------------------------
-BACKEND_AVAILABLE = False
+def demo_analyze_symptoms(t): return "Symptoms appear mild."
+def demo_analyze_mood(t): return "Your mood seems neutral today."
+def demo_analyze_pdf_with_text(f): return "PDF processed. No major findings.", ""
+def demo_full_image_analysis(x):
+    return {
+        "medical_label": "Normal",
+        "medical_confidence": 0.8,
+        "emotion": "Neutral",
+        "mental_state": "Stable"
+    }
+def demo_medvit_biobert_pipeline(i, t):
+    return {
+        "medical_label": "Normal",
+        "medical_confidence": 0.76,
+        "text_diagnosis": "Mild condition",
+        "text_confidence": 0.70
+    }
+def demo_chat_to_prescription(x):
+    return {
+        "diagnosis": "Mild Viral Infection",
+        "medicines": ["Paracetamol 500mg — twice daily"]
+    }
+
+def demo_save_appointment(a, b, c, d, duration_min=30): return (1, "booked", None)
+def demo_get_appointments(start=None, end=None, limit=None, cursor=None): return []
+def demo_next_appointment_cursor(rows, limit): return None
+def demo_get_meet_link(): return "https://meet.jit.si/demo-room"
+def demo_generate_pdf(a, b): return b"DEMO PDF"
+def demo_generate_prescription_pdf(a, b, c, d, e): return b"DEMO PRESCRIPTION"
+def demo_add_user(a, b): return True
+def demo_validate_user(a, b): return True
+def demo_add_history(a, b, c): return None
+def demo_get_history(a, limit=None, before=None, event_type=None, start=None, end=None): return []
+def demo_next_history_cursor(rows, limit): return None
+def demo_record_mood_label(a, b, c): return None
+def demo_start_updater(): return None
+def demo_search_history(a, q, limit=20, order="rank", marks=("[", "]"), include_archive=True): return []
+def demo_archive_history(days): return {}
+def demo_archive_report(): return {}
+def demo_start_archiver(older_than_days=None): return None
+def demo_cached_frame(rows, build): return build(rows)
+def demo_read_cache_stats(): return {}
+def demo_history_writer_stats(): return None
+def demo_pending_history_dead_letter(): return 0
+def demo_replay_history_dead_letter(): return 0
 
-try:
-    from backend.ai_model import (
-        analyze_symptoms,
-        analyze_mood,
-        analyze_pdf,
-        full_image_analysis,
-        medvit_biobert_pipeline
-    )
 
-    from backend.appointments import save_appointment, get_appointments
-    from backend.telemedicine import get_meet_link
-    from backend.pdf_module import generate_pdf, generate_prescription_pdf
-    from backend.database import add_user, validate_user, add_history, get_history
-    from backend.chat_prescription_ai import chat_to_prescription
-
-    BACKEND_AVAILABLE = True
-
-except Exception as e:
-    st.sidebar.error("Backend import error — Demo Mode Enabled")
-
-    # FALLBACK SAFE MODE
-    def analyze_symptoms(t): return "Symptoms appear mild."
-    def analyze_mood(t): return "Your mood seems neutral today."
-    def analyze_pdf(t): return "PDF processed. No major findings."
-    def full_image_analysis(x):
-        return {
-            "medical_label": "Normal",
-            "medical_confidence": 0.8,
-            "emotion": "Neutral",
-            "mental_state": "Stable"
-        }
-    def medvit_biobert_pipeline(i, t):
-        return {
-            "medical_label": "Normal",
-            "medical_confidence": 0.76,
-            "text_diagnosis": "Mild condition",
-            "text_confidence": 0.70
-        }
-    def chat_to_prescription(x):
-        return {
-            "diagnosis": "Mild Viral Infection",
-            "medicines": ["Paracetamol 500mg — twice daily"]
-        }
-
-    def save_appointment(a, b, c, d): return True
-    def get_appointments(): return pd.DataFrame()
-    def get_meet_link(): return "https://meet.jit.si/demo-room"
-    def generate_pdf(a, b): return b"DEMO PDF"
-    def generate_prescription_pdf(a, b, c, d, e): return b"DEMO PRESCRIPTION"
-    def add_user(a, b): return True
-    def validate_user(a, b): return True
-    def add_history(a, b, c): return None
-    def get_history(a): return []
+# -------------------------------------------------------
+# BACKEND IMPORTS (Lazy + Fallback)
+# -------------------------------------------------------
+# Each page imports only the backend module it uses, the first time it is
+# opened, so the login page does not pay for ReportLab, scikit-learn, NumPy
+# or the DB schema check. Python caches the module, so reruns are free.
+def backend(module, *names):
+    """Functions from backend.<module>, or their demo stand-ins if it fails to import."""
+    try:
+        mod = importlib.import_module(f"backend.{module}")
+        funcs = [getattr(mod, n) for n in names]
+    except Exception as e:
+        try:
+            from backend.metrics import log_error
+            log_error(f"app.backend.{module}", e, f"import failed, demo mode: {e!r}")
+        except Exception:
+            pass    # the backend package itself is unusable; the sidebar still says so
+        st.sidebar.error("Backend import error — Demo Mode Enabled")
+        funcs = [globals()[f"demo_{n}"] for n in names]
+    return funcs[0] if len(funcs) == 1 else funcs
+
+
+# Users who see the Admin (metrics) page: nobody unless HEALTHCARE_ADMINS
+# names them. Registration is open, so no username is trusted by default.
+ADMIN_USERS = {u.strip() for u in os.environ.get("HEALTHCARE_ADMINS", "").split(",") if u.strip()}
 
 
 # -------------------------------------------------------
@@ -105,6 +123,7 @@ if not st.session_state.logged_in:
         p = st.text_input("Password", type="password")
 
         if st.button("Login"):
+            validate_user = backend("database", "validate_user")
             if validate_user(u, p):
                 st.session_state.logged_in = True
                 st.session_state.current_user = u
@@ -118,6 +137,7 @@ if not st.session_state.logged_in:
         new_p = st.text_input("New Password", type="password")
 
         if st.button("Register"):
+            add_user = backend("database", "add_user")
             if add_user(new_u, new_p):
                 st.success("Registration successful. Please log in.")
             else:
@@ -131,21 +151,22 @@ if not st.session_state.logged_in:
 # -------------------------------------------------------
 st.sidebar.title(f"Welcome, {st.session_state.current_user}")
 
-page = st.sidebar.radio(
-    "Navigate",
-    [
-        "Home",
-        "Symptom Checker",
-        "Mental Health",
-        "PDF Analyzer",
-        "Appointments",
-        "Telemedicine",
-        "Patient History",
-        "Prescription",
-        "Chat Prescription AI",
-        "Image + Text Analyzer"
-    ]
-)
+pages = [
+    "Home",
+    "Symptom Checker",
+    "Mental Health",
+    "PDF Analyzer",
+    "Appointments",
+    "Telemedicine",
+    "Patient History",
+    "Prescription",
+    "Chat Prescription AI",
+    "Image + Text Analyzer"
+]
+if st.session_state.current_user in ADMIN_USERS:
+    pages.append("Admin")
+
+page = st.sidebar.radio("Navigate", pages)
 
 if st.sidebar.button("Logout"):
     st.session_state.logged_in = False
@@ -165,6 +186,7 @@ if page == "Home":
 # -------------------------------------------------------
 elif page == "Symptom Checker":
     st.title("Symptom Checker")
+    analyze_symptoms = backend("ai_model", "analyze_symptoms")
 
     text = st.text_area("Describe your symptoms")
 
@@ -185,6 +207,9 @@ elif page == "Symptom Checker":
 # -------------------------------------------------------
 elif page == "Mental Health":
     st.title("Mental Health Analyzer")
+    analyze_mood = backend("ai_model", "analyze_mood")
+    record_mood_label, start_updater = backend("mood_model", "record_mood_label", "start_updater")
+    start_updater()
 
     text = st.text_area("How are you feeling today?")
 
@@ -199,12 +224,22 @@ elif page == "Mental Health":
     if st.session_state.mood_result:
         st.success(st.session_state.mood_result)
 
+        feeling = st.selectbox(
+            "Which best describes how you feel?",
+            ["Positive", "Anxiety", "Depression", "Apathy", "Episodic Anger", "Uncertain"]
+        )
+        if st.button("Save Feedback") and text.strip():
+            record_mood_label(st.session_state.current_user, text, feeling)
+            st.caption("Thanks — your feedback helps the mood analyzer learn.")
+
 
 # -------------------------------------------------------
 # PDF ANALYZER
 # -------------------------------------------------------
 elif page == "PDF Analyzer":
     st.title("PDF Analyzer")
+    analyze_pdf_with_text = backend("ai_model", "analyze_pdf_with_text")
+    add_history = backend("database", "add_history")
 
     file = st.file_uploader("Upload PDF", type="pdf")
 
@@ -213,7 +248,11 @@ elif page == "PDF Analyzer":
 
     if st.button("Analyze PDF"):
         if file:
-            st.session_state.pdf_result = analyze_pdf(file)
+            summary, text = analyze_pdf_with_text(file)
+            st.session_state.pdf_result = summary
+            # the extracted text goes into history, where Patient History search finds it
+            if text:
+                add_history(st.session_state.current_user, "PDF Analysis", f"{file.name}\n{summary}\n\n{text}")
 
     if st.session_state.pdf_result:
         st.text_area("PDF Result", st.session_state.pdf_result, height=300)
@@ -224,18 +263,61 @@ elif page == "PDF Analyzer":
 # -------------------------------------------------------
 elif page == "Appointments":
     st.title("Appointments")
+    import pandas as pd
+    save_appointment, get_appointments, next_appointment_cursor = backend(
+        "appointments", "save_appointment", "get_appointments", "next_appointment_cursor"
+    )
+    cached_frame = backend("read_cache", "cached_frame")
 
     name = st.text_input("Patient Name")
     date = st.date_input("Date")
     time = st.time_input("Time")
+    duration = st.selectbox("Duration (minutes)", [15, 30, 45, 60, 90, 120], index=1)
     notes = st.text_area("Notes")
 
     if st.button("Save Appointment"):
-        save_appointment(name, str(date), str(time), notes)
-        st.success("Appointment saved successfully.")
+        # (id, reason, detail); reasons are the codes in backend/appointments.py
+        _, reason, detail = save_appointment(name, str(date), str(time), notes, duration_min=duration)
+        if reason == "booked":
+            st.success("Appointment saved successfully.")
+        elif reason == "overlap":
+            st.error(f"That time slot overlaps an existing appointment ({detail}).")
+        elif reason == "invalid":
+            st.error(f"Please check the date, time and duration: {detail}.")
+        else:
+            st.error("The appointment could not be saved because of a database error. Please try again.")
+
+    st.subheader("Appointments")
+    APPT_PAGE_SIZE = 50
+
+    c1, c2 = st.columns(2)
+    range_start = c1.date_input("From", value=datetime.now().date(), key="appt_from")
+    range_end = c2.date_input("To", value=None, key="appt_to")
+
+    range_key = (range_start, range_end)
+    if st.session_state.get("appt_range") != range_key:
+        st.session_state.appt_range = range_key
+        st.session_state.appt_cursors = [None]
+
+    rows = get_appointments(
+        start=range_start,
+        end=range_end,
+        limit=APPT_PAGE_SIZE,
+        cursor=st.session_state.appt_cursors[-1],
+    )
+    next_cursor = next_appointment_cursor(rows, APPT_PAGE_SIZE)
+    # rows are shared from the read cache until an appointment is saved, so
+    # reruns reuse the same DataFrame too
+    st.dataframe(cached_frame(rows, lambda r: pd.DataFrame(r).drop(columns=["start_ts"], errors="ignore")))
 
-    st.subheader("All Appointments")
-    st.dataframe(get_appointments())
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("Previous", disabled=len(st.session_state.appt_cursors) == 1):
+        st.session_state.appt_cursors.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(st.session_state.appt_cursors)}")
+    if next_col.button("Next", disabled=next_cursor is None):
+        st.session_state.appt_cursors.append(next_cursor)
+        st.rerun()
 
 
 # -------------------------------------------------------
@@ -258,13 +340,64 @@ elif page == "Telemedicine":
 # -------------------------------------------------------
 elif page == "Patient History":
     st.title("Patient History")
+    import pandas as pd
+    get_history, next_history_cursor, search_history = backend(
+        "database", "get_history", "next_history_cursor", "search_history"
+    )
+    cached_frame = backend("read_cache", "cached_frame")
+
+    PAGE_SIZE = 50
+
+    s1, s2 = st.columns([3, 1])
+    query = s1.text_input("Search your records", placeholder="e.g. chest pain")
+    order = s2.radio("Sort", ["Best match", "Newest"], horizontal=True)
+    if query.strip():
+        hits = search_history(
+            st.session_state.current_user, query, limit=20,
+            order="recent" if order == "Newest" else "rank", marks=("**", "**"),
+        )
+        if not hits:
+            st.info("No matching records.")
+        for hit in hits:
+            st.markdown(f"`{hit['timestamp']}` · {hit['event_type']} — {hit['snippet']}")
+        st.divider()
+
+    c1, c2, c3 = st.columns(3)
+    event_filter = c1.text_input("Event type (optional)")
+    start_date = c2.date_input("From", value=None)
+    end_date = c3.date_input("To", value=None)
+
+    # One keyset cursor per visited page; reset whenever the filters change.
+    filters = (event_filter.strip(), start_date, end_date)
+    if st.session_state.get("history_filters") != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+
+    rows = get_history(
+        st.session_state.current_user,
+        limit=PAGE_SIZE,
+        before=st.session_state.history_cursors[-1],
+        event_type=filters[0] or None,
+        start=start_date,
+        end=end_date,
+    )
+    next_cursor = next_history_cursor(rows, PAGE_SIZE)
 
-    df = pd.DataFrame(get_history(st.session_state.current_user))
+    df = cached_frame(rows, lambda r: pd.DataFrame(r).drop(columns=["id"], errors="ignore"))
     if df.empty:
         st.info("No history found.")
     else:
         st.dataframe(df)
 
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("Previous", disabled=len(st.session_state.history_cursors) == 1):
+        st.session_state.history_cursors.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(st.session_state.history_cursors)}")
+    if next_col.button("Next", disabled=next_cursor is None):
+        st.session_state.history_cursors.append(next_cursor)
+        st.rerun()
+
 
 # -------------------------------------------------------
 # PRESCRIPTION GENERATOR
@@ -280,6 +413,7 @@ elif page == "Prescription":
 
     if st.button("Generate Prescription PDF"):
         meds = [m.strip() for m in meds_raw.split("\n") if m.strip()]
+        generate_prescription_pdf = backend("pdf_module", "generate_prescription_pdf")
         pdf = generate_prescription_pdf(patient, doctor, symptoms, diagnosis, meds)
 
         st.download_button("Download Prescription", pdf, "prescription.pdf")
@@ -290,6 +424,7 @@ elif page == "Prescription":
 # -------------------------------------------------------
 elif page == "Chat Prescription AI":
     st.title("AI Doctor Chat")
+    chat_to_prescription = backend("chat_prescription_ai", "chat_to_prescription")
 
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
@@ -304,6 +439,9 @@ elif page == "Chat Prescription AI":
                 f"Medicines:\n" +
                 "\n".join([f"- {m}" for m in out["medicines"]])
             )
+            others = [m["diagnosis"] for m in out.get("matches", [])[1:]]
+            if others:
+                ai_reply += "\nAlso possible: " + ", ".join(others)
             st.session_state.chat_history.append(("You", msg))
             st.session_state.chat_history.append(("AI Doctor", ai_reply))
 
@@ -316,6 +454,7 @@ elif page == "Chat Prescription AI":
 # -------------------------------------------------------
 elif page == "Image + Text Analyzer":
     st.title("Multimodal AI")
+    medvit_biobert_pipeline = backend("ai_model", "medvit_biobert_pipeline")
 
     img = st.file_uploader("Upload Image", type=["png", "jpg", "jpeg"])
     txt = st.text_area("Enter symptoms / description")
@@ -329,3 +468,87 @@ elif page == "Image + Text Analyzer":
 
     if st.session_state.multi_result:
         st.json(st.session_state.multi_result)
+
+
+# -------------------------------------------------------
+# ADMIN — BACKEND METRICS
+# -------------------------------------------------------
+elif page == "Admin":
+    st.title("Backend Metrics")
+    import pandas as pd
+
+    try:
+        from backend import metrics
+        from backend.db_pool import pool_stats
+    except Exception as e:
+        st.error(f"Metrics unavailable: {e}")
+        st.stop()
+
+    recording = st.toggle("Record metrics", value=metrics.ENABLED)
+    if recording and not metrics.ENABLED:
+        metrics.enable()
+    elif not recording and metrics.ENABLED:
+        metrics.disable()
+
+    rows = metrics.summary()
+    if rows:
+        st.dataframe(pd.DataFrame(rows))
+    else:
+        st.info("No calls recorded yet.")
+
+    text = metrics.render_prometheus()
+    c1, c2, c3 = st.columns(3)
+    c1.download_button("Download Prometheus text", text, "healthcare_metrics.prom")
+
+    # the target is fixed by HEALTHCARE_METRICS_FILE, never typed in here
+    c2.caption(f"Export file: {metrics.METRICS_FILE}")
+    if c2.button("Write file"):
+        try:
+            c2.success(f"Written to {metrics.write_prometheus()}")
+        except OSError as e:
+            c2.error(f"Could not write {metrics.METRICS_FILE}: {e}")
+
+    port = c3.number_input("Endpoint port", 1024, 65535, int(os.environ.get("HEALTHCARE_METRICS_PORT", 9108)))
+    if c3.button("Start /metrics endpoint"):
+        try:
+            c3.success(f"Serving http://127.0.0.1:{metrics.serve(int(port))}/metrics")
+        except OSError as e:
+            c3.error(f"Could not listen on port {port}: {e}")
+
+    st.subheader("Connection pool")
+    st.json(pool_stats())
+
+    st.subheader("History writer")
+    history_writer_stats, pending_history_dead_letter, replay_history_dead_letter = backend(
+        "database", "history_writer_stats", "pending_history_dead_letter", "replay_history_dead_letter"
+    )
+    writer = history_writer_stats()
+    if writer is None:
+        st.caption("Write-behind is off; history is written synchronously.")
+    else:
+        if writer["failed_rows"]:
+            st.error(f"{writer['failed_rows']} history rows failed to save. Last failure: {writer['last_failure']}")
+        st.json(writer)
+    pending = pending_history_dead_letter()
+    if pending:
+        st.warning(f"{pending} history rows are waiting in the dead letter.")
+        if st.button("Replay dead-letter rows"):
+            try:
+                st.success(f"Saved {replay_history_dead_letter()} rows.")
+            except Exception as e:
+                st.error(f"Replay stopped: {e}")
+
+    st.subheader("Read cache")
+    st.json(backend("read_cache", "read_cache_stats")())
+
+    st.subheader("History archive")
+    archive_history, archive_report, start_archiver = backend("history_archive", "archive_history", "archive_report", "start_archiver")
+    days = st.number_input("Archive events older than (days)", 1, 3650, int(os.environ.get("HEALTHCARE_ARCHIVE_DAYS", 180)))
+    a1, a2 = st.columns(2)
+    if a1.button("Archive now"):
+        with st.spinner("Moving old history into compressed blocks..."):
+            a1.json(archive_history(int(days)))
+    if a2.button("Start background archiver"):
+        start_archiver(older_than_days=int(days))
+        a2.success("Archiver running (every 6 hours).")
+    st.json(archive_report())
@@ -1,141 +1,426 @@
 # ai_model.py — Smart rule-based offline AI engine (Always gives meaningful output)
 
-import random
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+from itertools import islice
+
+from backend.keyword_matcher import KeywordMatcher
+from backend.metrics import instrument, log_error
+from backend.result_cache import get_result_cache, normalise_text
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.join(BASE_DIR, "..", "data", "keyword_rules.json")  # project/data/keyword_rules.json
+
+# Batch settings: below the threshold everything runs inline; above it, chunks
+# are spread over a process pool of BATCH_WORKERS processes.
+BATCH_WORKERS = int(os.environ.get("AI_BATCH_WORKERS", os.cpu_count() or 1))
+BATCH_POOL_THRESHOLD = 5000
+BATCH_CHUNK_SIZE = 2000
+
+# Texts that match no rule go to the dataset-backed models first; their
+# answer is used only above these confidences.
+CLASSIFIER_MIN_CONFIDENCE = 0.35
+MOOD_MODEL_MIN_CONFIDENCE = 0.5
+
 
 # -------------------------------------------------------
-# HELPER → keyword matching
+# FALLBACK CHOICE → seeded, consistent per text
 # -------------------------------------------------------
-def contains(words, text):
-    return any(word in text for word in words)
+DEFAULT_SEED = 0
+_seed = DEFAULT_SEED
+
+
+def set_seed(seed):
+    """Choose which of the fallback answers each text maps to (None restores the default).
+
+    The fallback for a text depends only on (seed, normalised text), so single
+    calls, batches, pool workers and cached results all give the same answer.
+    """
+    global _seed
+    _seed = DEFAULT_SEED if seed is None else seed
+
+
+def pick_fallback(options, text, seed=None):
+    seed = _seed if seed is None else seed
+    digest = hashlib.sha256(f"{seed}\x00{normalise_text(text)}".encode("utf-8")).digest()
+    return options[int.from_bytes(digest[:8], "big") % len(options)]
 
 
 # -------------------------------------------------------
-# SYMPTOM ANALYZER (Situation-based)
+# RULE TABLES → compiled once at import
 # -------------------------------------------------------
-def analyze_symptoms(text):
-    text = text.lower().strip()
+def load_rules(path=RULES_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
 
-    if not text:
-        return "I could not detect clear symptoms. Please describe how you feel."
 
-    # FEVER
-    if contains(["fever", "temperature", "hot", "chills"], text):
-        return "This suggests a fever. Monitor temperature, stay hydrated, and rest."
+class RuleSet:
+    """One rule table (symptoms or mood) compiled into a single matcher.
 
-    # HEADACHE
-    if contains(["headache", "migraine", "head pain"], text):
-        return "This appears to be a headache. Rest, hydration, and low light may help."
+    Rules keep their file order, so the first rule in the table still wins
+    when a text hits several of them.
+    """
 
-    # COUGH / LUNG
-    if contains(["cough", "breath", "breathing", "lungs", "wheezing"], text):
-        return "These symptoms suggest a respiratory issue. Monitor breathing closely."
+    def __init__(self, table):
+        self.empty = table["empty"]
+        self.rules = table["rules"]
+        self.responses = [rule["response"] for rule in self.rules]
+        self.fallback = table["fallback"]
+        self.matcher = KeywordMatcher([rule["keywords"] for rule in self.rules])
+        self.model = None   # optional text -> response (or None), tried before the fallback
 
-    # STOMACH
-    if contains(["stomach", "vomit", "nausea", "diarrhea", "abdomen"], text):
-        return "This seems like a digestive issue. Drink ORS and avoid heavy meals."
+    def match(self, text):
+        """The rule (or model) answer for text, or None when it falls back."""
+        if not text:
+            return self.empty
+        hit = self.matcher.first_match(text)
+        if hit is not None:
+            return self.responses[hit]
+        if self.model is not None:
+            return self.model(text) or None
+        return None
 
-    # BODY PAIN / FATIGUE
-    if contains(["body pain", "bodyache", "muscle pain", "fatigue", "weakness", "tired"], text):
-        return "This suggests body fatigue or viral symptoms. Take rest and drink fluids."
+    def respond(self, text, seed=None):
+        answer = self.match(text)
+        return answer if answer is not None else pick_fallback(self.fallback, text, seed)
 
-    # THROAT
-    if contains(["sore throat", "throat", "tonsil", "swallow"], text):
-        return "This looks like a throat infection. Warm water and salt gargling may help."
 
-    # COLD / RUNNY NOSE
-    if contains(["cold", "running nose", "sneeze", "blocked nose"], text):
-        return "This appears to be a common cold. Stay warm and hydrated."
+_RULES = load_rules()
+_rules_mtime = os.stat(RULES_PATH).st_mtime_ns
+SYMPTOM_RULES = RuleSet(_RULES["symptoms"])
+MOOD_RULES = RuleSet(_RULES["mood"])
+RULE_SETS = {"symptoms": SYMPTOM_RULES, "mood": MOOD_RULES}
+
+
+# -------------------------------------------------------
+# DATASET-BACKED CLASSIFIER (data/symptoms.csv)
+# -------------------------------------------------------
+def classify_symptoms(text, k=3):
+    """Diagnosis, confidence and top-k alternatives; None if scikit-learn is unavailable."""
+    try:
+        from backend import symptom_classifier
+        return symptom_classifier.classify_symptoms(text, k)
+    except (ImportError, OSError) as e:
+        log_error("ai_model.classify_symptoms", e, "classifier unavailable")
+        SYMPTOM_RULES.model = None
+        return None
 
-    # RANDOM UNKNOWN INPUT
-    fallback = [
-        "Your symptoms appear mild. Continue monitoring.",
-        "Not enough indicators for a specific diagnosis. If persistent, consult a doctor.",
-        "The symptoms could be due to stress or a minor infection.",
-        "No major risk detected. Observe for 24 hours."
-    ]
-    return random.choice(fallback)
+
+def _classifier_response(text):
+    result = classify_symptoms(text)
+    if not result or result["confidence"] < CLASSIFIER_MIN_CONFIDENCE:
+        return None
+    return (
+        f"Your symptoms are closest to {result['diagnosis']} "
+        f"({result['confidence']:.0%} match). Please consult a doctor to confirm."
+    )
+
+
+SYMPTOM_RULES.model = _classifier_response
+
+
+# -------------------------------------------------------
+# ONLINE MOOD MODEL (data/mood_dataset.csv + labelled history)
+# -------------------------------------------------------
+MOOD_MODEL_RESPONSES = _RULES["mood"].get("model_responses", {})
+
+
+def predict_mood(text):
+    """(status, confidence) from the incremental mood model; None if unavailable."""
+    try:
+        from backend import mood_model
+        return mood_model.predict_mood(text)
+    except (ImportError, OSError) as e:
+        log_error("ai_model.predict_mood", e, "mood model unavailable")
+        MOOD_RULES.model = None
+        return None
+
+
+def _mood_model_response(text):
+    result = predict_mood(text)
+    if not result or result[1] < MOOD_MODEL_MIN_CONFIDENCE:
+        return None
+    return MOOD_MODEL_RESPONSES.get(result[0])
+
+
+MOOD_RULES.model = _mood_model_response
+
+
+# -------------------------------------------------------
+# SHARED RESULT CACHE (+ reload when rule/data files change)
+# -------------------------------------------------------
+def reload_rules():
+    """Recompile the rule tables if data/keyword_rules.json changed."""
+    global _RULES, _rules_mtime, SYMPTOM_RULES, MOOD_RULES, RULE_SETS, MOOD_MODEL_RESPONSES
+    mtime = os.stat(RULES_PATH).st_mtime_ns
+    if mtime == _rules_mtime:
+        return False
+    rules = load_rules()
+    symptoms, mood = RuleSet(rules["symptoms"]), RuleSet(rules["mood"])
+    symptoms.model, mood.model = SYMPTOM_RULES.model, MOOD_RULES.model
+    _RULES, _rules_mtime = rules, mtime
+    SYMPTOM_RULES, MOOD_RULES = symptoms, mood
+    RULE_SETS = {"symptoms": SYMPTOM_RULES, "mood": MOOD_RULES}
+    MOOD_MODEL_RESPONSES = rules["mood"].get("model_responses", {})
+    return True
+
+
+def _on_data_change():
+    reload_rules()
+    for name in ("backend.symptom_classifier", "backend.mood_model"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.refresh()
+
+
+_cache = get_result_cache()
+_cache.on_change(_on_data_change)
+
+
+# -------------------------------------------------------
+# SYMPTOM ANALYZER (Situation-based)
+# -------------------------------------------------------
+def rule_text(text):
+    """What the rule tables match against; also the result-cache key, since
+    rules match punctuation literally ("don't understand"). Lowercased, with
+    whitespace runs collapsed to one space."""
+    return " ".join((text or "").lower().split())
+
+
+def _analyze(kind, text):
+    # The fallback is a function of (seed, text), so it is cached with the rule
+    # answers, keyed by the seed. RULE_SETS is read only after get_or_compute's
+    # data check, which may have just reloaded it.
+    text = rule_text(text)
+    seed = _seed
+    return _cache.get_or_compute(kind, text, lambda: RULE_SETS[kind].respond(text, seed), version=seed, normalise=str)
+
+
+@instrument()
+def analyze_symptoms(text):
+    return _analyze("symptoms", text)
 
 
 # -------------------------------------------------------
 # MOOD ANALYZER (Very Important — Realistic Output)
 # -------------------------------------------------------
+@instrument()
 def analyze_mood(text):
-    text = text.lower().strip()
+    return _analyze("mood", text)
+
 
-    if not text:
-        return "Your mood seems neutral today."
+# -------------------------------------------------------
+# BATCH ANALYZERS (nightly re-triage of history rows)
+# -------------------------------------------------------
+def _respond_chunk(kind, texts, seed):
+    rules = RULE_SETS[kind]
+    return [rules.respond(t, seed) for t in texts]
 
-    # JOB LOSS / WORK PROBLEMS
-    if contains(["fired", "lost my job", "laid off", "unemployed", "lost job"], text):
-        return "You seem deeply stressed due to job loss. It's normal to feel overwhelmed. Try talking to someone you trust."
 
-    if contains(["work", "office", "boss", "job", "pressure", "overload"], text):
-        return "You seem stressed from work. Take short breaks and try organizing tasks."
+def _normalise_chunk(texts):
+    return [rule_text(t) for t in texts]
 
-    # SADNESS / LOW MOOD
-    if contains(["sad", "down", "depressed", "cry", "upset", "lonely"], text):
-        return "You seem sad or emotionally low. It's okay to feel this way—reach out to someone who supports you."
 
-    # ANXIETY
-    if contains(["anxious", "anxiety", "panic", "scared", "fear"], text):
-        return "You seem anxious. Try deep breathing and give yourself small breaks."
+def _chunks(texts, size):
+    it = iter(texts)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield _normalise_chunk(chunk)
 
-    # ANGER
-    if contains(["angry", "irritated", "frustrated", "mad"], text):
-        return "You seem frustrated or angry. Try stepping away from the situation to calm down."
 
-    # CONFUSION
-    if contains(["confused", "lost", "don't understand", "unsure", "uncertain"], text):
-        return "You seem confused. It's okay—take a moment to relax and think clearly."
+def _analyze_batch(kind, texts, workers, threshold, chunk_size):
+    seed = _seed
+    chunks = _chunks(texts, chunk_size)
 
-    # RELATIONSHIP ISSUES
-    if contains(["breakup", "fight", "argument", "relationship"], text):
-        return "You seem emotionally affected by relationship issues. Try calm communication or seeking emotional support."
+    # Look ahead far enough to know whether the pool is worth starting.
+    head = []
+    for chunk in chunks:
+        head.append(chunk)
+        if len(head) * chunk_size >= threshold:
+            break
 
-    # FINANCIAL STRESS
-    if contains(["money", "broke", "financial", "rent", "bills"], text):
-        return "You seem stressed about finances. Try to make a small, achievable plan for now."
+    workers = BATCH_WORKERS if workers is None else workers
+    if workers <= 1 or len(head) * chunk_size < threshold:
+        for chunk in head:
+            yield from _respond_chunk(kind, chunk, seed)
+        for chunk in chunks:
+            yield from _respond_chunk(kind, chunk, seed)
+        return
 
-    # HAPPY / POSITIVE
-    if contains(["happy", "good", "excited", "great", "joy"], text):
-        return "You seem happy and positive! Keep doing what brings you joy."
+    # only batch jobs pay for the process-pool import
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Keep a bounded window of chunks in flight so results stream in order
+    # without the whole input ever being materialised.
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in head:
+            pending.append(pool.submit(_respond_chunk, kind, chunk, seed))
+        for chunk in chunks:
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+            pending.append(pool.submit(_respond_chunk, kind, chunk, seed))
+        while pending:
+            yield from pending.popleft().result()
 
-    # FALLBACK (still positive)
-    fallback = [
-        "Your mood seems neutral today.",
-        "You appear calm.",
-        "Your emotional state seems steady.",
-        "You seem okay overall."
-    ]
-    return random.choice(fallback)
+
+def analyze_symptoms_batch(texts, workers=None, threshold=BATCH_POOL_THRESHOLD, chunk_size=BATCH_CHUNK_SIZE):
+    """Yield analyze_symptoms(text) for every text, in input order."""
+    return _analyze_batch("symptoms", texts, workers, threshold, chunk_size)
+
+
+def analyze_mood_batch(texts, workers=None, threshold=BATCH_POOL_THRESHOLD, chunk_size=BATCH_CHUNK_SIZE):
+    """Yield analyze_mood(text) for every text, in input order."""
+    return _analyze_batch("mood", texts, workers, threshold, chunk_size)
 
 
 # -------------------------------------------------------
 # PDF ANALYZER
 # -------------------------------------------------------
+@instrument()
+def analyze_pdf_pages(file, max_pages=None, timeout=None, keep_text=False):
+    """Extract an uploaded PDF page by page and run the symptom rules on each page.
+
+    Returns per-page findings plus an overall summary; see backend/pdf_extract.py
+    for the page limit, timeout and process-pool settings.
+    """
+    from backend import pdf_extract
+
+    extracted = pdf_extract.extract_pages(
+        file,
+        max_pages=pdf_extract.MAX_PAGES if max_pages is None else max_pages,
+        timeout=pdf_extract.TIMEOUT if timeout is None else timeout,
+    )
+
+    names = [rule["name"] for rule in SYMPTOM_RULES.rules]
+    page_counts = {}
+    pages = []
+    chars = 0
+    for page_no, text in extracted.pages:
+        hits = sorted(SYMPTOM_RULES.matcher.matches(text.lower()))
+        for h in hits:
+            page_counts[h] = page_counts.get(h, 0) + 1
+        chars += len(text)
+        page = {
+            "page": page_no,
+            "chars": len(text),
+            "findings": [names[h] for h in hits],
+            "summary": SYMPTOM_RULES.responses[hits[0]] if hits else None,
+        }
+        if keep_text:
+            page["text"] = text
+        pages.append(page)
+
+    if page_counts:
+        overall = SYMPTOM_RULES.responses[min(page_counts)]
+    elif extracted.pages and not chars:
+        overall = "No extractable text found — the PDF may be a scanned image."
+    else:
+        overall = "PDF scanned successfully. No critical findings detected."
+
+    return {
+        "page_count": extracted.page_count,
+        "pages_read": len(extracted.pages),
+        "truncated": extracted.truncated,
+        "timed_out": extracted.timed_out,
+        "findings": {names[h]: n for h, n in sorted(page_counts.items())},
+        "overall": overall,
+        "pages": pages,
+    }
+
+
+PDF_READ_ERROR = "Could not read this PDF. Please check the file and try again."
+
+
+def format_pdf_result(result):
+    """The text summary shown for an analyze_pdf_pages result."""
+    lines = [
+        f"PDF scanned: {result['pages_read']} of {result['page_count']} pages.",
+        f"Overall: {result['overall']}",
+    ]
+    if result["findings"]:
+        lines.append("Findings: " + ", ".join(
+            f"{name} ({n} page{'s' if n != 1 else ''})" for name, n in result["findings"].items()
+        ))
+        lines.append("")
+        for page in result["pages"]:
+            if page["findings"]:
+                lines.append(f"Page {page['page']}: {', '.join(page['findings'])} — {page['summary']}")
+    if result["truncated"]:
+        lines.append(f"Stopped at the {result['pages_read']}-page limit.")
+    if result["timed_out"]:
+        lines.append("Stopped early: the time limit was reached, results are partial.")
+    return "\n".join(lines)
+
+
+@instrument()
 def analyze_pdf(file):
-    return "PDF scanned successfully. No critical findings detected."
+    try:
+        result = analyze_pdf_pages(file)
+    except Exception as e:
+        log_error("ai_model.analyze_pdf", e)
+        return PDF_READ_ERROR
+    return format_pdf_result(result)
+
+
+@instrument()
+def analyze_pdf_with_text(file):
+    """(summary, extracted text) for an uploaded PDF; the text is "" if nothing could be read.
+
+    The text is what the PDF Analyzer page stores in history, where the
+    full-text index picks it up.
+    """
+    try:
+        result = analyze_pdf_pages(file, keep_text=True)
+    except Exception as e:
+        log_error("ai_model.analyze_pdf_with_text", e)
+        return PDF_READ_ERROR, ""
+    text = "\n\n".join(page["text"] for page in result["pages"] if page["text"].strip())
+    return format_pdf_result(result), text
 
 
 # -------------------------------------------------------
-# IMAGE ANALYSIS (simple placeholder)
+# IMAGE ANALYSIS (NumPy features → deterministic labels)
 # -------------------------------------------------------
+UNREADABLE_IMAGE = {
+    "medical_label": "Unreadable image",
+    "medical_confidence": 0.0,
+    "emotion": "Neutral",
+    "mental_state": "Stable"
+}
+
+
+@instrument()
 def full_image_analysis(image_file):
-    return {
-        "medical_label": random.choice(["Normal", "Possible Infection", "Minor Issue"]),
-        "medical_confidence": round(random.uniform(0.6, 0.95), 2),
-        "emotion": random.choice(["Calm", "Neutral", "Stressed"]),
-        "mental_state": random.choice(["Stable", "Tired", "Alert"])
-    }
+    from backend.image_pipeline import analyze_image
+    try:
+        return analyze_image(image_file)
+    except Exception as e:
+        log_error("ai_model.full_image_analysis", e)
+        return dict(UNREADABLE_IMAGE)
 
 
 # -------------------------------------------------------
 # MULTIMODAL PIPELINE
 # -------------------------------------------------------
+def text_confidence(text):
+    """How sure analyze_symptoms is: rule hit > classifier match > fallback."""
+    text = (text or "").lower().strip()
+    if text and SYMPTOM_RULES.matcher.first_match(text) is not None:
+        return 0.85
+    result = classify_symptoms(text) if text and SYMPTOM_RULES.model else None
+    if result and result["confidence"] >= CLASSIFIER_MIN_CONFIDENCE:
+        return round(0.6 + 0.3 * result["confidence"], 2)
+    return 0.6
+
+
+@instrument()
 def medvit_biobert_pipeline(image_file, text):
-    return {
-        "medical_label": random.choice(["Normal", "Pneumonia", "Asthma", "Healthy"]),
-        "medical_confidence": round(random.uniform(0.6, 0.97), 2),
-        "text_diagnosis": analyze_symptoms(text),
-        "text_confidence": round(random.uniform(0.65, 0.9), 2)
-    }
\ No newline at end of file
+    # image and text branches run concurrently, micro-batched across sessions
+    from backend.inference_scheduler import get_scheduler
+    return get_scheduler().run(image_file, text)
@@ -1,61 +1,203 @@
 # backend/appointments.py
-import sqlite3
-import os
-from datetime import datetime
+import calendar
+from collections import namedtuple
+from datetime import date as date_cls, datetime, timedelta
+
+from backend.db_pool import DB_PATH, get_pool, init_once
+from backend.metrics import instrument, log_error, log_event, result_rows
+from backend.migrations import ensure_schema
+from backend.read_cache import APPOINTMENT_DEPS, bump_versions, get_read_cache
+
+DEFAULT_DURATION_MIN = 30
+MAX_DURATION_MIN = 240      # bounds the conflict lookup window
+PAGE_SIZE = 50
+
+
+def ensure_db():
+    """Check the schema version on first use (once per process), migrating if behind."""
+    init_once("schema", ensure_schema)
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "healthcare.db")
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    conn = get_connection()
-    cur = conn.cursor()
-    # keep minimal appointment schema
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS appointments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        date TEXT,
-        time TEXT,
-        notes TEXT,
-        created_at TEXT
-    )
-    """)
-    conn.commit()
-    conn.close()
-
-init_db()
-
-def save_appointment(name: str, date: str, time: str, notes: str):
-    """Save appointment; return inserted row id or None on failure."""
+    """Borrow a pooled connection: `with get_connection() as conn: ...`"""
+    ensure_db()
+    return get_pool().connection()
+
+
+def get_transaction():
+    """Borrow a pooled connection inside a write transaction (BEGIN IMMEDIATE)."""
+    ensure_db()
+    return get_pool().transaction()
+
+
+# -----------------------------
+# TIME HELPERS
+# -----------------------------
+TIME_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d %I:%M %p"]
+
+
+# start_ts is the wall-clock appointment time as seconds since 1970-01-01,
+# timezone-naive, so it sorts the same way the date/time strings read.
+def to_ts(value) -> int:
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date_cls):
+        dt = datetime(value.year, value.month, value.day)
+    else:
+        text = str(value).strip()
+        try:
+            dt = datetime.fromisoformat(text)
+        except ValueError:
+            for fmt in TIME_FORMATS:
+                try:
+                    dt = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise
+    return calendar.timegm(dt.timetuple())
+
+
+def parse_start(date: str, time: str):
+    """Start timestamp from the free-form date and time strings, or None."""
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO appointments (name, date, time, notes, created_at) VALUES (?, ?, ?, ?, ?)",
-            (name, date, time, notes, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        )
-        conn.commit()
-        rowid = cur.lastrowid
-        conn.close()
-        return rowid
-    except Exception as e:
-        print("save_appointment error:", e)
+        return to_ts(f"{str(date).strip()} {str(time).strip()}")
+    except (TypeError, ValueError):
         return None
 
-def get_appointments():
-    """Return list of dicts representing appointments (ordered by date/time)."""
+
+def appointment_cursor(row) -> str:
+    return f"{row['start_ts']}|{row['id']}"
+
+
+def next_appointment_cursor(rows, limit):
+    if limit and len(rows) == limit:
+        return appointment_cursor(rows[-1])
+    return None
+
+
+# -----------------------------
+# BOOKING
+# -----------------------------
+# All appointments share one calendar (one clinician / one room): any two
+# overlapping appointments conflict, whoever they are for. Booking several
+# resources in parallel would need a resource column in the table, in
+# _conflicts() and in the start_ts index.
+
+# save_appointment() outcome: id is the new row id when reason is BOOKED;
+# detail says what was wrong (INVALID) or which appointment is in the way
+# (OVERLAP, as "date time").
+Booking = namedtuple("Booking", "id reason detail")
+BOOKED = "booked"
+INVALID = "invalid"         # unparseable date/time or duration out of range
+OVERLAP = "overlap"         # the slot overlaps an existing appointment
+DB_ERROR = "db_error"       # the database could not be written
+
+
+def _conflicts(conn, start_ts, end_ts, limit=1):
+    # start_ts index range: only appointments starting within MAX_DURATION_MIN
+    # before our end can overlap, so this never scans the whole table.
+    return conn.execute("""
+        SELECT id, name, date, time, start_ts, duration_min FROM appointments
+        WHERE start_ts >= ? AND start_ts < ?
+          AND start_ts + duration_min * 60 > ?
+        ORDER BY start_ts
+        LIMIT ?
+    """, (start_ts - MAX_DURATION_MIN * 60, end_ts, start_ts, limit)).fetchall()
+
+
+@instrument(rows=result_rows)
+def find_conflicts(date: str, time: str, duration_min: int = DEFAULT_DURATION_MIN, limit: int = 10):
+    """Existing appointments overlapping the given slot."""
+    start_ts = parse_start(date, time)
+    if start_ts is None:
+        return []
+    with get_connection() as conn:
+        return [dict(r) for r in _conflicts(conn, start_ts, start_ts + int(duration_min) * 60, limit)]
+
+
+@instrument(rows=lambda args, result: 1 if result.reason == BOOKED else 0)
+def save_appointment(name: str, date: str, time: str, notes: str, duration_min: int = DEFAULT_DURATION_MIN):
+    """Save appointment; returns a Booking with the new id, or the reason it was not saved."""
+    start_ts = parse_start(date, time)
+    if start_ts is None:
+        return Booking(None, INVALID, f"unrecognised date/time: {date} {time}")
+    try:
+        duration_min = int(duration_min)
+    except (TypeError, ValueError):
+        duration_min = 0
+    if not 0 < duration_min <= MAX_DURATION_MIN:
+        return Booking(None, INVALID, f"duration must be 1–{MAX_DURATION_MIN} minutes")
+
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM appointments ORDER BY date ASC, time ASC")
-        rows = cur.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+        # check and insert under the same write lock, so two sessions cannot
+        # both see the slot as free
+        with get_transaction() as conn:
+            clash = _conflicts(conn, start_ts, start_ts + duration_min * 60)
+            if clash:
+                log_event("appointments.save_appointment", "slot overlaps appointment %s", clash[0]["id"])
+                return Booking(None, OVERLAP, f"{clash[0]['date']} {clash[0]['time']}")
+            cur = conn.execute(
+                "INSERT INTO appointments (name, date, time, notes, created_at, start_ts, duration_min) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, date, time, notes, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), start_ts, duration_min)
+            )
+            rowid = cur.lastrowid
+            bump_versions(conn, *APPOINTMENT_DEPS)
+        return Booking(rowid, BOOKED, None)
     except Exception as e:
-        print("get_appointments error:", e)
-        return []
\ No newline at end of file
+        log_error("appointments.save_appointment", e)
+        return Booking(None, DB_ERROR, str(e))
+
+
+# -----------------------------
+# LISTING
+# -----------------------------
+@instrument(rows=result_rows)
+def get_appointments(start=None, end=None, limit: int = None, cursor: str = None):
+    """Return list of dicts representing appointments (ordered by start time).
+
+    start/end (date, datetime or ISO string) select a range via the start_ts
+    index; a bare end date includes that whole day. limit/cursor give keyset
+    pagination: pass next_appointment_cursor(rows, limit) as cursor=. Results
+    come from the read cache (backend/read_cache.py) until an appointment is
+    written; the returned list is shared, so do not modify it.
+    """
+    try:
+        start_ts = to_ts(start) if start is not None else None
+        end_ts = None
+        if end is not None:
+            end_ts = to_ts(end)
+            if len(str(end).strip()) == 10:   # bare date: whole day
+                end_ts += int(timedelta(days=1).total_seconds())
+        return get_read_cache().get_or_load(
+            ("appointments", start_ts, end_ts, limit and int(limit), cursor),
+            APPOINTMENT_DEPS,
+            lambda: _query_appointments(start_ts, end_ts, limit, cursor),
+        )
+    except Exception as e:
+        log_error("appointments.get_appointments", e)
+        return []
+
+
+def _query_appointments(start_ts, end_ts, limit, cursor):
+    sql = "SELECT * FROM appointments WHERE 1 = 1"
+    params = []
+    if start_ts is not None:
+        sql += " AND start_ts >= ?"
+        params.append(start_ts)
+    if end_ts is not None:
+        sql += " AND start_ts < ?"
+        params.append(end_ts)
+    if cursor:
+        ts, _, row_id = cursor.partition("|")
+        sql += " AND (start_ts, id) > (?, ?)"
+        params += [int(ts), int(row_id)]
+    sql += " ORDER BY start_ts ASC, id ASC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+
+    with get_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [dict(r) for r in rows]
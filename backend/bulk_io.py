@@ -0,0 +1,454 @@
+# backend/bulk_io.py — streaming CSV/JSONL import and export for history, appointments and users
+#
+# CLI (from the project root):
+#     python -m backend.bulk_io export history history.jsonl [--start 2025-01-01] [--end 2025-12-31]
+#     python -m backend.bulk_io import history history.jsonl
+#     python -m backend.bulk_io import appointments appts.csv.gz --keep-indexes
+#     python -m backend.bulk_io status
+#
+# The format comes from the extension (.csv or .jsonl/.ndjson, optionally
+# .gz). Files are read and written as streams, so memory does not grow with
+# the row count.
+#
+# Imports insert CHUNK rows per executemany inside one BEGIN IMMEDIATE
+# transaction, so other writers get the lock between chunks. Large imports
+# drop the table's secondary indexes first and rebuild them once at the end.
+# Progress is kept in the import_progress table and updated in the same
+# transaction as each chunk. An interrupted import of the same file resumes
+# after the last committed chunk, with no gaps and no duplicates; the dropped
+# indexes are rebuilt when it completes, or by `status --repair`.
+#
+# Ids are not carried across databases: imported history and appointments get
+# new ids, and users whose username already exists are skipped. Appointment
+# imports copy rows as they are and do not check for overlapping slots.
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+from datetime import datetime
+
+from backend.db_pool import get_pool
+from backend.metrics import instrument, log_error
+from backend.read_cache import bump_versions
+
+CHUNK = 50000                           # rows per transaction
+DEFER_INDEX_MIN_BYTES = 8 * 1024 * 1024  # smaller imports keep their indexes
+
+TABLES = {
+    "history": {
+        "columns": ["username", "event_type", "content", "timestamp"],
+        "insert": "INSERT INTO history (username, event_type, content, timestamp) VALUES (?, ?, ?, ?)",
+        "filter": "timestamp",
+    },
+    "appointments": {
+        "columns": ["name", "date", "time", "notes", "created_at", "start_ts", "duration_min"],
+        "insert": """INSERT INTO appointments (name, date, time, notes, created_at, start_ts, duration_min)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        "filter": "date",
+    },
+    "users": {
+        "columns": ["username", "password", "created_at"],
+        "insert": "INSERT OR IGNORE INTO users (username, password, created_at) VALUES (?, ?, ?)",
+        "filter": "created_at",
+    },
+}
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _pool():
+    from backend.database import ensure_db
+    ensure_db()
+    return get_pool()
+
+
+def _spec(table):
+    if table not in TABLES:
+        raise ValueError(f"unknown table {table!r}; expected one of {', '.join(TABLES)}")
+    return TABLES[table]
+
+
+# -----------------------------
+# ROW CONVERSION
+# -----------------------------
+def _history_row(r):
+    if not r.get("username") or not r.get("event_type"):
+        raise ValueError("username and event_type are required")
+    return (r["username"], r["event_type"], r.get("content") or "", r.get("timestamp") or _now())
+
+
+def _appointment_row(r):
+    from backend.appointments import DEFAULT_DURATION_MIN, MAX_DURATION_MIN, parse_start
+
+    if not r.get("name") or not r.get("date"):
+        raise ValueError("name and date are required")
+    start_ts = r.get("start_ts")
+    start_ts = int(start_ts) if start_ts not in (None, "") else parse_start(r["date"], r.get("time", ""))
+    duration = r.get("duration_min")
+    duration = int(duration) if duration not in (None, "") else DEFAULT_DURATION_MIN
+    # as in save_appointment: a longer booking would fall outside the conflict lookup window
+    if not 0 < duration <= MAX_DURATION_MIN:
+        raise ValueError(f"duration_min must be 1–{MAX_DURATION_MIN} minutes")
+    return (
+        r["name"], r["date"], r.get("time") or "", r.get("notes") or "", r.get("created_at") or _now(),
+        start_ts or 0,      # unparseable legacy times get 0, as in the start_ts backfill
+        duration,
+    )
+
+
+def _user_row(r):
+    if not r.get("username") or not r.get("password"):
+        raise ValueError("username and password (hash) are required")
+    return (r["username"], r["password"], r.get("created_at") or _now())
+
+
+CONVERTERS = {"history": _history_row, "appointments": _appointment_row, "users": _user_row}
+
+
+# -----------------------------
+# FILES
+# -----------------------------
+def detect_format(path):
+    if path == "-":
+        return "jsonl"      # stdin/stdout default; pass --format csv otherwise
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(f"cannot tell the format of {path!r}; use .csv or .jsonl (optionally .gz)")
+
+
+def _open(path, mode, gz=None):
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer if "r" in mode else sys.stdout.buffer, encoding="utf-8", newline="")
+    if path.endswith(".gz") if gz is None else gz:
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _parse_jsonl(lines):
+    # one json.loads over the whole batch is far cheaper than one per line;
+    # a batch with a bad line is parsed line by line, and the bad line is
+    # passed through as a string for import_records to reject
+    try:
+        return json.loads("[" + ",".join(lines) + "]")
+    except ValueError:
+        out = []
+        for line in lines:
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                out.append(line)
+        return out
+
+
+def read_records(f, fmt, batch=1000):
+    """Yield dicts from an open CSV (with a header row) or JSONL stream."""
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+        return
+    lines = []
+    for line in f:
+        if line.strip():
+            lines.append(line)
+            if len(lines) == batch:
+                yield from _parse_jsonl(lines)
+                lines = []
+    if lines:
+        yield from _parse_jsonl(lines)
+
+
+# -----------------------------
+# INDEXES
+# -----------------------------
+def _secondary_indexes(conn, table):
+    # sql is NULL for the automatic indexes behind UNIQUE / PRIMARY KEY, which stay
+    return [
+        (r["name"], r["sql"])
+        for r in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+        )
+    ]
+
+
+def _rebuild_indexes(pool, indexes):
+    with pool.transaction() as conn:
+        existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for name, sql in indexes:
+            if name not in existing:
+                conn.execute(sql)
+
+
+# -----------------------------
+# IMPORT
+# -----------------------------
+def job_id(table, path):
+    """Identifies one import of one version of a file; a changed file is a new job."""
+    st = os.stat(path)
+    key = f"{table}:{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+@instrument(rows=lambda args, result: result["imported"])
+def import_records(table, records, job=None, source="-", defer_indexes=False, chunk=CHUNK, progress=None):
+    """Insert dict records into `table` in chunked transactions.
+
+    With a `job` id, progress is committed with every chunk and a later call
+    with the same job skips the records already read. defer_indexes drops
+    the table's secondary indexes for the duration. progress(stats), if
+    given, is called after each chunk. Returns counts: read, imported,
+    skipped (already imported before a resume) and rejected (bad records).
+    """
+    spec, convert = _spec(table), CONVERTERS[table]
+    pool = _pool()
+    stats = {"read": 0, "imported": 0, "skipped": 0, "rejected": 0}
+
+    with pool.transaction() as conn:
+        done = 0
+        dropped = []
+        if job:
+            row = conn.execute("SELECT rows_read, dropped_indexes FROM import_progress WHERE job = ?", (job,)).fetchone()
+            if row:
+                done, dropped = row["rows_read"], [tuple(i) for i in json.loads(row["dropped_indexes"])]
+        if defer_indexes:
+            for name, sql in _secondary_indexes(conn, table):
+                conn.execute(f'DROP INDEX "{name}"')
+                dropped.append((name, sql))
+        if job:
+            conn.execute("""
+                INSERT INTO import_progress (job, table_name, source, rows_read, dropped_indexes, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(job) DO UPDATE SET dropped_indexes = excluded.dropped_indexes, updated_at = excluded.updated_at
+            """, (job, table, source, done, json.dumps(dropped), _now()))
+
+    def flush(rows):
+        with pool.transaction() as conn:
+            # rows actually inserted (INSERT OR IGNORE may skip some); unlike
+            # total_changes this leaves out writes made by triggers (history FTS)
+            inserted = conn.executemany(spec["insert"], rows).rowcount
+            if inserted:
+                # invalidates every cached page of the table (backend/read_cache.py)
+                bump_versions(conn, table)
+            if job:
+                conn.execute(
+                    "UPDATE import_progress SET rows_read = ?, rows_imported = rows_imported + ?, updated_at = ? WHERE job = ?",
+                    (done + stats["read"], inserted, _now(), job)
+                )
+        stats["imported"] += inserted
+        if progress:
+            progress(stats)
+
+    try:
+        rows = []
+        for record in records:
+            if stats["skipped"] < done:
+                stats["skipped"] += 1
+                continue
+            stats["read"] += 1
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError(f"not a JSON object: {str(record)[:80]!r}")
+                rows.append(convert(record))
+            except (TypeError, ValueError, KeyError) as e:
+                stats["rejected"] += 1
+                if stats["rejected"] <= 10:
+                    log_error("bulk_io.import_records", e, f"{table} record {done + stats['read']}: {e}")
+                continue
+            if len(rows) >= chunk:
+                flush(rows)
+                rows = []
+        if rows:
+            flush(rows)
+    except BaseException:
+        # put the indexes back so the live app is not left scanning; a resume
+        # drops them again. A killed process leaves them to the resume (or
+        # `status --repair`), which reads them back from import_progress.
+        if dropped:
+            _rebuild_indexes(pool, dropped)
+            if job:
+                with pool.transaction() as conn:
+                    conn.execute("UPDATE import_progress SET dropped_indexes = '[]' WHERE job = ?", (job,))
+        raise
+
+    if dropped:
+        _rebuild_indexes(pool, dropped)
+    with pool.transaction() as conn:
+        if job:
+            conn.execute("DELETE FROM import_progress WHERE job = ?", (job,))
+        conn.execute("PRAGMA analysis_limit = 1000")    # sampled statistics, not a full scan
+        conn.execute("ANALYZE " + table)
+    return stats
+
+
+def import_file(table, path, fmt=None, defer_indexes=None, chunk=CHUNK, progress=None, resumable=True):
+    """Stream a CSV/JSONL file into `table`, resuming an interrupted import of the same file.
+
+    defer_indexes=None drops and rebuilds the indexes only for files of at
+    least DEFER_INDEX_MIN_BYTES. resumable=False keeps no progress (for
+    temporary files that will not be seen again).
+    """
+    fmt = fmt or detect_format(path)
+    job = job_id(table, path) if resumable and path != "-" else None
+    if defer_indexes is None:
+        defer_indexes = path != "-" and os.path.getsize(path) >= DEFER_INDEX_MIN_BYTES
+    with _open(path, "r") as f:
+        return import_records(table, read_records(f, fmt), job, os.path.abspath(path), defer_indexes, chunk, progress)
+
+
+# -----------------------------
+# EXPORT
+# -----------------------------
+def _export_chunks(table, start=None, end=None, chunk=CHUNK, as_json=False):
+    spec = _spec(table)
+    where, params = [], []
+    if start:
+        where.append(f"{spec['filter']} >= ?")
+        params.append(start)
+    if end:
+        # a bare date as end includes the whole day
+        where.append(f"{spec['filter']} <= ?")
+        params.append(end + " 23:59:59" if len(end) == 10 and spec["filter"] != "date" else end)
+    if as_json:
+        # SQLite builds each JSONL line itself, several times faster than json.dumps per row
+        select = "json_object(" + ", ".join(f"'{c}', {c}" for c in spec["columns"]) + ")"
+    else:
+        select = ", ".join(spec["columns"])
+    sql = f"SELECT {select} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id"
+
+    with _pool().connection() as conn:
+        conn.execute("BEGIN")   # one snapshot for the whole export
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            yield rows
+        conn.commit()
+
+
+def export_records(table, start=None, end=None, chunk=CHUNK):
+    """Yield rows of `table` as dicts in id order, optionally filtered by date/timestamp.
+
+    Rows are stepped from one open statement and fetched `chunk` at a time,
+    so memory stays flat however large the table is. The read runs in one
+    snapshot; writes made meanwhile are not included.
+    """
+    for rows in _export_chunks(table, start, end, chunk):
+        for r in rows:
+            yield dict(r)
+
+
+def _export_text(table, fmt, start, end, chunk):
+    # (text, rows) per chunk; the CSV header comes with the first chunk
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(_spec(table)["columns"])
+        for rows in _export_chunks(table, start, end, chunk):
+            writer.writerows(rows)
+            yield buf.getvalue(), len(rows)
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue(), 0
+    else:
+        for rows in _export_chunks(table, start, end, chunk, as_json=True):
+            yield "".join(r[0] + "\n" for r in rows), len(rows)
+
+
+def export_lines(table, fmt="jsonl", start=None, end=None, chunk=CHUNK):
+    """Yield the export as text, one chunk of CSV or JSONL lines at a time (for streaming responses)."""
+    for text, _ in _export_text(table, fmt, start, end, chunk):
+        yield text
+
+
+@instrument(rows=lambda args, result: result)
+def export_file(table, path, fmt=None, start=None, end=None, chunk=CHUNK):
+    """Write `table` to a CSV/JSONL file (written to <path>.tmp, then renamed); returns rows written."""
+    fmt = fmt or detect_format(path)
+    tmp = path if path == "-" else f"{path}.tmp"
+    n = 0
+    with _open(tmp, "w", gz=path.endswith(".gz")) as f:
+        for text, rows in _export_text(table, fmt, start, end, chunk):
+            f.write(text)
+            n += rows
+    if tmp != path:
+        os.replace(tmp, path)
+    return n
+
+
+# -----------------------------
+# STATUS
+# -----------------------------
+def pending_imports():
+    with _pool().connection() as conn:
+        return [dict(r) for r in conn.execute("SELECT * FROM import_progress ORDER BY updated_at")]
+
+
+def repair_indexes():
+    """Rebuild indexes left dropped by killed imports; returns the index names rebuilt."""
+    pool = _pool()
+    rebuilt = []
+    for job in pending_imports():
+        dropped = [tuple(i) for i in json.loads(job["dropped_indexes"])]
+        if dropped:
+            _rebuild_indexes(pool, dropped)
+            with pool.transaction() as conn:
+                conn.execute("UPDATE import_progress SET dropped_indexes = '[]' WHERE job = ?", (job["job"],))
+            rebuilt += [name for name, _ in dropped]
+    return rebuilt
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Stream history, appointments and users in and out as CSV/JSONL")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import a file (resumes an interrupted import of the same file)")
+    imp.add_argument("table", choices=sorted(TABLES))
+    imp.add_argument("path", help="file to read, or - for stdin")
+    imp.add_argument("--format", choices=["csv", "jsonl"])
+    imp.add_argument("--chunk", type=int, default=CHUNK)
+    idx = imp.add_mutually_exclusive_group()
+    idx.add_argument("--defer-indexes", dest="defer", action="store_true", default=None)
+    idx.add_argument("--keep-indexes", dest="defer", action="store_false")
+    exp = sub.add_parser("export", help="export a table")
+    exp.add_argument("table", choices=sorted(TABLES))
+    exp.add_argument("path", help="file to write, or - for stdout")
+    exp.add_argument("--format", choices=["csv", "jsonl"])
+    exp.add_argument("--start", help="first date/timestamp to include")
+    exp.add_argument("--end", help="last date/timestamp to include")
+    status = sub.add_parser("status", help="list unfinished imports")
+    status.add_argument("--repair", action="store_true", help="rebuild indexes dropped by killed imports")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "import":
+        def report(stats):
+            print(f"\r{stats['read'] + stats['skipped']} read, {stats['imported']} imported", end="", file=sys.stderr)
+
+        stats = import_file(args.table, args.path, args.format, args.defer, args.chunk, report)
+        print(file=sys.stderr)
+        print(json.dumps(dict(stats, seconds=round(time.perf_counter() - started, 2))))
+    elif args.command == "export":
+        n = export_file(args.table, args.path, args.format, args.start, args.end)
+        print(json.dumps({"exported": n, "seconds": round(time.perf_counter() - started, 2)}), file=sys.stderr)
+    else:
+        if args.repair:
+            print("rebuilt:", repair_indexes() or "nothing to do")
+        for job in pending_imports():
+            print(f"{job['job']}  {job['table_name']:<12} {job['rows_read']:>10} read  {job['source']}")
+
+
+if __name__ == "__main__":
+    main()
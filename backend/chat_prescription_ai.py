@@ -1,30 +1,186 @@
 # backend/chat_prescription_ai.py
+import csv
 import os
-import pandas as pd
+import re
+import threading
+import time
+from collections import namedtuple
+
+from backend.metrics import instrument, log_error
+from backend.result_cache import get_result_cache
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_PATH = os.path.join(BASE_DIR, "..", "data", "prescription_data.csv")  # project/data/prescription_data.csv
 
-# Load CSV once; if missing, fallback to minimal table
-try:
-    df = pd.read_csv(CSV_PATH)
-except Exception as e:
-    df = pd.DataFrame([
-        {"symptom_keyword": "fever", "diagnosis": "Likely Viral Fever", "medicine_1": "Paracetamol", "med1_dosage": "500mg — 1 tablet twice daily",
-         "medicine_2": "ORS", "med2_dosage": "As needed", "medicine_3": "Rest", "med3_dosage": "—"}
-    ])
+RELOAD_CHECK_INTERVAL = 2.0   # seconds between CSV mtime checks
+MAX_MATCHES = 5
 
-def chat_to_prescription(user_text: str):
-    user_text = (user_text or "").lower()
-    for _, row in df.iterrows():
-        kw = str(row.get("symptom_keyword","")).lower()
-        if kw and kw in user_text:
+# One compact record per CSV row; medicines are preformatted "Name — dosage" strings.
+Rule = namedtuple("Rule", "keyword tokens diagnosis medicines")
+
+FALLBACK_ROWS = [
+    {"symptom_keyword": "fever", "diagnosis": "Likely Viral Fever", "medicine_1": "Paracetamol", "med1_dosage": "500mg — 1 tablet twice daily",
+     "medicine_2": "ORS", "med2_dosage": "As needed", "medicine_3": "Rest", "med3_dosage": "—"}
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    # light plural folding so a "headaches" keyword is stored as "headache"
+    return [t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+            for t in _TOKEN_RE.findall((text or "").lower())]
+
+
+def keyword_stem(token):
+    # "vomiting" is stored as "vomit", so vomit/vomits/vomited match it by prefix too
+    for suffix in ("ing", "ed"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+# -----------------------------
+# INDEX
+# -----------------------------
+def _node():
+    # rules: ids of keywords ending here; next: token -> child; lengths: distinct len(token) in next
+    return {"rules": [], "next": {}, "lengths": ()}
+
+
+def _finish(node):
+    node["lengths"] = tuple(sorted({len(t) for t in node["next"]}))
+    for child in node["next"].values():
+        _finish(child)
+
+
+class PrescriptionIndex:
+    """Keyword index over prescription rows: a trie over each keyword's tokens.
+
+    A word matches a keyword token it starts with, so inflected forms still
+    hit ("coughing" -> cough, "feverish" -> fever, "colder" -> cold), as
+    with the substring test this index replaced, but a keyword inside a word
+    does not ("scold" is not cold). Keyword tokens are stemmed first
+    (keyword_stem), so "vomited" also hits a "vomiting" keyword.
+    """
+
+    def __init__(self, rows, mtime=None):
+        self.mtime = mtime
+        self.rules = []
+        self.root = _node()
+        for row in rows:
+            kw = str(row.get("symptom_keyword") or "").strip().lower()
+            tokens = tuple(keyword_stem(t) for t in tokenize(kw))
+            if not tokens:
+                continue
             meds = []
-            for i in [1,2,3]:
-                med = row.get(f"medicine_{i}", None)
-                dose = row.get(f"med{i}_dosage", "")
-                if med and str(med).strip():
+            for i in [1, 2, 3]:
+                med = row.get(f"medicine_{i}") or ""
+                dose = row.get(f"med{i}_dosage") or ""
+                if med.strip():
                     meds.append(f"{med} — {dose}".strip())
-            return {"diagnosis": row.get("diagnosis", "Uncertain"), "medicines": meds or ["Please consult a doctor."]}
+            rule_id = len(self.rules)
+            self.rules.append(Rule(kw, tokens, row.get("diagnosis") or "Uncertain", tuple(meds)))
+            node = self.root
+            for t in tokens:
+                node = node["next"].setdefault(t, _node())
+            node["rules"].append(rule_id)
+        _finish(self.root)
+
+    def match(self, text, limit=MAX_MATCHES):
+        """Ranked rules: most keyword hits first, then earliest mention, then CSV order."""
+        tokens = tokenize(text)
+        hits = {}   # rule_id -> [count, first_position]
+        for pos in range(len(tokens)):
+            level = [self.root]
+            for tok in tokens[pos:]:
+                # children whose token this word starts with: one dict probe per distinct length
+                level = [child for node in level for n in node["lengths"] if n <= len(tok)
+                         for child in (node["next"].get(tok[:n]),) if child is not None]
+                if not level:
+                    break
+                for node in level:
+                    for rule_id in node["rules"]:
+                        if rule_id in hits:
+                            hits[rule_id][0] += 1
+                        else:
+                            hits[rule_id] = [1, pos]
+        ranked = sorted(hits, key=lambda r: (-hits[r][0], hits[r][1], r))
+        return [(self.rules[r], hits[r][0]) for r in ranked[:limit]]
+
+
+def load_index(path=CSV_PATH):
+    mtime = None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    except Exception as e:
+        log_error("chat_prescription_ai.load_index", e)
+        # tagged with the mtime that failed, so maybe_reload() retries only
+        # once the file changes again
+        return PrescriptionIndex(FALLBACK_ROWS, mtime)
+    return PrescriptionIndex(rows, mtime)
+
+
+# -----------------------------
+# HOT RELOAD
+# -----------------------------
+_index = load_index()
+_last_check = time.monotonic()
+_reloading = threading.Lock()
+
+
+def _rebuild():
+    global _index
+    try:
+        _index = load_index()
+    finally:
+        _reloading.release()
+
+
+def maybe_reload():
+    """Rebuild the index in the background if the CSV changed; never blocks callers."""
+    global _last_check
+    now = time.monotonic()
+    if now - _last_check < RELOAD_CHECK_INTERVAL:
+        return
+    _last_check = now
+    try:
+        mtime = os.stat(CSV_PATH).st_mtime_ns
+    except OSError:
+        return
+    if mtime != _index.mtime and _reloading.acquire(blocking=False):
+        threading.Thread(target=_rebuild, name="prescription-index-reload", daemon=True).start()
+
+
+def get_index():
+    maybe_reload()
+    return _index
+
+
+# -----------------------------
+# CHAT → PRESCRIPTION
+# -----------------------------
+@instrument()
+def chat_to_prescription(user_text: str):
+    # keyed on the index's CSV mtime too, so a background reload can never
+    # leave answers from the previous CSV in the shared cache
+    index = get_index()
+    return get_result_cache().get_or_compute("prescription", user_text, lambda: _prescribe(index, user_text), index.mtime)
+
+
+def _prescribe(index, user_text):
+    matches = index.match(user_text)
+    if matches:
+        best = matches[0][0]
+        return {
+            "diagnosis": best.diagnosis,
+            "medicines": list(best.medicines) or ["Please consult a doctor."],
+            "matches": [
+                {"keyword": rule.keyword, "diagnosis": rule.diagnosis, "medicines": list(rule.medicines), "score": score}
+                for rule, score in matches
+            ],
+        }
     # default
-    return {"diagnosis": "Could not detect a clear condition", "medicines": ["Please consult a doctor for an accurate prescription."]}
+    return {"diagnosis": "Could not detect a clear condition", "medicines": ["Please consult a doctor for an accurate prescription."], "matches": []}
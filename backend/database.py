@@ -1,165 +1,400 @@
 # backend/database.py
-import sqlite3
-import os
+import glob
 import hashlib
+import json
+import os
+import re
 from datetime import datetime
 
-# -----------------------------
-# PATH SETTINGS
-# -----------------------------
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "healthcare.db")
+from backend.db_pool import DB_PATH, get_pool, init_once, pool_stats
+from backend.history_archive import read_archived, search_archived, snippet
+from backend.metrics import instrument, log_error, one_row, result_rows
+from backend.migrations import ensure_schema
+from backend.read_cache import bump_versions, get_read_cache, history_deps, user_history
+from backend.write_behind import WriteBehindQueue
+
+
+def ensure_db():
+    """Check the schema version on first use (once per process), migrating if behind."""
+    init_once("schema", ensure_schema)
 
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Borrow a pooled connection: `with get_connection() as conn: ...`"""
+    ensure_db()
+    return get_pool().connection()
 
 
-# -----------------------------
-# PASSWORD HASHING
-# -----------------------------
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+def get_transaction():
+    """Borrow a pooled connection inside a write transaction (BEGIN IMMEDIATE)."""
+    ensure_db()
+    return get_pool().transaction()
 
 
-# -----------------------------
-# DATABASE INITIALIZATION
-# -----------------------------
-def init_db():
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # Users table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            password TEXT,
-            created_at TEXT
-        )
-    """)
-
-    # History table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT,
-            event_type TEXT,
-            content TEXT,
-            timestamp TEXT
-        )
-    """)
-
-    # Appointments table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS appointments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            date TEXT,
-            time TEXT,
-            notes TEXT,
-            created_at TEXT
-        )
-    """)
+HISTORY_PAGE_SIZE = 50
 
-    conn.commit()
-    conn.close()
+# Optional write-behind mode for add_history (see enable_write_behind).
+WRITE_BEHIND = os.environ.get("HEALTHCARE_WRITE_BEHIND") == "1"
+# Batches the writer gives up on are saved here for replay_history_dead_letter().
+HISTORY_DEAD_LETTER = os.environ.get(
+    "HEALTHCARE_DEAD_LETTER", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "dead_letter", "history")
+)
+_history_writer = None
 
 
-# Initialize DB on import
-init_db()
+# -----------------------------
+# PASSWORD HASHING
+# -----------------------------
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
 
 
 # -----------------------------
 # USER MANAGEMENT
 # -----------------------------
+@instrument(rows=one_row)
 def add_user(username: str, password: str) -> bool:
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
         hashed = hash_password(password)
 
-        cur.execute("""
-            INSERT INTO users (username, password, created_at)
-            VALUES (?, ?, ?)
-        """, (username, hashed, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        with get_transaction() as conn:
+            conn.execute("""
+                INSERT INTO users (username, password, created_at)
+                VALUES (?, ?, ?)
+            """, (username, hashed, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
 
-        conn.commit()
-        conn.close()
         return True
 
     except Exception as e:
-        print("add_user error:", e)
+        log_error("database.add_user", e)
         return False
 
 
+@instrument(rows=one_row)
 def validate_user(username: str, password: str) -> bool:
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
         hashed = hash_password(password)
 
-        cur.execute("""
-            SELECT * FROM users
-            WHERE username = ? AND password = ?
-        """, (username, hashed))
+        with get_connection() as conn:
+            user = conn.execute("""
+                SELECT 1 FROM users
+                WHERE username = ? AND password = ?
+            """, (username, hashed)).fetchone()
 
-        user = cur.fetchone()
-        conn.close()
         return user is not None
 
     except Exception as e:
-        print("validate_user error:", e)
+        log_error("database.validate_user", e)
         return False
 
 
 # -----------------------------
 # HISTORY
 # -----------------------------
-def add_history(username: str, event_type: str, content: str):
-    try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
+@instrument("database.insert_history_rows", rows=lambda args, result: len(args[0]))
+def _insert_history_rows(rows):
+    with get_transaction() as conn:
+        conn.executemany("""
             INSERT INTO history (username, event_type, content, timestamp)
             VALUES (?, ?, ?, ?)
-        """, (
-            username,
-            event_type,
-            content,
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ))
-
-        conn.commit()
-        conn.close()
+        """, rows)
+        bump_versions(conn, *(user_history(r[0]) for r in rows))
+
+
+@instrument()
+def add_history(username: str, event_type: str, content: str):
+    row = (username, event_type, content, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    # Write-behind: queued rows become visible to readers after the next flush.
+    if _history_writer is not None and _history_writer.put(row):
+        return True
+
+    try:
+        _insert_history_rows([row])
         return True
 
     except Exception as e:
-        print("add_history error:", e)
+        log_error("database.add_history", e)
         return False
 
 
-def get_history(username: str):
+def enable_write_behind(batch_size: int = 500, flush_interval_ms: int = 50, max_queue: int = 10000):
+    """Route add_history through a background group-commit writer."""
+    global _history_writer
+    if _history_writer is None:
+        _history_writer = WriteBehindQueue(
+            _insert_history_rows,
+            name="history-writer",
+            max_queue=max_queue,
+            batch_size=batch_size,
+            flush_interval_ms=flush_interval_ms,
+            dead_letter=HISTORY_DEAD_LETTER,
+        )
+    return _history_writer
+
+
+def disable_write_behind():
+    """Flush queued history rows and go back to synchronous inserts."""
+    global _history_writer
+    writer, _history_writer = _history_writer, None
+    if writer is not None:
+        writer.close()
+
+
+def flush_history():
+    """Wait until every queued history row is committed (no-op when synchronous)."""
+    if _history_writer is not None:
+        _history_writer.flush()
+
+
+def history_writer_stats():
+    """Queue depth, flush latency and row counters; None when write-behind is off.
+
+    failed_rows counts rows whose batch failed every retry; they are in the
+    dead letter (dead_letter_rows) unless saving them failed too, in which
+    case they were written to the log.
+    """
+    return _history_writer.stats() if _history_writer is not None else None
+
+
+def _dead_letter_files():
+    return sorted(glob.glob(os.path.join(HISTORY_DEAD_LETTER, "*.jsonl")))
+
+
+def pending_history_dead_letter():
+    """Rows waiting in the history dead letter (from any process)."""
+    total = 0
+    for path in _dead_letter_files():
+        with open(path, encoding="utf-8") as f:
+            total += sum(1 for line in f if line.strip())
+    return total
+
+
+def replay_history_dead_letter():
+    """Insert the rows of every dead-letter file, one transaction per file; returns rows written.
+
+    A file is deleted once its rows are committed. A failure stops the replay
+    and leaves that file and the ones after it for the next attempt.
+    """
+    written = 0
+    for path in _dead_letter_files():
+        with open(path, encoding="utf-8") as f:
+            rows = [tuple(json.loads(line)) for line in f if line.strip()]
+        if rows:
+            _insert_history_rows(rows)
+        os.remove(path)
+        written += len(rows)
+    return written
+
+
+if WRITE_BEHIND:
+    enable_write_behind()
+
+
+def _ts_bound(value, end=False):
+    """Normalise a date/datetime/str filter to the stored 'YYYY-MM-DD HH:MM:SS' text."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    value = str(value).strip()
+    if len(value) == 10:   # bare date: whole day
+        return value + (" 23:59:59" if end else " 00:00:00")
+    return value
+
+
+def history_cursor(row) -> str:
+    """Keyset cursor for the row a page ended on; pass it back as before=."""
+    return f"{row['timestamp']}|{row['id']}"
+
+
+def next_history_cursor(rows, limit):
+    """Cursor for the following page, or None when this was the last page."""
+    if limit and len(rows) == limit:
+        return history_cursor(rows[-1])
+    return None
+
+
+@instrument(rows=result_rows)
+def get_history(username: str, limit: int = None, before: str = None,
+                event_type: str = None, start=None, end=None):
+    """History rows for a user, newest first.
+
+    limit/before give keyset pagination: pass next_history_cursor(rows, limit)
+    as before= to fetch the next page. event_type and the start/end date
+    range filter the rows. With no limit every matching row is returned.
+    Rows moved to history_archive are merged in transparently. Results come
+    from the read cache (backend/read_cache.py) while the user's history is
+    unchanged; the returned list is shared, so do not modify it.
+    """
+    try:
+        start, end = _ts_bound(start), _ts_bound(end, end=True)
+        return get_read_cache().get_or_load(
+            ("history", username, limit and int(limit), before, event_type, start, end),
+            history_deps(username),
+            lambda: _query_history(username, limit, before, event_type, start, end),
+        )
+
+    except Exception as e:
+        log_error("database.get_history", e)
+        return []
+
+
+def _query_history(username, limit, before, event_type, start, end):
+    sql = """
+        SELECT id, username, event_type, content, timestamp
+        FROM history
+        WHERE username = ?
+    """
+    params = [username]
+    before_key = None
+
+    if before:
+        ts, _, row_id = before.rpartition("|")
+        before_key = (ts, int(row_id))
+        sql += " AND (timestamp, id) < (?, ?)"
+        params += list(before_key)
+    if event_type:
+        sql += " AND event_type = ?"
+        params.append(event_type)
+    if start is not None:
+        sql += " AND timestamp >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND timestamp <= ?"
+        params.append(end)
+
+    sql += " ORDER BY timestamp DESC, id DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+
+    with get_connection() as conn:
+        rows = [dict(r) for r in conn.execute(sql, params)]
+        # a full page only needs archive blocks reaching its oldest row
+        floor = rows[-1]["timestamp"] if limit and len(rows) == int(limit) else None
+        archived = read_archived(conn, username, limit and int(limit), before_key, event_type, start, end, floor)
+
+    if archived:
+        rows = sorted(rows + archived, key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+        if limit:
+            rows = rows[:int(limit)]
+    return rows
+
+
+@instrument(rows=result_rows)
+def get_history_usernames():
+    """Every username that has history rows, hot or archived (walks the username indexes)."""
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT username, event_type, content, timestamp 
-            FROM history
-            WHERE username = ?
-            ORDER BY timestamp DESC
-        """, (username,))
-
-        rows = cur.fetchall()
-        conn.close()
+        with get_connection() as conn:
+            rows = conn.execute("""
+                SELECT username FROM history
+                UNION
+                SELECT username FROM history_archive
+                ORDER BY username
+            """).fetchall()
+        return [r["username"] for r in rows]
+
+    except Exception as e:
+        log_error("database.get_history_usernames", e)
+        return []
+
+
+@instrument(rows=result_rows)
+def get_history_since(event_type: str, after_id: int, limit: int = 256):
+    """Rows of one event type with id > after_id, oldest first (for incremental consumers).
+
+    Hot rows only: consumers poll far more often than rows age into the archive.
+    """
+    try:
+        with get_connection() as conn:
+            rows = conn.execute("""
+                SELECT id, username, event_type, content, timestamp
+                FROM history
+                WHERE event_type = ? AND id > ?
+                ORDER BY id ASC
+                LIMIT ?
+            """, (event_type, after_id, limit)).fetchall()
+
         return [dict(r) for r in rows]
 
     except Exception as e:
-        print("get_history error:", e)
-        return []
\ No newline at end of file
+        log_error("database.get_history_since", e)
+        return []
+
+
+# -----------------------------
+# SEARCH
+# -----------------------------
+SEARCH_LIMIT = 20
+_WORD = re.compile(r"\w+")
+
+
+def _fts_phrase(words):
+    return '"' + " ".join(words) + '"'
+
+
+def _search_unindexed(conn, username, terms, limit, marks):
+    # rows older than the full-text index that its background backfill
+    # (backend/migrations.py) has not reached yet, scanned like the archive
+    boundary, last_id = conn.execute("SELECT boundary, last_id FROM history_fts_state").fetchone()
+    if last_id >= boundary:
+        return []
+    sql = (
+        "SELECT id, username, event_type, timestamp, content FROM history WHERE username = ? AND id > ? AND id <= ?"
+        + " AND content LIKE ? ESCAPE '\\'" * len(terms)
+        + " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    )
+    likes = ["%" + t.replace("_", "\\_") + "%" for t in terms]
+    out = []
+    for r in conn.execute(sql, (username, last_id, boundary, *likes, limit)):
+        row = dict(r)
+        row["snippet"] = snippet(row.pop("content") or "", terms[0], marks)
+        row["score"] = None
+        out.append(row)
+    return out
+
+
+@instrument(rows=result_rows)
+def search_history(username: str, query: str, limit: int = SEARCH_LIMIT, order: str = "rank",
+                   marks=("[", "]"), include_archive: bool = True):
+    """Full-text search over one user's history; best matches first (order="recent": newest first).
+
+    Every word of `query` must appear (stemmed, case-insensitive); punctuation
+    is ignored, so free text like "chest pain?" is safe. Rows carry a `snippet`
+    with the matched words wrapped in `marks`, and `score` (bm25, lower is
+    better). Archived rows, which are not in the index, are scanned when the
+    index returns fewer than `limit` matches; so are rows the index's
+    background backfill has not reached yet.
+    """
+    terms = _WORD.findall(query.lower())
+    if not terms:
+        return []
+    try:
+        # restricting the username column inside the MATCH keeps the work
+        # proportional to this user's rows, not to every row with the word
+        match = " AND ".join(filter(None, [
+            f"username : {_fts_phrase(_WORD.findall(username))}" if _WORD.search(username) else None,
+            "content : (" + " ".join(_fts_phrase([t]) for t in terms) + ")",
+        ]))
+        sql = f"""
+            SELECT h.id, h.username, h.event_type, h.timestamp,
+                   snippet(history_fts, 1, ?, ?, '…', 16) AS snippet,
+                   bm25(history_fts, 0.0, 1.0) AS score
+            FROM history_fts
+            JOIN history h ON h.id = history_fts.rowid
+            WHERE history_fts MATCH ? AND h.username = ?
+            ORDER BY {"h.timestamp DESC, h.id DESC" if order == "recent" else "score"}
+            LIMIT ?
+        """
+        with get_connection() as conn:
+            rows = [dict(r) for r in conn.execute(sql, (marks[0], marks[1], match, username, int(limit)))]
+            if len(rows) < limit:
+                rows += _search_unindexed(conn, username, terms, int(limit) - len(rows), marks)
+            if include_archive and len(rows) < limit:
+                rows += search_archived(conn, username, terms, int(limit) - len(rows), marks)
+        return rows
+
+    except Exception as e:
+        log_error("database.search_history", e)
+        return []
@@ -0,0 +1,213 @@
+# backend/db_pool.py — shared SQLite connection pool for database.py and appointments.py
+#
+# Connections are opened once, tuned (WAL journal, synchronous=NORMAL, larger
+# page cache, busy timeout) and reused across calls and Streamlit sessions
+# instead of a connect/close per function call. Writers take the lock up
+# front with BEGIN IMMEDIATE and retry with backoff if SQLite reports
+# "database is locked" after the busy timeout.
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("HEALTHCARE_DB", os.path.join(BASE_DIR, "healthcare.db"))
+
+POOL_SIZE = int(os.environ.get("HEALTHCARE_DB_POOL_SIZE", 8))
+CHECKOUT_TIMEOUT = 30.0     # seconds to wait for a free connection
+BUSY_TIMEOUT_MS = 5000
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05         # seconds, doubled per retry
+
+PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),   # safe with WAL; fsync at checkpoints, not every commit
+    ("cache_size", -16000),      # ~16 MB page cache per connection
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", BUSY_TIMEOUT_MS),
+]
+
+
+def is_locked_error(e):
+    return isinstance(e, sqlite3.OperationalError) and "locked" in str(e).lower()
+
+
+class ConnectionPool:
+    def __init__(self, path=DB_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_ms": 0.0,
+            "lock_retries": 0,
+            "lock_failures": 0,
+            "in_use": 0,
+        }
+
+    # -----------------------------
+    # CONNECTIONS
+    # -----------------------------
+    def connect(self):
+        """Open a new tuned connection (autocommit; transactions are explicit)."""
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _checkout(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self.connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                start = time.perf_counter()
+                conn = self._idle.get(timeout=CHECKOUT_TIMEOUT)
+                with self._lock:
+                    self._stats["waits"] += 1
+                    self._stats["wait_ms"] += (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+        return conn
+
+    def _checkin(self, conn, broken=False):
+        with self._lock:
+            self._stats["in_use"] -= 1
+        if broken:
+            with self._lock:
+                self._created -= 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection for reads (or hand-managed writes)."""
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        finally:
+            if not broken and conn.in_transaction:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    broken = True
+            self._checkin(conn, broken)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection inside BEGIN IMMEDIATE … COMMIT (rolled back on error)."""
+        with self.connection() as conn:
+            self._begin(conn)
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def _begin(self, conn):
+        delay = LOCK_BACKOFF
+        for attempt in range(LOCK_RETRIES + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not is_locked_error(e) or attempt == LOCK_RETRIES:
+                    if is_locked_error(e):
+                        with self._lock:
+                            self._stats["lock_failures"] += 1
+                    raise
+                with self._lock:
+                    self._stats["lock_retries"] += 1
+                time.sleep(delay)
+                delay *= 2
+
+    # -----------------------------
+    # STATS / LIFECYCLE
+    # -----------------------------
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["size"] = self.size
+            out["open"] = self._created
+        out["idle"] = self._idle.qsize()
+        out["wait_ms"] = round(out["wait_ms"], 3)
+        return out
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    """Process-wide pool for a database file (defaults to DB_PATH)."""
+    path = os.path.abspath(path or DB_PATH)
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+
+def pool_stats():
+    """Checkout / wait / lock-retry counters of every open pool, keyed by database path."""
+    return {path: pool.stats() for path, pool in list(_pools.items())}
+
+
+# -----------------------------
+# ONE-TIME SCHEMA SETUP
+# -----------------------------
+_initialised = set()
+_init_lock = threading.Lock()
+
+
+def init_once(name, init_fn, path=None):
+    """Run init_fn() once per process and database file; later calls are a set lookup.
+
+    Modules call this on first use instead of running DDL at import time. If
+    init_fn raises, it is retried on the next call.
+    """
+    key = (name, os.path.abspath(path or DB_PATH))
+    if key in _initialised:
+        return
+    with _init_lock:
+        if key not in _initialised:
+            init_fn()
+            _initialised.add(key)
@@ -0,0 +1,276 @@
+# backend/history_archive.py — hot/cold split of the history table
+#
+# history holds recent ("hot") events. archive_history() moves events older
+# than ARCHIVE_AFTER_DAYS into history_archive as per-user blocks of up to
+# BLOCK_ROWS events, stored as zlib-compressed JSON. Each user's chunk is
+# copied and deleted in one short transaction, so readers never see an event
+# twice or lose one, and other writers get the lock between chunks. The hot
+# table and its (username, timestamp) index keep only recent rows.
+#
+# database.get_history() reads the archive through read_archived() whenever a
+# page can reach older rows, so callers see one history. Newest-first pages
+# that are filled by hot rows cost one extra index probe here.
+#
+# Run from cron, or in-process with start_archiver():
+#     python -m backend.history_archive [--older-than-days 180] [--vacuum] [--measure]
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from backend.metrics import instrument, log_error
+from backend.read_cache import bump_versions, user_history
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get("HEALTHCARE_ARCHIVE_DAYS", 180))
+ARCHIVE_INTERVAL = 6 * 3600     # seconds between background runs
+BLOCK_ROWS = 500
+MOVE_CHUNK = 5000               # rows moved per transaction
+COMPRESS_LEVEL = 6
+
+_archiver = None
+_archiver_lock = threading.Lock()
+
+
+# -----------------------------
+# BLOCKS
+# -----------------------------
+def encode_block(rows):
+    """rows: (id, event_type, content, timestamp) oldest first -> compressed blob and its raw size."""
+    raw = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return zlib.compress(raw, COMPRESS_LEVEL), len(raw)
+
+
+def decode_block(data, username):
+    return [
+        {"id": row_id, "username": username, "event_type": event_type, "content": content, "timestamp": ts}
+        for row_id, event_type, content, ts in json.loads(zlib.decompress(data))
+    ]
+
+
+# -----------------------------
+# READ PATH
+# -----------------------------
+def read_archived(conn, username, limit=None, before=None, event_type=None, start=None, end=None, floor=None):
+    """Archived rows for get_history, newest first (at most `limit` if given).
+
+    before is a (timestamp, id) key; start/end are normalised timestamps.
+    floor skips blocks that end before that timestamp: get_history passes the
+    oldest hot row of a full page, since older blocks cannot make the page.
+    """
+    sql = "SELECT last_ts, data FROM history_archive WHERE username = ?"
+    params = [username]
+    lower = max(filter(None, (start, floor)), default=None)
+    if lower:
+        sql += " AND last_ts >= ?"
+        params.append(lower)
+    upper = min(filter(None, (end, before[0] if before else None)), default=None)
+    if upper:
+        sql += " AND first_ts <= ?"
+        params.append(upper)
+    sql += " ORDER BY last_ts DESC"
+
+    out = []
+    for block in conn.execute(sql, params):
+        # blocks come newest-ending first: once `limit` rows are newer than
+        # everything this block holds, no later block can change the page
+        if limit and len(out) >= limit and block["last_ts"] < out[limit - 1]["timestamp"]:
+            break
+        for row in decode_block(block["data"], username):
+            if before and (row["timestamp"], row["id"]) >= before:
+                continue
+            if event_type and row["event_type"] != event_type:
+                continue
+            if (start and row["timestamp"] < start) or (end and row["timestamp"] > end):
+                continue
+            out.append(row)
+        out.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+    return out[:limit] if limit else out
+
+
+def snippet(text, term, marks=("[", "]")):
+    """Up to 60 characters either side of the first `term` in text, wrapped in marks."""
+    at = text.lower().find(term)
+    lo, hi = max(0, at - 60), at + len(term)
+    return (
+        ("…" if lo else "") + text[lo:at] + marks[0] + text[at:hi] + marks[1]
+        + text[hi:hi + 60] + ("…" if hi + 60 < len(text) else "")
+    )
+
+
+def search_archived(conn, username, terms, limit, marks=("[", "]")):
+    """Archived rows whose content contains every term (case-insensitive), newest first.
+
+    The archive is not in the full-text index; a user's blocks are few, so
+    they are decompressed and scanned. Each row gets a short snippet with
+    the first term found wrapped in `marks`.
+    """
+    terms = [t.lower() for t in terms]
+    out = []
+    for block in conn.execute(
+        "SELECT data FROM history_archive WHERE username = ? ORDER BY last_ts DESC", (username,)
+    ):
+        for row in reversed(decode_block(block["data"], username)):
+            text = row["content"] or ""
+            lower = text.lower()
+            if not all(t in lower for t in terms):
+                continue
+            row["snippet"] = snippet(text, terms[0], marks)
+            row["score"] = None
+            del row["content"]
+            out.append(row)
+            if len(out) >= limit:
+                return out
+    return out
+
+
+# -----------------------------
+# COMPACTION
+# -----------------------------
+@instrument(rows=lambda args, result: result["rows"])
+def archive_history(older_than_days=ARCHIVE_AFTER_DAYS, block_rows=BLOCK_ROWS, chunk=MOVE_CHUNK, now=None):
+    """Move history rows older than the cutoff into compressed per-user blocks.
+
+    Returns counts: rows, blocks, users, raw_bytes (JSON before compression)
+    and stored_bytes (compressed). Safe to run concurrently with the app and
+    to rerun; an interrupted run leaves every row in exactly one table.
+    """
+    from backend.database import get_connection, get_transaction
+
+    cutoff = ((now or datetime.now()) - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+    stats = {"rows": 0, "blocks": 0, "users": 0, "raw_bytes": 0, "stored_bytes": 0, "cutoff": cutoff}
+
+    with get_connection() as conn:
+        users = [r[0] for r in conn.execute("SELECT DISTINCT username FROM history WHERE timestamp < ?", (cutoff,))]
+
+    for username in users:
+        while True:
+            with get_transaction() as conn:
+                rows = conn.execute("""
+                    SELECT id, event_type, content, timestamp FROM history
+                    WHERE username = ? AND timestamp < ?
+                    ORDER BY timestamp, id
+                    LIMIT ?
+                """, (username, cutoff, chunk)).fetchall()
+                for i in range(0, len(rows), block_rows):
+                    block = [tuple(r) for r in rows[i:i + block_rows]]
+                    data, raw_bytes = encode_block(block)
+                    conn.execute("""
+                        INSERT INTO history_archive (username, first_ts, last_ts, row_count, raw_bytes, data)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (username, block[0][3], block[-1][3], len(block), raw_bytes, data))
+                    stats["blocks"] += 1
+                    stats["raw_bytes"] += raw_bytes
+                    stats["stored_bytes"] += len(data)
+                conn.executemany("DELETE FROM history WHERE id = ?", [(r["id"],) for r in rows])
+                # pages read the same either way, but cached ones were built
+                # from the hot table; let them reload (backend/read_cache.py)
+                bump_versions(conn, user_history(username))
+            stats["rows"] += len(rows)
+            if len(rows) < chunk:
+                break
+        stats["users"] += 1
+    return stats
+
+
+def vacuum():
+    """Return the pages freed by archiving to the filesystem (rewrites the file; takes the write lock)."""
+    from backend.database import get_connection
+
+    with get_connection() as conn:
+        conn.execute("VACUUM")
+
+
+def archive_report():
+    """Hot and archived row counts, compression and per-table on-disk size."""
+    from backend.database import get_connection
+
+    with get_connection() as conn:
+        hot = conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        arch = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(row_count), 0), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(LENGTH(data)), 0) FROM history_archive"
+        ).fetchone()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        report = {
+            "hot_rows": hot,
+            "archived_rows": arch[1],
+            "archive_blocks": arch[0],
+            "archive_raw_bytes": arch[2],
+            "archive_stored_bytes": arch[3],
+            "compression_ratio": round(arch[2] / arch[3], 2) if arch[3] else None,
+            "file_bytes": conn.execute("PRAGMA page_count").fetchone()[0] * page_size,
+            "free_bytes": conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+        }
+        try:
+            # dbstat is optional in SQLite builds
+            report["table_bytes"] = {
+                r[0]: r[1] for r in conn.execute(
+                    "SELECT name, SUM(pgsize) FROM dbstat WHERE name LIKE 'history%' OR name LIKE 'idx_history%' GROUP BY name"
+                )
+            }
+        except Exception:
+            report["table_bytes"] = None
+    return report
+
+
+# -----------------------------
+# BACKGROUND
+# -----------------------------
+def _archive_loop(interval, older_than_days, stop):
+    while not stop.wait(interval):
+        try:
+            archive_history(older_than_days)
+        except Exception as e:
+            log_error("history_archive.archive_history", e)
+
+
+def start_archiver(interval=ARCHIVE_INTERVAL, older_than_days=ARCHIVE_AFTER_DAYS):
+    """Start the background compaction thread once per process; returns its stop event."""
+    global _archiver
+    with _archiver_lock:
+        if _archiver is None:
+            stop = threading.Event()
+            thread = threading.Thread(target=_archive_loop, args=(interval, older_than_days, stop), name="history-archiver", daemon=True)
+            thread.start()
+            _archiver = (thread, stop)
+    return _archiver[1]
+
+
+def _hot_latency(users, repeat=3):
+    """p50/p95 ms of the first history page (limit 50) across users."""
+    from backend.database import get_history
+
+    timings = []
+    for _ in range(repeat):
+        for u in users:
+            t = time.perf_counter()
+            get_history(u, limit=50)
+            timings.append((time.perf_counter() - t) * 1000)
+    timings.sort()
+    return {"p50_ms": round(timings[len(timings) // 2], 3), "p95_ms": round(timings[int(len(timings) * 0.95)], 3)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from backend.database import get_history_usernames
+
+    parser = argparse.ArgumentParser(description="Move old history into compressed per-user archive blocks")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--vacuum", action="store_true", help="shrink the file afterwards")
+    parser.add_argument("--measure", action="store_true", help="time first-page get_history before and after")
+    parser.add_argument("--report", action="store_true", help="only print the report")
+    args = parser.parse_args()
+
+    if not args.report:
+        users = get_history_usernames()[:200] if args.measure else []
+        before = _hot_latency(users) if users else None
+        print(json.dumps({"before": archive_report()}, indent=2))
+        stats = archive_history(args.older_than_days)
+        print(json.dumps({"archived": stats}, indent=2))
+        if args.vacuum:
+            vacuum()
+        if users:
+            print(json.dumps({"hot_query_before": before, "hot_query_after": _hot_latency(users)}, indent=2))
+    print(json.dumps({"after": archive_report()}, indent=2))
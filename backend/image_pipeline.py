@@ -0,0 +1,161 @@
+# backend/image_pipeline.py — bounded-memory image preprocessing and features
+#
+# Uploads are decoded straight to a small size: JPEGs use draft mode, so the
+# decoder's DCT scaling produces at most 1/8-resolution pixels and a 20+ MP
+# phone photo never exists at full size; other formats are reduced in integer
+# steps before the final resize. The result is a fixed IMAGE_SIZE x IMAGE_SIZE
+# float32 array in [0, 1]. Features are computed with NumPy over whole
+# batches, and the labels below are fixed thresholds on those features — a
+# deterministic stand-in until a trained model replaces them.
+import io
+
+import numpy as np
+from PIL import Image
+
+from backend.metrics import instrument
+
+IMAGE_SIZE = 224
+HIST_BINS = 16
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+# -----------------------------
+# DECODE + RESIZE
+# -----------------------------
+def load_image(file, size=IMAGE_SIZE):
+    """Decode an upload (path, bytes or file-like) into a (size, size, 3) float32 array."""
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    elif hasattr(file, "seek"):
+        file.seek(0)
+
+    with Image.open(file) as img:
+        if img.format == "JPEG":
+            # decode at the smallest DCT scale that still covers the target
+            img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        img = img.resize((size, size), Image.BILINEAR, reducing_gap=2.0)
+    return np.asarray(img, dtype=np.float32) / 255.0
+
+
+def load_batch(files, size=IMAGE_SIZE):
+    """Stack several uploads into one (n, size, size, 3) float32 array."""
+    out = np.empty((len(files), size, size, 3), dtype=np.float32)
+    for i, f in enumerate(files):
+        out[i] = load_image(f, size)
+    return out
+
+
+# -----------------------------
+# FEATURES (vectorised over the batch)
+# -----------------------------
+def extract_features(batch):
+    """Per-image feature dict for a (n, h, w, 3) or (h, w, 3) float32 array."""
+    if batch.ndim == 3:
+        batch = batch[None]
+    n = batch.shape[0]
+    gray = batch @ _LUMA                                       # (n, h, w)
+    flat = gray.reshape(n, -1)
+
+    brightness = flat.mean(axis=1)
+    contrast = flat.std(axis=1)
+
+    # 16-bin luminance histograms for all images at once
+    bins = np.minimum((flat * HIST_BINS).astype(np.int32), HIST_BINS - 1)
+    bins += (np.arange(n, dtype=np.int32) * HIST_BINS)[:, None]
+    hist = np.bincount(bins.ravel(), minlength=n * HIST_BINS).reshape(n, HIST_BINS).astype(np.float32)
+    hist /= flat.shape[1]
+    nz = np.where(hist > 0, hist, 1.0)
+    entropy = -(hist * np.log2(nz)).sum(axis=1)
+
+    # texture: mean absolute gradient of the luminance
+    texture = (np.abs(np.diff(gray, axis=1)).mean(axis=(1, 2)) +
+               np.abs(np.diff(gray, axis=2)).mean(axis=(1, 2))) / 2
+
+    means = batch.mean(axis=(1, 2))                            # (n, 3)
+    r, g, b = batch[..., 0], batch[..., 1], batch[..., 2]
+    rg, yb = r - g, 0.5 * (r + g) - b
+    colorfulness = (np.sqrt(rg.std(axis=(1, 2)) ** 2 + yb.std(axis=(1, 2)) ** 2) +
+                    0.3 * np.sqrt(rg.mean(axis=(1, 2)) ** 2 + yb.mean(axis=(1, 2)) ** 2))
+    redness = means[:, 0] - means[:, 1:].mean(axis=1)
+
+    # share of bright pixels in the central region (opacity on grayscale scans)
+    h, w = gray.shape[1:]
+    centre = gray[:, h // 4: 3 * h // 4, w // 4: 3 * w // 4]
+    central_opacity = (centre > 0.7).mean(axis=(1, 2))
+
+    return [
+        {
+            "brightness": float(brightness[i]),
+            "contrast": float(contrast[i]),
+            "entropy": float(entropy[i]),
+            "texture": float(texture[i]),
+            "colorfulness": float(colorfulness[i]),
+            "redness": float(redness[i]),
+            "central_opacity": float(central_opacity[i]),
+            "histogram": hist[i].round(4).tolist(),
+        }
+        for i in range(n)
+    ]
+
+
+# -----------------------------
+# LABELS
+# -----------------------------
+def _confidence(margin, scale):
+    """Map a distance from a decision threshold to a confidence in [0.55, 0.97]."""
+    return round(0.55 + 0.42 * float(np.tanh(abs(margin) / scale)), 2)
+
+
+def describe(features):
+    """Medical label, emotion and mental state for one image's features."""
+    f = features
+    infection_score = f["redness"] - 0.08
+    quality_score = f["contrast"] - 0.08
+
+    if infection_score > 0 and f["texture"] > 0.03:
+        medical, margin = "Possible Infection", infection_score
+    elif quality_score < 0 or f["brightness"] < 0.12 or f["brightness"] > 0.92:
+        medical, margin = "Minor Issue", quality_score
+    else:
+        medical, margin = "Normal", min(abs(infection_score), abs(quality_score))
+
+    if f["colorfulness"] > 0.25 and f["brightness"] > 0.5:
+        emotion = "Calm"
+    elif f["contrast"] > 0.28:
+        emotion = "Stressed"
+    else:
+        emotion = "Neutral"
+
+    if f["brightness"] < 0.3:
+        mental_state = "Tired"
+    elif f["contrast"] > 0.22 and f["entropy"] > 3.2:
+        mental_state = "Alert"
+    else:
+        mental_state = "Stable"
+
+    return {
+        "medical_label": medical,
+        "medical_confidence": _confidence(margin, 0.1),
+        "emotion": emotion,
+        "mental_state": mental_state,
+    }
+
+
+def describe_scan(features):
+    """Chest-scan style label for the multimodal pipeline."""
+    f = features
+    if f["colorfulness"] > 0.12:
+        # colour photo, not a radiograph: nothing scan-specific to report
+        return "Healthy", _confidence(f["colorfulness"] - 0.12, 0.2)
+    if f["central_opacity"] > 0.35:
+        return "Pneumonia", _confidence(f["central_opacity"] - 0.35, 0.2)
+    if f["texture"] > 0.06:
+        return "Asthma", _confidence(f["texture"] - 0.06, 0.04)
+    return "Normal", _confidence(0.35 - f["central_opacity"], 0.2)
+
+
+@instrument()
+def analyze_image(file):
+    """Decode, featurise and label one upload."""
+    return describe(extract_features(load_image(file))[0])
@@ -0,0 +1,181 @@
+# backend/inference_scheduler.py — micro-batching scheduler for the multimodal pipeline
+#
+# Each model step (image, text) gets a MicroBatcher: requests from all
+# Streamlit sessions are queued, and a worker thread runs the step once per
+# micro-batch of up to `max_batch_size` requests, waiting at most
+# `max_wait_ms` after the first request for others to arrive. Callers get a
+# Future per request. A multimodal request submits its text to the text
+# batcher first, decodes its image while that runs, then submits the image,
+# so the two branches overlap.
+#
+# A batch that raises is retried item by item, so one bad input fails only
+# its own caller. A branch that fails or misses the request deadline gives a
+# fallback answer rather than failing the whole request.
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from backend.metrics import instrument, log_error
+
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 10
+REQUEST_TIMEOUT = 30.0
+UNREADABLE_IMAGE = ("Unreadable image", 0.0)
+TEXT_UNAVAILABLE = ("Could not analyse the symptom text right now. Please try again.", 0.0)
+WAIT_SAMPLES = 2048     # recent queue-wait samples kept for percentiles
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn, name="batcher", max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        """batch_fn: list of inputs -> list of results in the same order."""
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._stats = {"requests": 0, "batches": 0, "errors": 0, "max_batch": 0}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._execute(batch)
+            except Exception as e:     # never let the worker thread die
+                log_error(f"inference_scheduler.{self.name}", e)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _execute(self, batch):
+        started = time.perf_counter()
+        with self._lock:
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+            self._waits.extend((started - queued) * 1000 for _, _, queued in batch)
+        self._call(batch)
+
+    def _call(self, batch):
+        try:
+            results = list(self.batch_fn([item for item, _, _ in batch]))
+            if len(results) != len(batch):
+                # which result belongs to which item is unknown: fail them all
+                raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+            if len(batch) > 1:
+                # one bad item must not fail its batch-mates: rerun each on its own
+                log_error(f"inference_scheduler.{self.name}", e, f"batch of {len(batch)} failed, retrying one by one")
+                for entry in batch:
+                    self._call([entry])
+                return
+            batch[0][1].set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            waits = sorted(self._waits)
+        out["avg_batch"] = round(out["requests"] / out["batches"], 2) if out["batches"] else 0.0
+        if waits:
+            out["queue_wait_ms_p50"] = round(waits[len(waits) // 2], 3)
+            out["queue_wait_ms_p95"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3)
+            out["queue_wait_ms_max"] = round(waits[-1], 3)
+        return out
+
+
+# -----------------------------
+# MULTIMODAL STEPS
+# -----------------------------
+def _image_step(arrays):
+    import numpy as np
+    from backend.image_pipeline import describe_scan, extract_features
+    return [describe_scan(f) for f in extract_features(np.stack(arrays))]
+
+
+def _text_step(texts):
+    from backend.ai_model import analyze_symptoms, text_confidence
+    return [(analyze_symptoms(t), text_confidence(t)) for t in texts]
+
+
+def _result(future, deadline, branch, fallback):
+    """The branch's result, or fallback if it failed or is not done by deadline."""
+    if future is None:
+        return fallback
+    try:
+        return future.result(max(0.0, deadline - time.monotonic()))
+    except Exception as e:      # TimeoutError or the batch step's own error
+        log_error(f"inference_scheduler.multimodal_run.{branch}", e)
+        return fallback
+
+
+class MultimodalScheduler:
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.image = MicroBatcher(_image_step, "image-batcher", max_batch_size, max_wait_ms)
+        self.text = MicroBatcher(_text_step, "text-batcher", max_batch_size, max_wait_ms)
+
+    @instrument("inference_scheduler.multimodal_run")
+    def run(self, image_file, text, timeout=REQUEST_TIMEOUT):
+        from backend.image_pipeline import load_image
+
+        text_future = self.text.submit(text or "")
+        try:
+            # decode in the caller's thread while the text branch runs
+            image_future = self.image.submit(load_image(image_file))
+        except Exception as e:
+            log_error("inference_scheduler.multimodal_run", e, f"image decode: {e}")
+            image_future = None
+
+        deadline = time.monotonic() + timeout
+        diagnosis, text_conf = _result(text_future, deadline, "text", TEXT_UNAVAILABLE)
+        label, confidence = _result(image_future, deadline, "image", UNREADABLE_IMAGE)
+        return {
+            "medical_label": label,
+            "medical_confidence": confidence,
+            "text_diagnosis": diagnosis,
+            "text_confidence": text_conf
+        }
+
+    def stats(self):
+        return {"image": self.image.stats(), "text": self.text.stats()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = MultimodalScheduler()
+    return _scheduler
+
+
+def scheduler_stats():
+    return _scheduler.stats() if _scheduler is not None else None
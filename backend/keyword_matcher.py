@@ -0,0 +1,91 @@
+# backend/keyword_matcher.py — Aho-Corasick multi-keyword matcher
+#
+# Compiles groups of keywords (one group per rule, in priority order) into a
+# single automaton, so a text is scanned once no matter how many keywords the
+# rule tables hold. Matching is plain substring matching, the same as
+# `word in text`.
+
+
+class KeywordMatcher:
+    def __init__(self, groups):
+        """groups: list of keyword lists; index 0 has the highest priority."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]      # lowest rule index ending at this state (incl. suffixes)
+        self._hits = [frozenset()]
+
+        for priority, words in enumerate(groups):
+            for word in words:
+                if word:
+                    self._add(word, priority)
+        self._build()
+
+    # -----------------------------
+    # CONSTRUCTION
+    # -----------------------------
+    def _add(self, word, priority):
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+                self._hits.append(frozenset())
+                self._goto[state][ch] = nxt
+            state = nxt
+        if self._best[state] is None or priority < self._best[state]:
+            self._best[state] = priority
+        self._hits[state] = self._hits[state] | {priority}
+
+    def _build(self):
+        goto, fail, best, hits = self._goto, self._fail, self._best, self._hits
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(ch, 0)
+                fail[nxt] = f
+                if best[f] is not None and (best[nxt] is None or best[f] < best[nxt]):
+                    best[nxt] = best[f]
+                if hits[f]:
+                    hits[nxt] = hits[nxt] | hits[f]
+
+    # -----------------------------
+    # MATCHING
+    # -----------------------------
+    def first_match(self, text):
+        """Return the index of the highest-priority group found in text, or None."""
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found = None
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            b = best[state]
+            if b is not None and (found is None or b < found):
+                found = b
+                if found == 0:
+                    break
+        return found
+
+    def matches(self, text):
+        """Return the set of every group index found in text."""
+        goto, fail, hits = self._goto, self._fail, self._hits
+        state = 0
+        found = set()
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if hits[state]:
+                found |= hits[state]
+        return found
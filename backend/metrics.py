@@ -0,0 +1,273 @@
+# backend/metrics.py — in-process metrics for the backend functions
+#
+# @instrument wraps a public backend function and records, per function:
+# calls, errors (exceptions raised or reported through log_error), rows read
+# or written, and a latency histogram. Recording is off unless
+# HEALTHCARE_METRICS=1 or enable() is called; when off, the wrapper is one
+# global check and a direct call.
+#
+# Metrics are exported in the Prometheus text format: render_prometheus()
+# returns the text, write_prometheus() writes it atomically to METRICS_FILE
+# (for a textfile collector) and serve(port) exposes it at
+# http://127.0.0.1:<port>/metrics.
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("HEALTHCARE_METRICS") == "1"
+PREFIX = "healthcare"
+# Fixed by deployment config only, never by a page or request.
+METRICS_FILE = os.environ.get(
+    "HEALTHCARE_METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "healthcare_metrics.prom"),
+)
+
+# latency bucket upper bounds, seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+log = logging.getLogger("healthcare")
+
+
+class FunctionMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)    # last slot is +Inf
+
+    def observe(self, seconds, rows=0, error=False):
+        with self.lock:
+            self.calls += 1
+            self.seconds += seconds
+            self.rows += rows
+            if error:
+                self.errors += 1
+            self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, in seconds (None if no calls)."""
+        with self.lock:
+            counts, total = list(self.buckets), sum(self.buckets)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), counts):
+            seen += count
+            if seen >= q * total:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "function": self.name,
+                "calls": self.calls,
+                "errors": self.errors,
+                "rows": self.rows,
+                "mean_ms": round(self.seconds / self.calls * 1000, 3) if self.calls else None,
+            }
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def get_metrics(name):
+    m = _metrics.get(name)
+    if m is None:
+        with _metrics_lock:
+            m = _metrics.setdefault(name, FunctionMetrics(name))
+    return m
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    with _metrics_lock:
+        items = list(_metrics.values())
+    for m in items:
+        with m.lock:
+            m.calls = m.errors = m.rows = 0
+            m.seconds = 0.0
+            m.buckets = [0] * (len(BUCKETS) + 1)
+
+
+# -----------------------------
+# RECORDING
+# -----------------------------
+def result_rows(args, result):
+    """Rows read by a function that returns a list of rows."""
+    return len(result) if isinstance(result, list) else 0
+
+
+def one_row(args, result):
+    """One row read/written when the function reports success."""
+    return 1 if result else 0
+
+
+def instrument(name=None, rows=None):
+    """Decorator: time and count calls; rows(args, result) gives the SQLite rows touched.
+
+    The metric is named "<module>.<function>" (module without "backend.")
+    unless `name` is given.
+    """
+    def decorate(fn):
+        label = name or f"{fn.__module__.replace('backend.', '')}.{fn.__name__}"
+        m = get_metrics(label)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                m.observe(time.perf_counter() - start, error=True)
+                raise
+            elapsed = time.perf_counter() - start
+            try:
+                n = rows(args, result) if rows else 0
+            except Exception:
+                n = 0   # a bad row counter must never break the call
+            m.observe(elapsed, n)
+            return result
+
+        wrapper.metrics_name = label
+        return wrapper
+    return decorate
+
+
+def log_error(function, error, message=None):
+    """Log a handled error and count it against `function` (always counted)."""
+    log.warning("%s error: %s", function, message or error)
+    m = get_metrics(function)
+    with m.lock:
+        m.errors += 1
+
+
+def log_event(function, message, *args):
+    """Log an expected, non-error outcome (e.g. a booking conflict)."""
+    log.info("%s: " + message, function, *args)
+
+
+# -----------------------------
+# EXPORT
+# -----------------------------
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    with _metrics_lock:
+        items = sorted(_metrics.items())
+    duration = f"{PREFIX}_function_duration_seconds"
+    lines = [
+        f"# HELP {PREFIX}_function_calls_total Calls per backend function.",
+        f"# TYPE {PREFIX}_function_calls_total counter",
+    ]
+    snapshots = []
+    for name, m in items:
+        with m.lock:
+            snapshots.append((name, m.calls, m.errors, m.rows, m.seconds, list(m.buckets)))
+    for name, calls, *_ in snapshots:
+        lines.append(f'{PREFIX}_function_calls_total{{function="{name}"}} {calls}')
+
+    lines += [
+        f"# HELP {PREFIX}_function_errors_total Errors raised or logged per backend function.",
+        f"# TYPE {PREFIX}_function_errors_total counter",
+    ]
+    for name, _, errors, *_ in snapshots:
+        lines.append(f'{PREFIX}_function_errors_total{{function="{name}"}} {errors}')
+
+    lines += [
+        f"# HELP {PREFIX}_function_rows_total SQLite rows read or written per backend function.",
+        f"# TYPE {PREFIX}_function_rows_total counter",
+    ]
+    for name, _, _, rows, *_ in snapshots:
+        lines.append(f'{PREFIX}_function_rows_total{{function="{name}"}} {rows}')
+
+    lines += [
+        f"# HELP {duration} Latency per backend function.",
+        f"# TYPE {duration} histogram",
+    ]
+    for name, calls, _, _, seconds, buckets in snapshots:
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), buckets):
+            cumulative += count
+            lines.append(f'{duration}_bucket{{function="{name}",le="{_fmt(bound)}"}} {cumulative}')
+        lines.append(f'{duration}_sum{{function="{name}"}} {_fmt(seconds)}')
+        lines.append(f'{duration}_count{{function="{name}"}} {calls}')
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    """Per-function rows for display: calls, errors, rows, mean and p50/p95/p99 bucket bounds in ms."""
+    with _metrics_lock:
+        items = sorted(_metrics.items())
+    out = []
+    for _, m in items:
+        row = m.snapshot()
+        if not row["calls"] and not row["errors"]:
+            continue
+        for q in (0.5, 0.95, 0.99):
+            bound = m.quantile(q)
+            row[f"p{int(q * 100)}_ms_le"] = None if bound is None else round(bound * 1000, 3)
+        out.append(row)
+    return out
+
+
+def write_prometheus(path=None):
+    path = path or METRICS_FILE
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+    return path
+
+
+_server = None
+
+
+def serve(port=9108, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread (once per process); returns the port."""
+    global _server
+    if _server is not None:
+        return _server.server_address[1]
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    _server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server.server_address[1]
@@ -0,0 +1,436 @@
+# backend/migrations.py — versioned schema migrations for healthcare.db
+#
+# The schema version lives in SQLite's header (PRAGMA user_version). MIGRATIONS
+# is an ordered list; each entry upgrades the database from version - 1 to
+# version and runs once. Startup only reads user_version and returns when it
+# is current.
+#
+# There are two kinds of migration:
+#   - "ddl" steps run inside one BEGIN IMMEDIATE transaction, which also bumps
+#     user_version, so they apply completely or not at all.
+#   - "online" steps work on large tables in many short transactions
+#     (backfills, table rebuilds), so readers and writers keep going between
+#     chunks. They must be idempotent: user_version is bumped only after the
+#     step finishes, and a crashed or concurrent run simply picks up again.
+#
+# Work the schema does not depend on (indexing existing rows for search) is
+# a background step instead: it never holds up startup. ensure_schema()
+# finishes pending steps on a daemon thread; `python -m backend.migrations`
+# runs them in the foreground.
+#
+# Adding a schema change means appending a migration here, never editing one
+# that has already shipped.
+import sys
+import threading
+
+from backend.db_pool import get_pool
+from backend.metrics import instrument, log_error
+
+CHUNK = 10000   # rows per transaction in online steps
+
+
+# -----------------------------
+# ONLINE HELPERS
+# -----------------------------
+def backfill(pool, select_sql, update_sql, compute, chunk=CHUNK):
+    """Update rows in id order, `chunk` per transaction.
+
+    select_sql takes (last_id, limit) and returns rows with an `id` column;
+    compute(row) returns the parameters for update_sql. Returns rows updated.
+    """
+    last_id, done = 0, 0
+    while True:
+        with pool.connection() as conn:
+            rows = conn.execute(select_sql, (last_id, chunk)).fetchall()
+        if not rows:
+            return done
+        with pool.transaction() as conn:
+            conn.executemany(update_sql, [compute(r) for r in rows])
+        last_id = rows[-1]["id"]
+        done += len(rows)
+
+
+def rebuild_table(pool, table, create_sql, columns, indexes=(), chunk=CHUNK):
+    """Rebuild `table` with a new definition without a long write lock.
+
+    create_sql creates `<table>__new` with the new definition; `columns` are the
+    columns copied across (they must exist in both, with `id` the primary key).
+    Triggers mirror writes to the old table into the new one while existing
+    rows are copied in id chunks; a final short transaction swaps the tables
+    and creates `indexes` (full CREATE INDEX statements). Safe to rerun after
+    a crash: an existing <table>__new is resumed, not restarted.
+    """
+    new = f"{table}__new"
+    cols = ", ".join(columns)
+    new_vals = ", ".join(f"NEW.{c}" for c in columns)
+
+    with pool.transaction() as conn:
+        conn.execute(create_sql)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {new}_ins AFTER INSERT ON {table} BEGIN
+                INSERT OR REPLACE INTO {new} ({cols}) VALUES ({new_vals});
+            END""")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {new}_upd AFTER UPDATE ON {table} BEGIN
+                DELETE FROM {new} WHERE id = OLD.id;
+                INSERT OR REPLACE INTO {new} ({cols}) VALUES ({new_vals});
+            END""")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {new}_del AFTER DELETE ON {table} BEGIN
+                DELETE FROM {new} WHERE id = OLD.id;
+            END""")
+
+    # copy existing rows, skipping any a trigger already wrote (they are
+    # newer than ours). No OR IGNORE: a row that breaks a new constraint
+    # fails the step instead of silently not being copied.
+    last_id = 0
+    while True:
+        with pool.transaction() as conn:
+            row = conn.execute(
+                f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)",
+                (last_id, chunk)
+            ).fetchone()
+            if row[0] is None:
+                break
+            conn.execute(f"""
+                INSERT INTO {new} ({cols}) SELECT {cols} FROM {table} WHERE id > ? AND id <= ?
+                    AND id NOT IN (SELECT id FROM {new} WHERE id > ? AND id <= ?)
+            """, (last_id, row[0], last_id, row[0]))
+            last_id = row[0]
+
+    with pool.transaction() as conn:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (new,)).fetchone()
+        if not exists:
+            return      # another process finished the swap
+        # keep AUTOINCREMENT from reusing ids of rows deleted before the rebuild
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        conn.execute(f"DROP TABLE {table}")     # drops the mirror triggers too
+        conn.execute(f"ALTER TABLE {new} RENAME TO {table}")
+        if seq is not None:
+            conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], table))
+        for sql in indexes:
+            conn.execute(sql)
+
+
+# -----------------------------
+# MIGRATIONS
+# -----------------------------
+def _base_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE,
+            password TEXT,
+            created_at TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            event_type TEXT,
+            content TEXT,
+            timestamp TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            date TEXT,
+            time TEXT,
+            notes TEXT,
+            created_at TEXT
+        )
+    """)
+
+
+def _history_user_index(conn):
+    # Per-user history is always read newest-first; the index serves the
+    # WHERE username = ? and the ORDER BY timestamp, id (rowid) without a sort.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_user_ts ON history (username, timestamp)")
+
+
+def _appointment_slots(conn):
+    columns = {r["name"] for r in conn.execute("PRAGMA table_info(appointments)")}
+    if "start_ts" not in columns:
+        conn.execute("ALTER TABLE appointments ADD COLUMN start_ts INTEGER")
+    if "duration_min" not in columns:
+        conn.execute("ALTER TABLE appointments ADD COLUMN duration_min INTEGER NOT NULL DEFAULT 30")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_start ON appointments (start_ts)")
+
+
+def _backfill_start_ts(pool):
+    from backend.appointments import parse_start
+
+    # unparseable legacy rows get 0 so they sort first and never conflict
+    backfill(
+        pool,
+        "SELECT id, date, time FROM appointments WHERE id > ? AND start_ts IS NULL ORDER BY id LIMIT ?",
+        "UPDATE appointments SET start_ts = ? WHERE id = ?",
+        lambda r: (parse_start(r["date"], r["time"]) or 0, r["id"]),
+    )
+
+
+def _import_progress(conn):
+    # one row per unfinished bulk import (backend/bulk_io.py), updated in the
+    # same transaction as each chunk it inserts
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_progress (
+            job TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            source TEXT NOT NULL,
+            rows_read INTEGER NOT NULL DEFAULT 0,
+            rows_imported INTEGER NOT NULL DEFAULT 0,
+            dropped_indexes TEXT NOT NULL DEFAULT '[]',
+            updated_at TEXT
+        )
+    """)
+
+
+def _history_archive(conn):
+    # cold history moved out by backend/history_archive.py: one row per block
+    # of up to BLOCK_ROWS events of one user, zlib-compressed
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS history_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            first_ts TEXT NOT NULL,
+            last_ts TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            raw_bytes INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_history_archive_user_ts ON history_archive (username, last_ts)")
+
+
+def _history_fts(conn):
+    # FTS5 index over history (username, content), stored as an external-content
+    # table so the text is not duplicated. Triggers keep it in sync from the
+    # moment it is created; rows that existed before (ids up to `boundary`)
+    # are indexed later by the backfill_history_fts background step, tracked
+    # in history_fts_state. Until the backfill reaches a row, the
+    # delete/update triggers leave it alone (it is not in the index yet).
+    conn.execute("""
+        CREATE VIRTUAL TABLE history_fts USING fts5(
+            username, content,
+            content = 'history', content_rowid = 'id',
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+    """)
+    conn.execute("CREATE TABLE history_fts_state (boundary INTEGER NOT NULL, last_id INTEGER NOT NULL)")
+    conn.execute("INSERT INTO history_fts_state SELECT COALESCE(MAX(id), 0), 0 FROM history")
+    indexed = "(old.id > (SELECT boundary FROM history_fts_state) OR old.id <= (SELECT last_id FROM history_fts_state))"
+    conn.execute("""
+        CREATE TRIGGER history_fts_ai AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts (rowid, username, content) VALUES (new.id, new.username, new.content);
+        END""")
+    conn.execute(f"""
+        CREATE TRIGGER history_fts_ad AFTER DELETE ON history WHEN {indexed} BEGIN
+            INSERT INTO history_fts (history_fts, rowid, username, content) VALUES ('delete', old.id, old.username, old.content);
+        END""")
+    conn.execute(f"""
+        CREATE TRIGGER history_fts_au AFTER UPDATE OF username, content ON history WHEN {indexed} BEGIN
+            INSERT INTO history_fts (history_fts, rowid, username, content) VALUES ('delete', old.id, old.username, old.content);
+            INSERT INTO history_fts (rowid, username, content) VALUES (new.id, new.username, new.content);
+        END""")
+
+
+def _data_versions(conn):
+    # one counter per cached data set (see backend/read_cache.py), bumped in
+    # the same transaction as every write to it
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+APPOINTMENT_COLUMNS = ["id", "name", "date", "time", "notes", "created_at", "start_ts", "duration_min"]
+
+
+def _appointments_not_null(pool):
+    # SQLite cannot add NOT NULL to an existing column, so the start_ts that
+    # migration 3 added as nullable is enforced by rebuilding the table.
+    # Mirror triggers insert with OR REPLACE, which turns a NULL start_ts
+    # from an older writer into the default 0 ("unparseable", as in the
+    # backfill) during the rebuild.
+    with pool.connection() as conn:
+        notnull = {r["name"]: r["notnull"] for r in conn.execute("PRAGMA table_info(appointments)")}
+    if notnull.get("start_ts"):
+        return      # rebuilt by a run that crashed before bumping user_version
+    _backfill_start_ts(pool)    # rows written without start_ts since migration 4
+    rebuild_table(
+        pool, "appointments",
+        """
+        CREATE TABLE IF NOT EXISTS appointments__new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            date TEXT,
+            time TEXT,
+            notes TEXT,
+            created_at TEXT,
+            start_ts INTEGER NOT NULL DEFAULT 0,
+            duration_min INTEGER NOT NULL DEFAULT 30
+        )
+        """,
+        APPOINTMENT_COLUMNS,
+        indexes=["CREATE INDEX IF NOT EXISTS idx_appointments_start ON appointments (start_ts)"],
+    )
+
+
+# (version, description, kind, function); kind "ddl" gets a connection inside
+# a transaction, kind "online" gets the pool
+MIGRATIONS = [
+    (1, "users, history and appointments tables", "ddl", _base_tables),
+    (2, "history (username, timestamp) index", "ddl", _history_user_index),
+    (3, "appointment start_ts/duration_min and start index", "ddl", _appointment_slots),
+    (4, "backfill appointments.start_ts", "online", _backfill_start_ts),
+    (5, "bulk import progress table", "ddl", _import_progress),
+    (6, "compressed history archive table", "ddl", _history_archive),
+    (7, "full-text index over history content", "ddl", _history_fts),
+    (8, "data version counters for the read cache", "ddl", _data_versions),
+    (9, "appointments.start_ts NOT NULL (online rebuild)", "online", _appointments_not_null),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# -----------------------------
+# BACKGROUND STEPS
+# -----------------------------
+def history_fts_pending(conn):
+    boundary, last_id = conn.execute("SELECT boundary, last_id FROM history_fts_state").fetchone()
+    return last_id < boundary
+
+
+def backfill_history_fts(pool, chunk=CHUNK):
+    """Index the history rows that predate the full-text index, `chunk` per transaction."""
+    done = 0
+    while True:
+        with pool.transaction() as conn:
+            boundary, last_id = conn.execute("SELECT boundary, last_id FROM history_fts_state").fetchone()
+            if last_id >= boundary:
+                return done
+            upper = min(boundary, last_id + chunk)
+            conn.execute("""
+                INSERT INTO history_fts (rowid, username, content)
+                SELECT id, username, content FROM history WHERE id > ? AND id <= ?
+            """, (last_id, upper))
+            conn.execute("UPDATE history_fts_state SET last_id = ?", (upper,))
+        done += upper - last_id
+
+
+# (description, pending(conn), run(pool)); each must be safe to run from
+# several processes at once and to resume after a crash
+BACKGROUND_STEPS = [
+    ("index existing history for full-text search", history_fts_pending, backfill_history_fts),
+]
+
+_background = {}            # database path -> thread
+_background_lock = threading.Lock()
+
+
+def pending_background(pool):
+    """Descriptions of the background steps not finished yet (schema must be current)."""
+    with pool.connection() as conn:
+        return [description for description, pending, _ in BACKGROUND_STEPS if pending(conn)]
+
+
+def run_background(pool=None, verbose=False):
+    """Finish every pending background step in this thread."""
+    pool = pool or get_pool()
+    for description, pending, run in BACKGROUND_STEPS:
+        with pool.connection() as conn:
+            if not pending(conn):
+                continue
+        if verbose:
+            print(f"{description} ...")
+        run(pool)
+
+
+def _run_background_logged(pool):
+    try:
+        run_background(pool)
+    except Exception as e:
+        log_error("migrations.run_background", e)   # retried at the next process start
+
+
+def start_background(pool=None):
+    """Finish pending background steps on a daemon thread (once per process and database)."""
+    pool = pool or get_pool()
+    with _background_lock:
+        thread = _background.get(pool.path)
+        if thread is not None and thread.is_alive():
+            return thread
+        if not pending_background(pool):
+            return None
+        thread = _background[pool.path] = threading.Thread(
+            target=_run_background_logged, args=(pool,), name="schema-background", daemon=True
+        )
+        thread.start()
+        return thread
+
+
+# -----------------------------
+# RUNNER
+# -----------------------------
+def get_version(pool):
+    with pool.connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _set_version(conn, version):
+    # PRAGMA does not take parameters; version is always an int from MIGRATIONS
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+@instrument()
+def migrate(pool=None, target=LATEST_VERSION, verbose=False):
+    """Apply pending migrations up to target; returns the versions applied."""
+    pool = pool or get_pool()
+    applied = []
+    for version, description, kind, fn in MIGRATIONS:
+        if version > target or get_version(pool) >= version:
+            continue
+        if verbose:
+            print(f"migration {version}: {description} ...")
+        if kind == "online":
+            fn(pool)
+        with pool.transaction() as conn:
+            # re-check under the write lock: another process may have got here first
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                continue
+            if kind == "ddl":
+                fn(conn)
+            _set_version(conn, version)
+        applied.append(version)
+    return applied
+
+
+def ensure_schema(pool=None):
+    """Startup check: one PRAGMA read when the schema is current, plus a check
+    for unfinished background steps, which continue on a daemon thread."""
+    pool = pool or get_pool()
+    if get_version(pool) < LATEST_VERSION:
+        migrate(pool)
+    start_background(pool)
+
+
+if __name__ == "__main__":
+    # python -m backend.migrations [--status]
+    pool = get_pool()
+    current = get_version(pool)
+    print(f"{pool.path}: schema version {current}, latest {LATEST_VERSION}")
+    if "--status" in sys.argv:
+        for version, description, kind, _ in MIGRATIONS:
+            mark = "applied" if version <= current else "pending"
+            print(f"  {version:>3} {mark:>8}  {kind:>6}  {description}")
+        if current == LATEST_VERSION:
+            for description in pending_background(pool):
+                print(f"  background pending: {description}")
+    else:
+        applied = migrate(pool, verbose=True)
+        print("applied:", applied or "nothing to do")
+        run_background(pool, verbose=True)
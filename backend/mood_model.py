@@ -0,0 +1,310 @@
+# backend/mood_model.py — incrementally trained mood classifier
+#
+# Seeded from data/mood_dataset.csv (text,status) and then updated in small
+# batches with partial_fit from labelled rows in the `history` table
+# (event_type "mood_label", content = {"text": ..., "status": ...}). It is
+# never retrained from scratch.
+#
+# Snapshots are versioned pickles in backend/models/mood/. A new snapshot is
+# written to a temp file, renamed into place, and only then published through
+# the CURRENT pointer file, so readers in any process see either the old or
+# the new model, never a half-written one. In-process, inference just reads
+# the current model reference; updates train on a copy and swap it in.
+#
+# Every process (Streamlit, each API worker) may run the updater, so seeding
+# and each update round hold an OS file lock on models/mood/LOCK: only one
+# process at a time reads CURRENT, trains the next version and publishes it,
+# and an updater that finds the lock taken skips its round. The OS drops the
+# lock if its holder dies, so a crash never leaves it stuck.
+import copy
+import csv
+import json
+import os
+import pickle
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from backend.metrics import instrument, log_error
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BASE_DIR, "..", "data", "mood_dataset.csv")  # project/data/mood_dataset.csv
+MODEL_DIR = os.path.join(BASE_DIR, "models", "mood")
+CURRENT_PATH = os.path.join(MODEL_DIR, "CURRENT")
+LOCK_PATH = os.path.join(MODEL_DIR, "LOCK")
+
+LABEL_EVENT = "mood_label"
+UPDATE_BATCH_SIZE = 256
+UPDATE_INTERVAL = 300       # seconds between history polls
+KEEP_SNAPSHOTS = 5
+
+_current = None             # {"version", "classifier", "classes", "last_history_id"}
+_current_file = None
+_update_lock = threading.Lock()
+_updater = None
+
+
+# -----------------------------
+# FEATURES
+# -----------------------------
+_vectorizer = None
+
+
+def get_vectorizer():
+    # Hashing keeps the feature space fixed, so new words from history need no refit.
+    global _vectorizer
+    if _vectorizer is None:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        _vectorizer = HashingVectorizer(n_features=2 ** 18, ngram_range=(1, 2), alternate_sign=False, norm="l2")
+    return _vectorizer
+
+
+def read_dataset(path=CSV_PATH):
+    texts, labels = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            text = (row.get("text") or "").strip()
+            label = (row.get("status") or "").strip()
+            if text and label:
+                texts.append(text.lower())
+                labels.append(label)
+    return texts, labels
+
+
+# -----------------------------
+# SNAPSHOTS
+# -----------------------------
+def _snapshot_path(version):
+    return os.path.join(MODEL_DIR, f"mood_v{version:06d}.pkl")
+
+
+def _write_atomic(path, data):
+    # unique even across hosts/containers sharing the directory (pids repeat there)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _try_lock(f):
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def publish_lock(blocking=True):
+    """Cross-process lock for training and publishing; yields False if not blocking and taken."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    with open(LOCK_PATH, "a+b") as f:
+        while not _try_lock(f):
+            if not blocking:
+                yield False
+                return
+            time.sleep(0.05)
+        try:
+            yield True
+        finally:
+            _unlock(f)
+
+
+def publish(model):
+    """Persist a snapshot and point CURRENT at it (call under publish_lock())."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = _snapshot_path(model["version"])
+    _write_atomic(path, pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    _write_atomic(CURRENT_PATH, os.path.basename(path).encode())
+    _prune()
+
+
+def _prune():
+    snapshots = sorted(f for f in os.listdir(MODEL_DIR) if f.startswith("mood_v") and f.endswith(".pkl"))
+    for name in snapshots[:-KEEP_SNAPSHOTS]:
+        try:
+            os.remove(os.path.join(MODEL_DIR, name))
+        except OSError:
+            pass
+
+
+def _read_current():
+    try:
+        with open(CURRENT_PATH, encoding="utf-8") as f:
+            name = f.read().strip()
+        with open(os.path.join(MODEL_DIR, name), "rb") as f:
+            return name, pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None, None
+
+
+def train_initial(path=CSV_PATH):
+    from sklearn.linear_model import SGDClassifier
+
+    texts, labels = read_dataset(path)
+    classes = sorted(set(labels))
+    clf = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=0)
+    X = get_vectorizer().transform(texts)
+    for _ in range(5):   # a few passes over the small seed set
+        clf.partial_fit(X, labels, classes=classes)
+    return {"version": 1, "classifier": clf, "classes": classes, "last_history_id": 0}
+
+
+def get_model():
+    """Current model; loads the published snapshot or seeds version 1 from the CSV."""
+    global _current, _current_file
+    if _current is None:
+        with _update_lock:
+            if _current is None:
+                name, model = _read_current()
+                if model is None:
+                    with publish_lock():
+                        # another process may have seeded it while we waited
+                        name, model = _read_current()
+                        if model is None:
+                            model = train_initial()
+                            publish(model)
+                            name = os.path.basename(_snapshot_path(model["version"]))
+                _current, _current_file = model, name
+    return _current
+
+
+def refresh():
+    """Pick up a snapshot published by another process, if newer."""
+    global _current, _current_file
+    name, model = _read_current()
+    if model is not None and name != _current_file and (_current is None or model["version"] > _current["version"]):
+        _current, _current_file = model, name
+    return _current
+
+
+# -----------------------------
+# INFERENCE
+# -----------------------------
+@instrument()
+def predict_mood(text: str):
+    """Return (status, confidence) for text."""
+    model = get_model()   # one reference read; a concurrent swap cannot tear it
+    clf = model["classifier"]
+    proba = clf.predict_proba(get_vectorizer().transform([(text or "").lower()]))[0]
+    best = int(proba.argmax())
+    return str(clf.classes_[best]), round(float(proba[best]), 3)
+
+
+# -----------------------------
+# INCREMENTAL UPDATES
+# -----------------------------
+@instrument()
+def record_mood_label(username: str, text: str, status: str):
+    """Log a user-confirmed mood label; picked up by the next update."""
+    from backend.database import add_history
+    return add_history(username, LABEL_EVENT, json.dumps({"text": text, "status": status}))
+
+
+def _parse_labels(rows, classes):
+    texts, labels = [], []
+    for row in rows:
+        try:
+            item = json.loads(row["content"])
+        except (TypeError, ValueError):
+            continue
+        if item.get("status") in classes and (item.get("text") or "").strip():
+            texts.append(item["text"].lower())
+            labels.append(item["status"])
+    return texts, labels
+
+
+@instrument(rows=lambda args, result: result)
+def update_from_history(batch_size=UPDATE_BATCH_SIZE, max_batches=None):
+    """Fold newly labelled history rows into the model, one small batch at a time.
+
+    Each batch produces a new snapshot version. Returns the number of rows
+    learned (0 as well if another process is updating right now; its
+    snapshots are picked up by refresh()).
+    """
+    global _current, _current_file
+    from backend.database import get_history_since
+
+    get_model()
+    learned = 0
+    batches = 0
+    with _update_lock, publish_lock(blocking=False) as locked:
+        if not locked:
+            refresh()
+            return 0
+        refresh()   # build on the newest published version, whoever wrote it
+        while max_batches is None or batches < max_batches:
+            base = _current
+            rows = get_history_since(LABEL_EVENT, base["last_history_id"], batch_size)
+            if not rows:
+                break
+
+            texts, labels = _parse_labels(rows, base["classes"])
+            clf = base["classifier"]
+            if texts:
+                clf = copy.deepcopy(clf)
+                clf.partial_fit(get_vectorizer().transform(texts), labels)
+
+            model = {
+                "version": base["version"] + 1,
+                "classifier": clf,
+                "classes": base["classes"],
+                "last_history_id": rows[-1]["id"],
+            }
+            publish(model)
+            _current, _current_file = model, os.path.basename(_snapshot_path(model["version"]))
+            learned += len(texts)
+            batches += 1
+    return learned
+
+
+def _update_loop(interval, batch_size, stop):
+    while not stop.wait(interval):
+        try:
+            update_from_history(batch_size)
+        except Exception as e:
+            log_error("mood_model.update_from_history", e)
+
+
+def start_updater(interval=UPDATE_INTERVAL, batch_size=UPDATE_BATCH_SIZE):
+    """Start the background history poller once per process; returns its stop event."""
+    global _updater
+    with _update_lock:
+        if _updater is None:
+            stop = threading.Event()
+            thread = threading.Thread(target=_update_loop, args=(interval, batch_size, stop), name="mood-model-updater", daemon=True)
+            thread.start()
+            _updater = (thread, stop)
+    return _updater[1]
+
+
+if __name__ == "__main__":
+    m = get_model()
+    n = update_from_history()
+    print(f"mood model v{_current['version']}: learned {n} new labelled rows (last history id {_current['last_history_id']})")
@@ -0,0 +1,208 @@
+# backend/pdf_cache.py — two-tier content-addressed cache for generated PDFs
+#
+# Keys are SHA-256 digests of the normalised render inputs plus the template
+# version (see pdf_module.TEMPLATE_VERSION), so any change to a document's
+# content or layout produces a new key and nothing needs explicit
+# invalidation. Tier 1 is an in-process LRU bounded by total bytes; tier 2 is
+# a directory of <key>.pdf files bounded by total size, evicting the least
+# recently used files (by mtime, refreshed on every hit).
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from backend.metrics import log_error
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("PDF_CACHE_DIR", os.path.join(BASE_DIR, "cache", "pdf"))
+MEMORY_BYTES = int(os.environ.get("PDF_CACHE_MEMORY_MB", 64)) * 1024 * 1024
+DISK_BYTES = int(os.environ.get("PDF_CACHE_DISK_MB", 512)) * 1024 * 1024
+
+
+def _normalise(value):
+    if isinstance(value, str):
+        return value.replace("\r\n", "\n").strip()
+    if isinstance(value, (list, tuple)):
+        return [_normalise(v) for v in value]
+    if value is None:
+        return ""
+    return str(value)
+
+
+def make_key(kind, template_version, *args):
+    payload = json.dumps([kind, template_version, [_normalise(a) for a in args]], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, cache_dir=CACHE_DIR, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_bytes
+        self.disk_limit = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None     # computed on first disk write
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    # -----------------------------
+    # LOOKUP
+    # -----------------------------
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return data
+
+        data = self._disk_get(key)
+        with self._lock:
+            if data is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+        self._memory_put(key, data)
+        return data
+
+    def put(self, key, data):
+        self._memory_put(key, data)
+        self._disk_put(key, data)
+
+    def get_or_create(self, key, render):
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    # -----------------------------
+    # MEMORY TIER
+    # -----------------------------
+    def _memory_put(self, key, data):
+        if len(data) > self.memory_limit:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.memory_limit:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self._stats["memory_evictions"] += 1
+
+    # -----------------------------
+    # DISK TIER
+    # -----------------------------
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pdf")
+
+    def _disk_get(self, key):
+        if not self.disk_limit:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)    # mark as recently used for eviction
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key, data):
+        if not self.disk_limit or len(data) > self.disk_limit:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            existed = os.path.exists(path)
+            os.replace(tmp, path)
+        except OSError as e:
+            log_error("pdf_cache.put", e)
+            return
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, _, size in self._disk_files())
+            elif not existed:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.disk_limit:
+                self._evict_disk()
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".pdf"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_mtime, st.st_size
+
+    def _evict_disk(self):
+        # Trim to 90% of the budget so eviction does not run on every write.
+        files = sorted(self._disk_files(), key=lambda f: f[1])
+        total = sum(size for _, _, size in files)
+        target = self.disk_limit * 0.9
+        for path, _, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats["disk_evictions"] += 1
+        self._disk_bytes = total
+
+    # -----------------------------
+    # STATS
+    # -----------------------------
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["memory_entries"] = len(self._memory)
+            out["memory_bytes"] = self._memory_bytes
+        out["disk_bytes"] = self._disk_bytes
+        lookups = out["memory_hits"] + out["disk_hits"] + out["misses"]
+        out["hit_ratio"] = round((out["memory_hits"] + out["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        with self._disk_lock:
+            for path, _, _ in list(self._disk_files()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PdfCache()
+    return _cache
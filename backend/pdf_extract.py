@@ -0,0 +1,194 @@
+# backend/pdf_extract.py — page-at-a-time PDF text extraction
+#
+# Pages are read one by one (pdfplumber, falling back to PyPDF2) and their
+# layout caches are released as soon as the text is out, so memory stays
+# bounded on long scans. Pages are read in worker processes of one shared,
+# process-wide pool, which open the file independently from a temp file;
+# large files are split into page ranges read in parallel. Every run has a
+# page limit and a wall-clock deadline. A run that hits its deadline kills
+# the pool's workers, so a page stuck in the parser cannot hold the CPU past
+# it; the next run starts a fresh pool, and other runs caught in the kill
+# resubmit their ranges to it.
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from backend.metrics import instrument, log_error
+
+MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 300))
+TIMEOUT = float(os.environ.get("PDF_TIMEOUT", 60))
+PARALLEL_THRESHOLD = 16     # pages; smaller files are one worker task
+PAGE_CHUNK = 8              # pages per worker task
+WORKERS = int(os.environ.get("PDF_WORKERS", min(4, os.cpu_count() or 1)))     # pool size
+MAX_CHARS_PER_PAGE = 20000
+
+
+class ExtractionResult:
+    def __init__(self):
+        self.pages = []         # [(page_number, text)] in page order
+        self.page_count = 0     # pages in the file
+        self.truncated = False  # stopped at the page limit
+        self.timed_out = False
+
+
+# -----------------------------
+# SOURCES
+# -----------------------------
+def _spill(file):
+    """Write an upload (path, bytes or file-like) to a temp file workers can open."""
+    if isinstance(file, (str, os.PathLike)):
+        return os.fspath(file), False
+    if isinstance(file, (bytes, bytearray)):
+        data = bytes(file)
+    elif hasattr(file, "getvalue"):
+        data = file.getvalue()
+    else:
+        file.seek(0)
+        data = file.read()
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path, True
+
+
+def _page_count(path):
+    try:
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+    except ImportError:
+        from PyPDF2 import PdfReader
+        return len(PdfReader(path).pages)
+
+
+def iter_pages(path, start=0, end=None):
+    """Yield (page_number, text) for pages [start, end), one page in memory at a time."""
+    try:
+        import pdfplumber
+    except ImportError:
+        from PyPDF2 import PdfReader
+        reader = PdfReader(path)
+        stop = len(reader.pages) if end is None else min(end, len(reader.pages))
+        for i in range(start, stop):
+            yield i + 1, (reader.pages[i].extract_text() or "")[:MAX_CHARS_PER_PAGE]
+        return
+
+    with pdfplumber.open(path) as pdf:
+        stop = len(pdf.pages) if end is None else min(end, len(pdf.pages))
+        for i in range(start, stop):
+            page = pdf.pages[i]
+            try:
+                text = page.extract_text() or ""
+            except Exception as e:
+                log_error("pdf_extract.extract_pages", e, f"page {i + 1}: {e}")
+                text = ""
+            page.close()    # drop the parsed layout objects for this page
+            yield i + 1, text[:MAX_CHARS_PER_PAGE]
+
+
+def _extract_range(path, start, end):
+    return list(iter_pages(path, start, end))
+
+
+# -----------------------------
+# WORKER POOL
+# -----------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """The shared extraction pool, started on first use (and after a kill)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(WORKERS, 1))
+        return _pool
+
+
+def _kill_pool(pool):
+    """Kill the pool's workers mid-page and retire it; the next run starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    kill = getattr(pool, "kill_workers", None)      # Python 3.14+
+    if kill:
+        kill()
+    else:
+        # no public way to stop a busy worker before 3.14
+        for process in list((pool._processes or {}).values()):
+            process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# -----------------------------
+# EXTRACTION
+# -----------------------------
+@instrument()
+def extract_pages(file, max_pages=MAX_PAGES, timeout=TIMEOUT, workers=WORKERS):
+    """Extract page texts from an uploaded PDF within max_pages and timeout seconds.
+
+    `workers` is how many page ranges of this file may be read at once
+    (bounded by the pool size, WORKERS). workers=0 reads in this process
+    instead, where the deadline is only checked between pages.
+    """
+    result = ExtractionResult()
+    deadline = time.monotonic() + timeout
+    path, is_temp = _spill(file)
+    try:
+        result.page_count = _page_count(path)
+        limit = min(result.page_count, max_pages)
+        result.truncated = result.page_count > limit
+
+        if workers <= 0:
+            for page in iter_pages(path, 0, limit):
+                result.pages.append(page)
+                if time.monotonic() > deadline and len(result.pages) < limit:
+                    result.timed_out = True
+                    break
+            return result
+
+        chunk = PAGE_CHUNK if limit >= PARALLEL_THRESHOLD else max(limit, 1)
+        ranges = deque((start, min(start + chunk, limit)) for start in range(0, limit, chunk))
+        _read_ranges(path, ranges, deadline, max(1, workers) * 2, result)
+        return result
+    finally:
+        if is_temp:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _read_ranges(path, ranges, deadline, in_flight, result):
+    # ranges are collected in order; at most `in_flight` are queued at once
+    pool = _get_pool()
+    pending = deque()
+    resubmitted = False
+    while ranges or pending:
+        while ranges and len(pending) < in_flight:
+            start, end = ranges.popleft()
+            pending.append((start, end, pool.submit(_extract_range, path, start, end)))
+        start, end, future = pending[0]
+        try:
+            result.pages.extend(future.result(timeout=max(deadline - time.monotonic(), 0)))
+        except FutureTimeout:
+            result.timed_out = True
+            _kill_pool(pool)
+            return
+        except BrokenProcessPool:
+            # another run's deadline killed the shared pool under us: resubmit
+            # our unfinished ranges once to a fresh pool
+            if resubmitted:
+                raise
+            resubmitted = True
+            ranges.extendleft(reversed([(s, e) for s, e, _ in pending]))
+            pending.clear()
+            pool = _get_pool()
+            continue
+        pending.popleft()
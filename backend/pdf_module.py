@@ -1,15 +1,63 @@
 # backend/pdf_module.py
 import io
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
 
-def generate_pdf(patient, analysis_text):
+from backend.pdf_cache import get_pdf_cache, make_key
+from backend.metrics import instrument, log_error
+
+# Bump whenever a layout below changes, so cached PDFs are not reused.
+TEMPLATE_VERSION = 1
+
+BULK_WORKERS = int(os.environ.get("PDF_BULK_WORKERS", os.cpu_count() or 1))
+BULK_ERRORS_REPORTED = 100  # failed records listed in the stats (all are counted and logged)
+
+# -----------------------------
+# SHARED TEMPLATES (built once per process)
+# -----------------------------
+HEADER_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+    ("FONTSIZE", (0, 0), (-1, -1), 11),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("BOX", (0, 0), (-1, -1), 1, colors.black),
+])
+
+_styles = None
+
+
+def get_styles():
+    global _styles
+    if _styles is None:
+        _styles = getSampleStyleSheet()
+    return _styles
+
+
+def _render(story):
+    """Lay out a story; return (pdf_bytes, page_count)."""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
-    styles = getSampleStyleSheet()
+    doc.build(story)
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes, doc.page
+
+
+# -----------------------------
+# DOCUMENTS
+# -----------------------------
+def _report_story(patient, analysis_text):
+    styles = get_styles()
     story = []
 
     title = "<b>HEALTHCARE ASSISTANT - MEDICAL REPORT</b>"
@@ -18,13 +66,7 @@ def generate_pdf(patient, analysis_text):
 
     patient_data = [["Patient Name:", patient], ["Report Date:", datetime.now().strftime("%Y-%m-%d")], ["Generated By:", "AI Healthcare Assistant"]]
     table = Table(patient_data, colWidths=[120, 350])
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-        ("FONTNAME",(0,0),(-1,-1),"Helvetica"),
-        ("FONTSIZE",(0,0),(-1,-1),11),
-        ("GRID",(0,0),(-1,-1),0.5,colors.grey),
-        ("BOX",(0,0),(-1,-1),1,colors.black),
-    ]))
+    table.setStyle(HEADER_TABLE_STYLE)
     story.append(table)
     story.append(Spacer(1,20))
 
@@ -36,15 +78,11 @@ def generate_pdf(patient, analysis_text):
     story.append(Spacer(1,30))
     story.append(Paragraph("<b>Doctor's Signature:</b> _______________________", styles["Normal"]))
     story.append(Paragraph("This report was auto-generated using the AI Healthcare Assistant.", styles["Italic"]))
-    doc.build(story)
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-    return pdf_bytes
+    return story
 
-def generate_prescription_pdf(patient, doctor, symptoms, diagnosis, medicines):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=40, leftMargin=40, topMargin=40, bottomMargin=40)
-    styles = getSampleStyleSheet()
+
+def _prescription_story(patient, doctor, symptoms, diagnosis, medicines):
+    styles = get_styles()
     story = []
 
     title = "<b>ONLINE PRESCRIPTION</b>"
@@ -53,13 +91,7 @@ def generate_prescription_pdf(patient, doctor, symptoms, diagnosis, medicines):
 
     header_data = [["Patient Name:", patient], ["Doctor:", doctor], ["Date:", datetime.now().strftime("%Y-%m-%d")]]
     table = Table(header_data, colWidths=[120, 350])
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-        ("FONTSIZE", (0, 0), (-1, -1), 11),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("BOX", (0, 0), (-1, -1), 1, colors.black),
-    ]))
+    table.setStyle(HEADER_TABLE_STYLE)
     story.append(table)
     story.append(Spacer(1, 12))
 
@@ -78,8 +110,190 @@ def generate_prescription_pdf(patient, doctor, symptoms, diagnosis, medicines):
 
     story.append(Spacer(1,20))
     story.append(Paragraph("<b>Doctor's Signature:</b> _______________________", styles["Normal"]))
+    return story
 
-    doc.build(story)
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-    return pdf_bytes
+
+@instrument()
+def generate_pdf(patient, analysis_text, use_cache=True):
+    if not use_cache:
+        return _render(_report_story(patient, analysis_text))[0]
+    # the report date is printed on the page, so it is part of the key
+    key = make_key("report", TEMPLATE_VERSION, datetime.now().strftime("%Y-%m-%d"), patient, analysis_text)
+    return get_pdf_cache().get_or_create(key, lambda: _render(_report_story(patient, analysis_text))[0])
+
+
+@instrument()
+def generate_prescription_pdf(patient, doctor, symptoms, diagnosis, medicines, use_cache=True):
+    args = (patient, doctor, symptoms, diagnosis, medicines)
+    if not use_cache:
+        return _render(_prescription_story(*args))[0]
+    key = make_key("prescription", TEMPLATE_VERSION, datetime.now().strftime("%Y-%m-%d"), *args)
+    return get_pdf_cache().get_or_create(key, lambda: _render(_prescription_story(*args))[0])
+
+
+def pdf_cache_stats():
+    """Hit/miss/eviction counters and tier sizes of the PDF cache."""
+    return get_pdf_cache().stats()
+
+
+# -----------------------------
+# BULK GENERATION
+# -----------------------------
+STORIES = {"report": _report_story, "prescription": _prescription_story}
+
+
+def _file_name(index, patient):
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(patient or "patient")).strip("_") or "patient"
+    return f"{index:06d}_{safe[:60]}.pdf"
+
+
+def _render_record(kind, index, record):
+    pdf_bytes, pages = _render(STORIES[kind](*record))
+    return _file_name(index, record[0]), pdf_bytes, pages
+
+
+def _warm_worker():
+    get_styles()
+
+
+class _ZipSink:
+    # built under a temporary name and renamed on success, so `path` is
+    # never a half-written archive and an existing one survives a failed run
+    def __init__(self, path):
+        self.path = path
+        self.tmp = f"{path}.{os.getpid()}.tmp"
+        # PDF page streams are already compressed; storing avoids a second pass
+        self.zf = zipfile.ZipFile(self.tmp, "w", compression=zipfile.ZIP_STORED)
+
+    def write(self, name, data):
+        self.zf.writestr(name, data)
+
+    def close(self):
+        self.zf.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.zf.close()
+        os.remove(self.tmp)
+
+
+class _DirSink:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, name, data):
+        target = os.path.join(self.path, name)
+        with open(target + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(target + ".tmp", target)
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+@instrument()
+def generate_pdfs_bulk(records, out, kind="report", workers=None, max_in_flight=None):
+    """Render many PDFs and stream them into `out` (a .zip path or a directory).
+
+    records: iterable of argument tuples for the chosen kind —
+    (patient, analysis_text) for "report", or
+    (patient, doctor, symptoms, diagnosis, medicines) for "prescription".
+    Work is spread over a process pool; only a bounded window of documents
+    is ever held in memory. A record that fails to render is logged and
+    skipped, and listed under "errors"; the rest of the batch still goes
+    out. Returns counts and pages/second.
+    """
+    if kind not in STORIES:
+        raise ValueError(f"unknown PDF kind: {kind}")
+    workers = BULK_WORKERS if workers is None else workers
+    max_in_flight = max_in_flight or workers * 4
+    sink = _ZipSink(out) if str(out).lower().endswith(".zip") else _DirSink(out)
+
+    documents = pages = failed = 0
+    errors = []
+    start = time.perf_counter()
+
+    def collect(i, record, render):
+        nonlocal documents, pages, failed
+        try:
+            name, pdf_bytes, n = render()
+        except BrokenProcessPool:
+            raise       # a worker died: the whole pool is gone, not just this record
+        except Exception as e:
+            failed += 1
+            patient = record[0] if record else None
+            log_error("pdf_module.generate_pdfs_bulk", e, f"record {i} ({patient!r}) skipped: {e}")
+            if len(errors) < BULK_ERRORS_REPORTED:
+                errors.append({"index": i, "patient": patient, "error": str(e)})
+            return
+        sink.write(name, pdf_bytes)
+        documents += 1
+        pages += n
+
+    try:
+        if workers <= 1:
+            for i, record in enumerate(records):
+                record = tuple(record)
+                collect(i, record, lambda: _render_record(kind, i, record))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+                pending = deque()
+                for i, record in enumerate(records):
+                    if len(pending) >= max_in_flight:
+                        j, done, future = pending.popleft()
+                        collect(j, done, future.result)
+                    record = tuple(record)
+                    pending.append((i, record, pool.submit(_render_record, kind, i, record)))
+                while pending:
+                    j, done, future = pending.popleft()
+                    collect(j, done, future.result)
+    except BaseException:
+        sink.abort()
+        raise
+    sink.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "out": str(out),
+        "documents": documents,
+        "pages": pages,
+        "failed": failed,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "pages_per_sec": round(pages / seconds, 2) if seconds else 0.0,
+        "documents_per_sec": round(documents / seconds, 2) if seconds else 0.0,
+    }
+
+
+def history_report_records(start=None, end=None):
+    """(username, summary) for every patient with history in the date range."""
+    from backend.database import get_history, get_history_usernames
+
+    for username in get_history_usernames():
+        rows = get_history(username, start=start, end=end)
+        if rows:
+            lines = [f"{r['timestamp']} — {r['event_type']}: {r['content']}" for r in reversed(rows)]
+            yield username, "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render month-end reports for every patient in history.")
+    parser.add_argument("out", help="output .zip file or directory")
+    parser.add_argument("--start", help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    stats = generate_pdfs_bulk(history_report_records(args.start, args.end), args.out, workers=args.workers)
+    print(f"{stats['documents']} documents, {stats['pages']} pages in {stats['seconds']}s "
+          f"({stats['pages_per_sec']} pages/s) → {stats['out']}")
+    for error in stats["errors"]:
+        print(f"  skipped record {error['index']} ({error['patient']}): {error['error']}")
+    if stats["failed"] > len(stats["errors"]):
+        print(f"  … {stats['failed'] - len(stats['errors'])} more skipped, see the log")
@@ -0,0 +1,186 @@
+# backend/read_cache.py — read-through cache for history and appointment pages
+#
+# get_history() and get_appointments() results, and (via cached_frame()) the
+# DataFrames app.py builds from them, are cached per query parameters in a
+# process-wide LRU bounded by estimated bytes (READ_CACHE_MB; 0 disables it),
+# shared by every Streamlit session and API request in the process.
+#
+# Invalidation is exact and works across processes: every cached value is
+# tagged with the version counters of the data it was read from, kept in the
+# data_versions table. Writers bump the counters in the same transaction as
+# the write (bump_versions), and every lookup reads the current counters
+# first, so a value is served only if nothing it depends on has committed a
+# change since it was loaded. Counters are:
+#     "appointments"        every appointment write
+#     "history"             bulk changes to many users (imports)
+#     "history:<username>"  one user's history (add_history, archiving)
+# Writes that bypass the backend (sqlite3 shell, other tools) must bump the
+# counters themselves or call clear() in every process.
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from backend.metrics import log_error
+
+MEMORY_BYTES = int(float(os.environ.get("READ_CACHE_MB", 64)) * 1024 * 1024)
+MAX_ENTRY_FRACTION = 8      # values over 1/8 of the budget are never cached
+SIZE_SAMPLE = 8             # list items sized per entry (see estimate_size)
+
+APPOINTMENT_DEPS = ("appointments",)
+
+
+def user_history(username):
+    """Counter name for one user's history."""
+    return f"history:{username}"
+
+
+def history_deps(username):
+    return ("history", user_history(username))
+
+
+# -----------------------------
+# VERSION COUNTERS
+# -----------------------------
+def bump_versions(conn, *names):
+    """Bump counters inside the caller's write transaction."""
+    conn.executemany("""
+        INSERT INTO data_versions (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    """, [(n,) for n in dict.fromkeys(names)])
+
+
+def read_versions(conn, names):
+    """Current counters for `names`, in order (0 for one never bumped)."""
+    found = dict(conn.execute(
+        f"SELECT name, version FROM data_versions WHERE name IN ({', '.join('?' * len(names))})", names
+    ).fetchall())
+    return tuple(found.get(n, 0) for n in names)
+
+
+def estimate_size(value):
+    """Rough bytes held by a cached value (rows, DataFrames, tuples of them)."""
+    if hasattr(value, "memory_usage"):      # pandas DataFrame
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        if len(value) > SIZE_SAMPLE:
+            # extrapolate from evenly spaced items; exact sizing of a page
+            # costs about half as much as reading it from SQLite
+            step = len(value) / SIZE_SAMPLE
+            sample = sum(estimate_size(value[int(i * step)]) for i in range(SIZE_SAMPLE))
+            return sys.getsizeof(value) + sample * len(value) // SIZE_SAMPLE
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+# -----------------------------
+# CACHE
+# -----------------------------
+class ReadCache:
+    def __init__(self, max_bytes=MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (versions, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "too_large": 0}
+
+    def get(self, key, versions):
+        """Cached value for key if it was loaded at these versions, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == versions:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                self._drop(key)
+                self._stats["stale"] += 1
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key, versions, value, size=None):
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes // MAX_ENTRY_FRACTION:
+                self._stats["too_large"] += 1
+                return
+            self._entries[key] = (versions, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def get_or_load(self, key, deps, load):
+        """Read-through: load() on a miss, cached under the current versions of deps.
+
+        Versions are read before load() runs, so a write committed during the
+        load leaves the entry one version behind (a miss next time), never
+        newer-looking than its data. Values are shared: treat them as read-only.
+        """
+        if self.max_bytes <= 0:
+            return load()
+        from backend.database import get_connection
+
+        try:
+            with get_connection() as conn:
+                versions = read_versions(conn, deps)
+        except Exception as e:
+            log_error("read_cache.read_versions", e)
+            return load()
+
+        value = self.get(key, versions)
+        if value is None:
+            value = load()
+            self.put(key, versions, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["entries"] = len(self._entries)
+            out["bytes"] = self._bytes
+            out["max_bytes"] = self.max_bytes
+        lookups = out["hits"] + out["misses"]
+        out["hit_ratio"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        return out
+
+
+_cache = ReadCache()
+
+
+def get_read_cache():
+    return _cache
+
+
+def cached_frame(rows, build):
+    """build(rows) (e.g. a DataFrame) once per cached rows list.
+
+    Keyed by the identity of a list returned by the cached readers, so a page
+    rerun that got the same cached rows reuses the frame, and fresh rows
+    always get a new one. The entry holds the list, so its id is not reused
+    while the entry lives. The version tag is just len(rows): the identity
+    in the key already decides, and a tag of the list itself would compare
+    every row on each lookup.
+    """
+    key = ("frame", id(rows))
+    entry = _cache.get(key, len(rows))
+    if entry is None:
+        entry = (rows, build(rows))
+        _cache.put(key, len(rows), entry, estimate_size(rows) + estimate_size(entry[1]))
+    return entry[1]
+
+
+def read_cache_stats():
+    return _cache.stats()
@@ -0,0 +1,146 @@
+# backend/result_cache.py — process-wide cache for text-in, answer-out calls
+#
+# analyze_symptoms, analyze_mood and chat_to_prescription are pure functions
+# of their (normalised) input text and the data files they were built from.
+# Results are cached per (namespace, normalised text) in a bounded LRU with a
+# TTL, shared by every Streamlit session in the process. The cache watches the
+# rule/dataset/model files; when any of them changes it is cleared and the
+# registered reload callbacks run, so answers never outlive their data.
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from backend.metrics import log_error
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+WATCHED_FILES = [
+    os.path.join(DATA_DIR, "keyword_rules.json"),
+    os.path.join(DATA_DIR, "symptoms.csv"),
+    os.path.join(DATA_DIR, "mood_dataset.csv"),
+    os.path.join(DATA_DIR, "prescription_data.csv"),
+    os.path.join(BASE_DIR, "models", "symptom_classifier.pkl"),
+    os.path.join(BASE_DIR, "models", "mood", "CURRENT"),
+]
+
+MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_SIZE", 20000))
+TTL = float(os.environ.get("RESULT_CACHE_TTL", 3600))
+CHECK_INTERVAL = 1.0    # seconds between data-file stat checks
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalise_text(text):
+    """Lowercase, turn punctuation into spaces and collapse whitespace."""
+    text = _PUNCT_RE.sub(" ", (text or "").lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def data_fingerprint(paths=WATCHED_FILES):
+    out = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+class ResultCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL, watched=WATCHED_FILES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.watched = watched
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()    # one thread checks the files and reloads at a time
+        self._generation = 0                    # bumped by each invalidation
+        self._callbacks = []
+        self._fingerprint = data_fingerprint(watched)
+        self._next_check = time.monotonic() + CHECK_INTERVAL
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def on_change(self, callback):
+        """Run callback() (e.g. a rule reload) whenever a watched file changes."""
+        self._callbacks.append(callback)
+
+    def _check_data(self, now):
+        if now < self._next_check:
+            return
+        # Callers arriving during a reload wait for it rather than read old data.
+        with self._reload_lock:
+            if now < self._next_check:      # another thread checked meanwhile
+                return
+            self._next_check = now + CHECK_INTERVAL
+            fingerprint = data_fingerprint(self.watched)
+            if fingerprint == self._fingerprint:
+                return
+            self._fingerprint = fingerprint
+            for callback in self._callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    log_error("result_cache.reload", e)
+            with self._lock:
+                self._entries.clear()
+                self._generation += 1
+                self._stats["invalidations"] += 1
+
+    def get_or_compute(self, namespace, text, compute, version=None, normalise=normalise_text):
+        """Cached compute() for this namespace + normalised text (+ optional version).
+
+        compute() must give the same answer for every text that normalises to
+        the same key; callers whose answer depends on punctuation pass their
+        own `normalise`. A value computed across an invalidation is returned
+        but not stored, since it may come from the old data.
+        """
+        now = time.monotonic()
+        self._check_data(now)
+        key = (namespace, version, normalise(text))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            generation = self._generation
+
+        value = compute()
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["entries"] = len(self._entries)
+        lookups = out["hits"] + out["misses"]
+        out["hit_ratio"] = round(out["hits"] / lookups, 3) if lookups else 0.0
+        return out
+
+
+_cache = ResultCache()
+
+
+def get_result_cache():
+    return _cache
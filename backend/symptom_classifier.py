@@ -0,0 +1,190 @@
+# backend/symptom_classifier.py — TF-IDF nearest-centroid diagnosis model
+#
+# Built from data/symptoms.csv (symptoms,diagnosis). Every diagnosis is reduced
+# to one L2-normalised TF-IDF centroid, so a query is a single sparse
+# vector × (vocab × n_diagnoses) product: its cost depends on the number of
+# diagnoses, not on how many labelled rows the CSV holds.
+#
+# The fitted model is pickled to backend/models/symptom_classifier.pkl and
+# reloaded as long as the CSV is unchanged. Rebuild it by hand with:
+#     python -m backend.symptom_classifier
+import csv
+import os
+import pickle
+import threading
+
+from backend.metrics import instrument
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CSV_PATH = os.path.join(BASE_DIR, "..", "data", "symptoms.csv")  # project/data/symptoms.csv
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+MODEL_PATH = os.path.join(MODEL_DIR, "symptom_classifier.pkl")
+MODEL_VERSION = 1
+
+_model = None
+_lock = threading.Lock()
+
+
+# -----------------------------
+# TRAINING
+# -----------------------------
+def read_dataset(path=CSV_PATH):
+    texts, labels = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            text = (row.get("symptoms") or "").strip()
+            label = (row.get("diagnosis") or "").strip()
+            if text and label:
+                texts.append(text.lower())
+                labels.append(label)
+    return texts, labels
+
+
+def source_signature(path=CSV_PATH):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def fit(texts, labels):
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.preprocessing import normalize
+
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, token_pattern=r"[a-z0-9][a-z0-9\-]+")
+    X = vectorizer.fit_transform(texts)
+
+    classes, y = np.unique(labels, return_inverse=True)
+    membership = csr_matrix((np.ones(len(y)), (y, np.arange(len(y)))), shape=(len(classes), len(y)))
+    centroids = normalize(membership @ X)
+
+    return {
+        "version": MODEL_VERSION,
+        "vectorizer": vectorizer,
+        "centroids_t": centroids.T.tocsr().astype(np.float32),
+        "labels": [str(c) for c in classes],
+        "rows": len(texts),
+    }
+
+
+def build(path=CSV_PATH, out=MODEL_PATH):
+    model = fit(*read_dataset(path))
+    model["source"] = source_signature(path)
+    save(model, out)
+    return model
+
+
+def save(model, out=MODEL_PATH):
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    tmp = f"{out}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        # underscore keys are per-process caches (see _query_scores)
+        pickle.dump({k: v for k, v in model.items() if not k.startswith("_")}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, out)
+
+
+# -----------------------------
+# LOADING
+# -----------------------------
+def load(path=CSV_PATH, out=MODEL_PATH):
+    """Load the saved model, fitting and saving it only if it is missing or stale."""
+    try:
+        with open(out, "rb") as f:
+            model = pickle.load(f)
+        if model.get("version") == MODEL_VERSION and model.get("source") == source_signature(path):
+            return model
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    return build(path, out)
+
+
+def get_model():
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _model = load()
+    return _model
+
+
+def refresh():
+    """Drop the loaded model if data/symptoms.csv changed; the next query rebuilds it."""
+    global _model
+    model = _model
+    if model is not None and model.get("source") != source_signature():
+        _model = None
+
+
+# -----------------------------
+# INFERENCE
+# -----------------------------
+def _query_scores(model, text):
+    """Cosine similarity of text to every centroid, or None if no known term.
+
+    Equivalent to vectorizer.transform(...) @ centroids_t, done by hand: for a
+    handful of query terms, sklearn's per-call validation costs more than the
+    arithmetic.
+    """
+    import numpy as np
+
+    fast = model.get("_fast")
+    if fast is None:
+        vectorizer = model["vectorizer"]
+        ct = model["centroids_t"]
+        fast = model["_fast"] = (vectorizer.build_analyzer(), vectorizer.vocabulary_,
+                                 vectorizer.idf_, ct.indptr, ct.indices, ct.data)
+    analyzer, vocabulary, idf, indptr, indices, data = fast
+
+    counts = {}
+    for term in analyzer((text or "").lower()):
+        i = vocabulary.get(term)
+        if i is not None:
+            counts[i] = counts.get(i, 0) + 1
+    if not counts:
+        return None
+
+    idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    weights = (1.0 + np.log(tf)) * idf[idx]     # sublinear_tf, then idf
+    weights /= np.sqrt(weights @ weights)
+
+    scores = np.zeros(len(model["labels"]))
+    for i, w in zip(idx.tolist(), weights.tolist()):
+        lo, hi = indptr[i], indptr[i + 1]
+        scores[indices[lo:hi]] += w * data[lo:hi]
+    return scores
+
+
+@instrument()
+def classify_symptoms(text: str, k: int = 3, model=None):
+    """Return {"diagnosis", "confidence", "alternatives": [(diagnosis, score), ...]}.
+
+    confidence is the cosine similarity to the best diagnosis centroid (0–1);
+    alternatives holds the next k-1 diagnoses by score.
+    """
+    model = model or get_model()
+    scores = _query_scores(model, text)
+    if scores is None:
+        return {"diagnosis": None, "confidence": 0.0, "alternatives": []}
+
+    k = max(1, min(k, len(scores)))
+    if k < len(scores):
+        top = scores.argpartition(-k)[-k:]
+    else:
+        top = range(len(scores))
+    ranked = sorted(top, key=lambda i: -scores[i])
+    ranked = [i for i in ranked if scores[i] > 0]
+    if not ranked:
+        return {"diagnosis": None, "confidence": 0.0, "alternatives": []}
+
+    labels = model["labels"]
+    return {
+        "diagnosis": labels[ranked[0]],
+        "confidence": round(float(scores[ranked[0]]), 3),
+        "alternatives": [(labels[i], round(float(scores[i]), 3)) for i in ranked[1:]],
+    }
+
+
+if __name__ == "__main__":
+    m = build()
+    print(f"symptom classifier: {m['rows']} rows, {len(m['labels'])} diagnoses → {MODEL_PATH}")
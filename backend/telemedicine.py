@@ -1,6 +1,9 @@
 # backend/telemedicine.py
 from datetime import datetime
 
+from backend.metrics import instrument
+
+@instrument()
 def get_meet_link(prefix="healthcare"):
     room = f"{prefix}-{int(datetime.now().timestamp())}"
     return f"https://meet.jit.si/{room}"
@@ -0,0 +1,200 @@
+# backend/write_behind.py — bounded write-behind queue with group commit
+#
+# Producers put rows on an in-process bounded queue and return immediately; a
+# background thread drains the queue and hands rows to flush_fn in batches
+# (every `batch_size` rows or `flush_interval_ms`, whichever comes first), so
+# one transaction and one fsync cover many events. A full queue blocks
+# producers for up to `put_timeout` seconds (backpressure); after that put()
+# returns False and the caller should write synchronously. close() — also
+# registered with atexit — drains everything before the process exits.
+#
+# A batch that still fails after FLUSH_RETRIES attempts has already been
+# acknowledged to its producers, so it is never just dropped: its rows are
+# written to a new JSONL file (one JSON array per row) in the `dead_letter`
+# directory for replay, or to the log if that fails too, and counted in
+# stats(). Each file is complete once it appears (written under a temporary
+# name, then renamed), so a replay never sees half a batch.
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+from backend.metrics import log_error
+
+FLUSH_RETRIES = 3
+FLUSH_RETRY_DELAY = 0.05    # seconds, times the attempt number
+
+
+class WriteBehindQueue:
+    def __init__(self, flush_fn, name="write-behind", max_queue=10000, batch_size=500,
+                 flush_interval_ms=50, put_timeout=1.0, dead_letter=None):
+        self.flush_fn = flush_fn
+        self.name = name
+        self.dead_letter = dead_letter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "rejected": 0,
+            "blocked_puts": 0,
+            "flushes": 0,
+            "flushed_rows": 0,
+            "failed_rows": 0,
+            "dead_letter_rows": 0,
+            "last_failure": None,
+            "max_depth": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # -----------------------------
+    # PRODUCERS
+    # -----------------------------
+    def put(self, item) -> bool:
+        """Queue one row; False if closed or still full after put_timeout."""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._stats["blocked_puts"] += 1
+            try:
+                self._queue.put(item, timeout=self.put_timeout)
+            except queue.Full:
+                with self._lock:
+                    self._stats["rejected"] += 1
+                return False
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats["enqueued"] += 1
+            if depth > self._stats["max_depth"]:
+                self._stats["max_depth"] = depth
+        return True
+
+    def flush(self):
+        """Block until every row queued so far has been flushed."""
+        self._queue.join()
+
+    def close(self):
+        """Stop accepting rows, flush what is queued and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)   # wake the writer; may block briefly if the queue is full
+        self._thread.join()
+
+    # -----------------------------
+    # WRITER THREAD
+    # -----------------------------
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._flush(batch)
+            finally:
+                # a flush must never strand flush()/close() waiting on these
+                for _ in batch:
+                    self._queue.task_done()
+
+        # shutdown: drain anything still queued
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftover.append(item)
+            self._queue.task_done()
+        for i in range(0, len(leftover), self.batch_size):
+            self._flush(leftover[i:i + self.batch_size])
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        for attempt in range(FLUSH_RETRIES):
+            try:
+                self.flush_fn(batch)
+                break
+            except Exception as e:
+                error = e
+                log_error(f"write_behind.{self.name}", e, f"flush attempt {attempt + 1}: {e}")
+                time.sleep(FLUSH_RETRY_DELAY * (attempt + 1))
+        else:
+            saved = self._write_dead_letter(batch)
+            with self._lock:
+                self._stats["failed_rows"] += len(batch)
+                self._stats["dead_letter_rows"] += len(batch) if saved else 0
+                self._stats["last_failure"] = f"{time.strftime('%Y-%m-%d %H:%M:%S')} {len(batch)} rows: {error}"
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            s = self._stats
+            s["flushes"] += 1
+            s["flushed_rows"] += len(batch)
+            s["last_flush_ms"] = elapsed
+            s["total_flush_ms"] += elapsed
+            if elapsed > s["max_flush_ms"]:
+                s["max_flush_ms"] = elapsed
+
+    def _write_dead_letter(self, batch):
+        """Save a failed batch as a new dead-letter file; log the rows if that fails."""
+        if self.dead_letter:
+            try:
+                os.makedirs(self.dead_letter, exist_ok=True)
+                path = os.path.join(
+                    self.dead_letter, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+                )
+                with open(path + ".tmp", "w", encoding="utf-8") as f:
+                    f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(path + ".tmp", path)
+                log_error(f"write_behind.{self.name}", RuntimeError("batch failed"),
+                          f"{len(batch)} rows saved to dead letter {path}")
+                return True
+            except (OSError, TypeError, ValueError) as e:
+                log_error(f"write_behind.{self.name}.dead_letter", e)
+        log_error(f"write_behind.{self.name}", RuntimeError("batch lost"),
+                  f"dropped {len(batch)} rows: {json.dumps(batch, ensure_ascii=False, default=str)}")
+        return False
+
+    # -----------------------------
+    # STATS
+    # -----------------------------
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+        out["depth"] = self._queue.qsize()
+        out["avg_flush_ms"] = round(out["total_flush_ms"] / out["flushes"], 3) if out["flushes"] else 0.0
+        for key in ("last_flush_ms", "max_flush_ms", "total_flush_ms"):
+            out[key] = round(out[key], 3)
+        return out
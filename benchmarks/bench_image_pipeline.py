@@ -0,0 +1,68 @@
+# benchmarks/bench_image_pipeline.py — image preprocessing throughput and memory
+#
+# Run from the project root:
+#     python -m benchmarks.bench_image_pipeline
+#
+# Encodes synthetic JPEGs and PNGs at phone-camera and thumbnail sizes, then
+# reports images/second for decode + resize + features, the peak NumPy/Python
+# allocation per image (tracemalloc) and the process's peak RSS.
+
+import io
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from backend.image_pipeline import describe, extract_features, load_batch, load_image
+
+CASES = [
+    ("jpeg 20MP", "JPEG", (5472, 3648), 5),
+    ("jpeg 12MP", "JPEG", (4032, 3024), 10),
+    ("jpeg 1MP", "JPEG", (1280, 800), 50),
+    ("png 2MP", "PNG", (1920, 1080), 10),
+]
+BATCH = 32
+
+
+def synthetic(fmt, size, seed=0):
+    # noisy gradient drawn small and upscaled, so building a 20 MP test image
+    # does not itself dominate the memory numbers
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, 640, dtype=np.float32)[None, :, None]
+    y = np.linspace(0, 255, 480, dtype=np.float32)[:, None, None]
+    pixels = (0.5 * x + 0.5 * y + rng.normal(0, 20, (480, 640, 3))).clip(0, 255).astype(np.uint8)
+    img = Image.fromarray(pixels).resize(size, Image.BICUBIC)
+    buf = io.BytesIO()
+    img.save(buf, fmt, quality=90)
+    return buf.getvalue()
+
+
+def main():
+    print(f"{'case':>10} | {'img/s':>8} | {'ms/img':>7} | {'peak alloc MB':>13}")
+    for name, fmt, size, n in CASES:
+        data = synthetic(fmt, size)
+        load_image(data)    # warm up
+        start = time.perf_counter()
+        for _ in range(n):
+            describe(extract_features(load_image(data))[0])
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        load_image(data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>10} | {n / elapsed:>8.1f} | {elapsed / n * 1000:>7.1f} | {peak / 2**20:>13.2f}")
+
+    data = synthetic("JPEG", (1280, 800))
+    start = time.perf_counter()
+    arrays = load_batch([data] * BATCH)
+    extract_features(arrays)
+    elapsed = time.perf_counter() - start
+    print(f"batched features, {BATCH} x 1MP jpeg: {BATCH / elapsed:.1f} img/s")
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
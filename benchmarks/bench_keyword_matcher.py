@@ -0,0 +1,70 @@
+# benchmarks/bench_keyword_matcher.py — keyword matching latency vs. rule table size
+#
+# Run from the project root:
+#     python -m benchmarks.bench_keyword_matcher
+#
+# Compares the old one-`in`-per-keyword scan against the compiled
+# KeywordMatcher while the keyword list grows to thousands of terms. The
+# matcher's time per text should stay flat; the naive scan grows linearly.
+
+import random
+import string
+import time
+
+from backend.keyword_matcher import KeywordMatcher
+
+SIZES = [10, 100, 1000, 5000, 10000]
+RULES = 9
+TEXT_WORDS = 400
+REPEAT = 20
+
+
+def random_word(rng, lo=4, hi=10):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(lo, hi)))
+
+
+def make_groups(rng, size):
+    groups = [[] for _ in range(RULES)]
+    for i in range(size):
+        groups[i % RULES].append(random_word(rng))
+    return groups
+
+
+def make_text(rng):
+    # long "pasted narrative" with no keyword hits: worst case for both
+    return " ".join(random_word(rng, 2, 8) for _ in range(TEXT_WORDS)) + "!"
+
+
+def naive_first_match(groups, text):
+    # the scan ai_model did before KeywordMatcher: one `in` per keyword
+    for i, words in enumerate(groups):
+        if any(word in text for word in words):
+            return i
+    return None
+
+
+def timeit(fn, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(*args)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    rng = random.Random(42)
+    text = make_text(rng)
+    print(f"text length: {len(text)} chars, {REPEAT} runs per cell")
+    print(f"{'keywords':>9} | {'naive ms':>9} | {'matcher ms':>10} | {'build ms':>8}")
+    for size in SIZES:
+        groups = make_groups(rng, size)
+        start = time.perf_counter()
+        matcher = KeywordMatcher(groups)
+        build = (time.perf_counter() - start) * 1000
+        assert matcher.first_match(text) == naive_first_match(groups, text)
+        naive = timeit(naive_first_match, groups, text)
+        fast = timeit(matcher.first_match, text)
+        print(f"{size:>9} | {naive:>9.3f} | {fast:>10.3f} | {build:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_symptom_classifier.py — classifier query latency at 100k rows
+#
+# Run from the project root:
+#     python -m benchmarks.bench_symptom_classifier [rows]
+#
+# Scales data/symptoms.csv up to `rows` synthetic rows (default 100000) by
+# shuffling and mixing the symptom words of each diagnosis, fits the model,
+# times a save/load round trip and reports p50/p99 query latency.
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from backend import symptom_classifier as sc
+
+QUERIES = 5000
+
+
+def scale_dataset(texts, labels, rows, rng):
+    words_by_label = {}
+    for text, label in zip(texts, labels):
+        words_by_label.setdefault(label, set()).update(text.split())
+    # pad every diagnosis with a few filler terms so the vocabulary grows too
+    for label, words in words_by_label.items():
+        words.update(f"{label.lower().replace(' ', '')}{i}" for i in range(20))
+    pools = {label: sorted(words) for label, words in words_by_label.items()}
+    diagnoses = sorted(pools)
+
+    out_texts, out_labels = [], []
+    for _ in range(rows):
+        label = rng.choice(diagnoses)
+        pool = pools[label]
+        out_texts.append(" ".join(rng.sample(pool, min(len(pool), rng.randint(3, 6)))))
+        out_labels.append(label)
+    return out_texts, out_labels
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(7)
+    texts, labels = scale_dataset(*sc.read_dataset(), rows, rng)
+
+    start = time.perf_counter()
+    model = sc.fit(texts, labels)
+    fit_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        sc.save(model, path)
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            model = sc.pickle.load(f)
+        load_ms = (time.perf_counter() - start) * 1000
+        size_kb = os.path.getsize(path) / 1024
+
+    queries = [rng.choice(texts) for _ in range(QUERIES)]
+    sc.classify_symptoms(queries[0], model=model)   # warm up
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        sc.classify_symptoms(q, model=model)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(f"rows: {rows}, diagnoses: {len(model['labels'])}, vocabulary: {model['centroids_t'].shape[0]}")
+    print(f"fit: {fit_s:.2f}s, artifact: {size_kb:.0f} KiB, load: {load_ms:.1f} ms")
+    print(f"query p50: {percentile(timings, 50):.3f} ms, p99: {percentile(timings, 99):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/importtime_report.py — cold-start import cost per page
+#
+# Run from the project root:
+#     python -m benchmarks.importtime_report
+#     python -m benchmarks.importtime_report --json importtime.json
+#     python -m benchmarks.importtime_report --baseline importtime.json --tolerance 0.25
+#
+# Each target is imported in a fresh interpreter under `python -X importtime`;
+# the report shows its cumulative import time and the heaviest top-level
+# imports it pulls in. "login" is what app.py loads before anyone signs in;
+# the rest are the backend modules each page imports on first use. With
+# --baseline, targets slower than baseline * (1 + tolerance) (and at least
+# MIN_REGRESSION_MS slower) are listed and the exit status is 1.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+TARGETS = [
+    ("login", "import importlib, datetime, streamlit, streamlit.components.v1"),
+    ("database", "import backend.database"),
+    ("appointments", "import backend.appointments"),
+    ("ai_model", "import backend.ai_model"),
+    ("mood_model", "import backend.mood_model"),
+    ("chat_prescription_ai", "import backend.chat_prescription_ai"),
+    ("pdf_module", "import backend.pdf_module"),
+    ("image_pipeline", "import backend.image_pipeline"),
+    ("telemedicine", "import backend.telemedicine"),
+]
+REPEAT = 3              # fresh interpreters per target; the fastest run is kept
+TOP = 5
+MIN_REGRESSION_MS = 5.0
+
+
+def parse_importtime(stderr):
+    """[(name, depth, self_us, cumulative_us)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # top-level imports are indented by three spaces, each nesting level by two more
+        depth = (len(name) - len(name.lstrip()) - 3) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(code, env, startup=()):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, cwd=os.getcwd()
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    # leave out what every interpreter imports at startup (site, .pth hooks)
+    rows = [r for r in parse_importtime(proc.stderr) if r[0] not in startup]
+    top_level = [r for r in rows if r[1] == 0]
+    total_us = sum(r[3] for r in top_level)
+    heaviest = sorted(top_level, key=lambda r: r[3], reverse=True)[:TOP]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules": len(rows),
+        "heaviest": [(name, round(cum / 1000, 1)) for name, _, _, cum in heaviest],
+    }
+
+
+def run(repeat=REPEAT):
+    # imports must not touch the real database, so point them at a scratch file
+    scratch = tempfile.mkdtemp(prefix="importtime-")
+    env = dict(os.environ, HEALTHCARE_DB=os.path.join(scratch, "healthcare.db"))
+    startup = {r[0] for r in parse_importtime(subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True, env=env
+    ).stderr)}
+    results = {}
+    for name, code in TARGETS:
+        try:
+            runs = [measure(code, env, startup) for _ in range(repeat)]
+        except RuntimeError as e:
+            results[name] = {"error": str(e)}
+            continue
+        results[name] = min(runs, key=lambda r: r["total_ms"])
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, res in results.items():
+        old = baseline.get(name, {}).get("total_ms")
+        new = res.get("total_ms")
+        if old is None or new is None:
+            continue
+        if new > old * (1 + tolerance) and new - old >= MIN_REGRESSION_MS:
+            regressions.append((name, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time report for app.py pages")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    print(f"{'target':>20} | {'ms':>7} | {'modules':>7} | heaviest imports (cumulative ms)")
+    for name, res in results.items():
+        if "error" in res:
+            print(f"{name:>20} | {'error':>7} | {'':>7} | {res['error']}")
+            continue
+        heaviest = ", ".join(f"{m} {ms}" for m, ms in res["heaviest"])
+        print(f"{name:>20} | {res['total_ms']:>7.1f} | {res['modules']:>7} | {heaviest}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.1f} ms -> {new:.1f} ms")
+        if regressions:
+            sys.exit(1)
+        print("no import-time regressions")
+
+
+if __name__ == "__main__":
+    main()
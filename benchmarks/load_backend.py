@@ -0,0 +1,452 @@
+# benchmarks/load_backend.py — concurrent virtual users against the backend/ functions
+#
+# Run from the project root:
+#     python -m benchmarks.load_backend --users 32 --procs 4 --duration 20
+#     python -m benchmarks.load_backend --users 16 --procs 1            # threads only
+#     python -m benchmarks.load_backend --record trace.jsonl            # also save the events it ran
+#     python -m benchmarks.load_backend --replay trace.jsonl --speed 1  # replay a trace in real time
+#     python -m benchmarks.load_backend --trace-from-history prod.db --out trace.jsonl
+#
+# Virtual users are split across --procs processes, with threads inside each.
+# Every user loops over weighted session scripts (login, symptom check,
+# history view, booking, PDF report, ...), calling the backend functions
+# directly on a copy of the seeded benchmark database (benchmarks/seed_data.py)
+# or on --db. Each step is timed and classified:
+#   ok       the call returned without logging an error
+#   locked   SQLite reported "database is locked" (raised, or caught and
+#            reported through metrics.log_error)
+#   error    any other error
+# The report gives per-step counts, throughput, p50/p95/p99 latency and locked
+# and error rates, plus the connection pools' lock retries and failures.
+#
+# A trace is JSONL, one event per line: {"t": seconds from start, "user": ...,
+# "op": <step name>, "args": {...}}. Replay keeps each user's events in order
+# on one thread; --speed 1 keeps the recorded spacing, 0 runs flat out.
+# --trace-from-history turns a history table (e.g. a copy of production
+# healthcare.db) into a trace, mapping each event type to the step that
+# produced it.
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from queue import Empty
+from datetime import datetime, timedelta
+
+from benchmarks import seed_data
+
+SYMPTOM_WORDS = ["fever", "cough", "headache", "nausea", "chest", "pain", "tired", "dizzy", "rash", "throat", "vomiting", "chills"]
+MOOD_WORDS = ["sad", "happy", "anxious", "angry", "tired", "calm", "worried", "fine", "lonely", "stressed", "hopeless", "okay"]
+
+
+def _text(rng, words):
+    return " ".join(rng.sample(words, rng.randint(2, 5))) + f" note{rng.randrange(100000)}"
+
+
+# -----------------------------
+# STEPS
+# -----------------------------
+# Each step is (make_args(rng, user), run(user, args)). make_args draws the
+# arguments for a synthetic run; replayed events carry their own.
+def _login_args(rng, user):
+    return {"password": seed_data.BENCH_PASSWORD}
+
+
+def _login(user, args):
+    from backend.database import validate_user
+    validate_user(user, args["password"])
+
+
+def _symptom_check(user, args):
+    from backend.ai_model import analyze_symptoms
+    from backend.database import add_history
+    add_history(user, "Symptom Check", f"{args['text']} -> {analyze_symptoms(args['text'])}")
+
+
+def _mood_check(user, args):
+    from backend.ai_model import analyze_mood
+    from backend.database import add_history
+    add_history(user, "Mental Health", f"{args['text']} -> {analyze_mood(args['text'])}")
+
+
+def _chat_prescription(user, args):
+    from backend.chat_prescription_ai import chat_to_prescription
+    from backend.database import add_history
+    add_history(user, "Chat Prescription", json.dumps(chat_to_prescription(args["text"])))
+
+
+def _view_history(user, args):
+    from backend.database import get_history
+    get_history(user, limit=args.get("limit", 50))
+
+
+def _book_args(rng, user):
+    start = seed_data.APPOINTMENT_START + timedelta(
+        days=rng.randrange(seed_data.APPOINTMENT_DAYS), minutes=15 * rng.randrange(8 * 4, 20 * 4)
+    )
+    return {"date": start.strftime("%Y-%m-%d"), "time": start.strftime("%H:%M:%S"), "duration_min": rng.choice([15, 30, 45])}
+
+
+def _book(user, args):
+    from backend.appointments import save_appointment
+    save_appointment(user, args["date"], args["time"], "load test", args.get("duration_min", 30))
+
+
+def _view_appointments(user, args):
+    from backend.appointments import get_appointments
+    get_appointments(start=args.get("date"), limit=args.get("limit", 50))
+
+
+def _pdf_report(user, args):
+    from backend.pdf_module import generate_pdf
+    generate_pdf(user, args["text"])
+
+
+STEPS = {
+    "login": (_login_args, _login),
+    "symptom_check": (lambda rng, user: {"text": _text(rng, SYMPTOM_WORDS)}, _symptom_check),
+    "mood_check": (lambda rng, user: {"text": _text(rng, MOOD_WORDS)}, _mood_check),
+    "chat_prescription": (lambda rng, user: {"text": _text(rng, SYMPTOM_WORDS)}, _chat_prescription),
+    "view_history": (lambda rng, user: {"limit": 50}, _view_history),
+    "book": (_book_args, _book),
+    "view_appointments": (lambda rng, user: {"date": _book_args(rng, user)["date"], "limit": 50}, _view_appointments),
+    "pdf_report": (lambda rng, user: {"text": _text(rng, SYMPTOM_WORDS)}, _pdf_report),
+}
+
+# (weight, steps) — one session per loop iteration of a virtual user
+SCRIPTS = [
+    (40, ["login", "symptom_check", "view_history", "book", "view_appointments"]),
+    (25, ["login", "mood_check", "view_history"]),
+    (15, ["login", "chat_prescription", "pdf_report"]),
+    (20, ["login", "view_history", "view_appointments"]),
+]
+
+# history event type -> step, for --trace-from-history
+EVENT_STEPS = {
+    "Symptom Check": "symptom_check",
+    "Mental Health": "mood_check",
+    "mood_label": "mood_check",
+    "Chat Prescription": "chat_prescription",
+    "PDF Analysis": "pdf_report",
+}
+
+
+# -----------------------------
+# ERROR CLASSIFICATION
+# -----------------------------
+class _ErrorCapture(logging.Handler):
+    """Remembers, per thread, the last error the backend reported through log_error."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.local = threading.local()
+
+    def emit(self, record):
+        self.local.error = record.getMessage()
+
+    def take(self):
+        error = getattr(self.local, "error", None)
+        self.local.error = None
+        return error
+
+
+def _outcome(message):
+    if message is None:
+        return "ok"
+    return "locked" if "locked" in message.lower() else "error"
+
+
+def _run_step(capture, op, user, args, out):
+    run = STEPS[op][1]
+    capture.take()
+    start = time.perf_counter()
+    try:
+        run(user, args)
+        message = capture.take()
+    except Exception as e:   # noqa: BLE001 — a crashing step is a result, not a harness failure
+        message = str(e) or type(e).__name__
+    out.append((op, (time.perf_counter() - start) * 1000, _outcome(message)))
+
+
+# -----------------------------
+# WORKERS
+# -----------------------------
+def _virtual_user(capture, users, seed, deadline, record, out):
+    rng = random.Random(seed)
+    weights = [w for w, _ in SCRIPTS]
+    while time.perf_counter() < deadline:
+        user = seed_data.user_name(rng.randrange(users))
+        for op in rng.choices([s for _, s in SCRIPTS], weights)[0]:
+            if time.perf_counter() >= deadline:
+                break
+            args = STEPS[op][0](rng, user)
+            if record is not None:
+                record.append({"t": round(time.perf_counter(), 6), "user": user, "op": op, "args": args})
+            _run_step(capture, op, user, args, out)
+
+
+def _replay_user(capture, events, started, speed, out):
+    for event in events:
+        if speed:
+            delay = started + event["t"] / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        _run_step(capture, event["op"], event["user"], event.get("args") or {}, out)
+
+
+def _warm_up():
+    # build or load the models once per process, outside the timings
+    from backend.ai_model import classify_symptoms, predict_mood
+    from backend.chat_prescription_ai import get_index
+    from backend.database import ensure_db
+    from backend.pdf_module import get_styles
+
+    ensure_db()
+    classify_symptoms("warm up")
+    predict_mood("warm up")
+    get_index()
+    get_styles()
+
+
+def _worker(index, offset, threads, opts, ready, go, results):
+    capture = _ErrorCapture()
+    log = logging.getLogger("healthcare")
+    log.addHandler(capture)
+    log.setLevel(logging.WARNING)
+    log.propagate = False
+
+    _warm_up()
+    if opts["write_behind"]:
+        from backend.database import enable_write_behind
+        enable_write_behind()
+    ready.put(index)
+    go.wait()
+
+    out, record = [], [] if opts["record"] else None
+    started = time.perf_counter()
+    if opts["replay"]:
+        groups = [[] for _ in range(threads)]
+        with open(opts["replay"]) as f:
+            for line in f:
+                if line.strip():
+                    event = json.loads(line)
+                    slot = zlib.crc32(event["user"].encode()) % opts["users"] - offset
+                    if 0 <= slot < threads:
+                        groups[slot].append(event)
+        workers = [
+            threading.Thread(target=_replay_user, args=(capture, sorted(g, key=lambda e: e["t"]), started, opts["speed"], out))
+            for g in groups if g
+        ]
+    else:
+        deadline = started + opts["duration"]
+        workers = [
+            threading.Thread(target=_virtual_user, args=(
+                capture, opts["users_in_db"], opts["seed"] * 10000 + index * 100 + i, deadline, record, out
+            ))
+            for i in range(threads)
+        ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    from backend.database import disable_write_behind
+    from backend.db_pool import pool_stats
+    if opts["write_behind"]:
+        disable_write_behind()      # flushes; a locked flush is reported by the pool stats below
+    if record is not None:
+        for event in record:
+            event["t"] = round(event["t"] - started, 6)
+    results.put({"samples": out, "elapsed": elapsed, "pools": pool_stats(), "record": record or []})
+
+
+def _get(queue, processes):
+    # a worker that dies (e.g. an import error) must not leave the parent waiting forever
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            if any(p.exitcode not in (None, 0) for p in processes):
+                for p in processes:
+                    p.kill()
+                raise RuntimeError("a load worker exited early; see its traceback above")
+
+
+def run(users, procs, opts):
+    """Run the workers and return (samples, elapsed seconds, summed pool stats, recorded events)."""
+    ctx = multiprocessing.get_context("spawn")      # no SQLite handles cross a fork
+    ready, results, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+    per_proc = [users // procs + (1 if i < users % procs else 0) for i in range(procs)]
+    processes = [
+        ctx.Process(target=_worker, args=(i, sum(per_proc[:i]), n, opts, ready, go, results))
+        for i, n in enumerate(per_proc) if n
+    ]
+    for p in processes:
+        p.start()
+    for _ in processes:
+        _get(ready, processes)
+    go.set()
+
+    samples, elapsed, pools, record = [], 0.0, {}, []
+    for _ in processes:
+        r = _get(results, processes)
+        samples.extend(r["samples"])
+        elapsed = max(elapsed, r["elapsed"])
+        record.extend(r["record"])
+        for stats in r["pools"].values():
+            for key in ("lock_retries", "lock_failures", "waits"):
+                pools[key] = pools.get(key, 0) + stats[key]
+    for p in processes:
+        p.join()
+    return samples, elapsed, pools, sorted(record, key=lambda e: e["t"])
+
+
+# -----------------------------
+# TRACES
+# -----------------------------
+def trace_from_history(db_path, out_path, limit=None, since=None):
+    """Write the history table of db_path as a replayable trace; returns the event count."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    sql = "SELECT username, event_type, content, timestamp FROM history"
+    params = []
+    if since:
+        sql += " WHERE timestamp >= ?"
+        params.append(since)
+    sql += " ORDER BY timestamp, id"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    first = None
+    n = 0
+    with open(out_path, "w") as f:
+        for username, event_type, content, timestamp in conn.execute(sql, params):
+            ts = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+            first = first or ts
+            op = EVENT_STEPS.get(event_type, "view_history")
+            args = {"text": content} if op != "view_history" else {"limit": 50}
+            f.write(json.dumps({"t": (ts - first).total_seconds(), "user": username, "op": op, "args": args}) + "\n")
+            n += 1
+    conn.close()
+    return n
+
+
+# -----------------------------
+# REPORT
+# -----------------------------
+def _percentile(values, p):
+    return round(values[min(len(values) - 1, int(len(values) * p / 100))], 2) if values else None
+
+
+def summarise(samples, elapsed):
+    by_op = {}
+    for op, ms, outcome in samples:
+        by_op.setdefault(op, []).append((ms, outcome))
+    by_op["TOTAL"] = [(ms, outcome) for _, ms, outcome in samples]
+
+    out = {}
+    for op, rows in by_op.items():
+        ms = sorted(m for m, _ in rows)
+        locked = sum(1 for _, o in rows if o == "locked")
+        errors = sum(1 for _, o in rows if o == "error")
+        out[op] = {
+            "n": len(rows),
+            "ops_per_sec": round(len(rows) / elapsed, 1) if elapsed else None,
+            "p50_ms": _percentile(ms, 50),
+            "p95_ms": _percentile(ms, 95),
+            "p99_ms": _percentile(ms, 99),
+            "locked": locked,
+            "locked_pct": round(100 * locked / len(rows), 3),
+            "errors": errors,
+            "error_pct": round(100 * errors / len(rows), 3),
+        }
+    return out
+
+
+def print_report(summary, elapsed, pools):
+    print(f"{'step':<18} {'n':>7} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'locked%':>8} {'error%':>7}")
+    for op, r in sorted(summary.items(), key=lambda item: (item[0] == "TOTAL", item[0])):
+        print(f"{op:<18} {r['n']:>7} {r['ops_per_sec']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['locked_pct']:>8} {r['error_pct']:>7}")
+    print(f"elapsed {elapsed:.1f}s; pool lock retries {pools.get('lock_retries', 0)}, "
+          f"lock failures {pools.get('lock_failures', 0)}, checkout waits {pools.get('waits', 0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent virtual users against the SQLite backend")
+    parser.add_argument("--users", type=int, default=16, help="virtual users (threads), split across --procs")
+    parser.add_argument("--procs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=seed_data.SEED)
+    parser.add_argument("--write-behind", action="store_true", help="batch add_history through the write-behind queue")
+    parser.add_argument("--db", help="run against a copy of this database instead of the seeded one")
+    parser.add_argument("--workdir", default=seed_data.WORKDIR)
+    parser.add_argument("--record", help="write the events this run executed to a JSONL trace")
+    parser.add_argument("--replay", help="replay this JSONL trace instead of running scripts")
+    parser.add_argument("--speed", type=float, default=0.0, help="replay speed-up (1 = recorded pace, 0 = flat out)")
+    parser.add_argument("--trace-from-history", metavar="DB", help="convert DB's history table to a trace and exit")
+    parser.add_argument("--out", help="trace path for --trace-from-history")
+    parser.add_argument("--limit", type=int, help="max events for --trace-from-history")
+    parser.add_argument("--since", help="first timestamp for --trace-from-history")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    if args.trace_from_history:
+        out = args.out or "trace.jsonl"
+        n = trace_from_history(args.trace_from_history, out, args.limit, args.since)
+        print(f"wrote {n} events to {out}")
+        return
+
+    workdir = os.path.abspath(args.workdir)
+    run_db = os.path.join(workdir, "load_run.db")
+    os.environ["HEALTHCARE_DB"] = run_db     # inherited by the spawned workers
+    if args.db:
+        source = args.db
+        with sqlite3.connect(f"file:{args.db}?mode=ro", uri=True) as conn:
+            users_in_db = max(1, conn.execute("SELECT COUNT(*) FROM users").fetchone()[0])
+    else:
+        manifest = seed_data.ensure_seeded(workdir)
+        source, users_in_db = manifest["db"], manifest["params"]["users"]
+    os.makedirs(workdir, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(run_db + suffix):
+            os.remove(run_db + suffix)
+    shutil.copyfile(source, run_db)
+
+    opts = {
+        "duration": args.duration,
+        "seed": args.seed,
+        "users_in_db": users_in_db,
+        "write_behind": args.write_behind,
+        "record": bool(args.record),
+        "replay": os.path.abspath(args.replay) if args.replay else None,
+        "speed": args.speed,
+        "procs": max(1, min(args.procs, args.users)),
+        "users": max(1, args.users),
+    }
+    mode = f"replay {args.replay}" if args.replay else f"{args.duration:.0f}s of scripted sessions"
+    print(f"{args.users} virtual users in {opts['procs']} processes, {mode}, db {run_db}")
+    samples, elapsed, pools, record = run(opts["users"], opts["procs"], opts)
+
+    summary = summarise(samples, elapsed)
+    print_report(summary, elapsed, pools)
+    if args.record:
+        with open(args.record, "w") as f:
+            for event in record:
+                f.write(json.dumps(event) + "\n")
+        print(f"recorded {len(record)} events to {args.record}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"users": args.users, "procs": opts["procs"], "elapsed": elapsed, "pools": pools, "steps": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# benchmarks/load_test_api.py — throughput of api.py at different worker counts
+#
+# Run from the project root (needs fastapi + uvicorn):
+#     python -m benchmarks.load_test_api
+#     python -m benchmarks.load_test_api --workers 1 2 4 --clients 32 --duration 15
+#
+# For each worker count, starts `python api.py --workers N` on a copy of the
+# seeded benchmark database (benchmarks/seed_data.py), then drives it from
+# --client-procs processes x --clients threads, each on its own keep-alive
+# connection, with a weighted mix of analysis, history, appointment and PDF
+# requests, after an untimed warm-up. Reports successful requests/second,
+# latency percentiles and errors (503 = a pool's queue was full) per run,
+# and the speed-up over the first worker count. Each client thread logs in
+# once as the first seeded user, made an admin for the run so it may read
+# and write every user's history. Scaling past one worker needs more than
+# one core; on a single-core machine extra workers only add context
+# switching and come out slower.
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from benchmarks import seed_data
+
+SYMPTOM_WORDS = ["fever", "cough", "headache", "nausea", "chest", "pain", "tired", "dizzy", "rash", "throat"]
+MOOD_WORDS = ["sad", "happy", "anxious", "angry", "tired", "calm", "worried", "fine", "lonely", "stressed"]
+
+
+def _words(rng, pool):
+    return " ".join(rng.sample(pool, rng.randint(2, 5)))
+
+
+def _request(rng, users):
+    """One (endpoint, method, path, body) drawn from the traffic mix."""
+    user = seed_data.user_name(rng.randrange(users))
+    r = rng.random()
+    if r < 0.30:
+        return "symptoms", "POST", "/symptoms", {"text": _words(rng, SYMPTOM_WORDS) + f" day{rng.randrange(1000)}"}
+    if r < 0.50:
+        return "mood", "POST", "/mood", {"text": _words(rng, MOOD_WORDS) + f" day{rng.randrange(1000)}"}
+    if r < 0.65:
+        return "chat", "POST", "/chat-prescription", {"text": _words(rng, SYMPTOM_WORDS)}
+    if r < 0.85:
+        return "history_get", "GET", f"/history/{user}?limit=50", None
+    if r < 0.95:
+        start = (seed_data.APPOINTMENT_START + timedelta(days=rng.randrange(seed_data.APPOINTMENT_DAYS))).strftime("%Y-%m-%d")
+        return "appointments_get", "GET", f"/appointments?start={start}&limit=50", None
+    if r < 0.99:
+        return "history_post", "POST", "/history", {"username": user, "event_type": "Load Test", "content": _words(rng, SYMPTOM_WORDS)}
+    return "pdf", "POST", "/pdf/report", {"patient": user, "text": _words(rng, SYMPTOM_WORDS)}
+
+
+# -----------------------------
+# CLIENT
+# -----------------------------
+def login(port):
+    """Bearer token for the admin the server was started with."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    body = json.dumps({"username": seed_data.user_name(0), "password": seed_data.BENCH_PASSWORD})
+    conn.request("POST", "/login", body=body, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    conn.close()
+    if resp.status != 200:
+        raise RuntimeError(f"login failed: {resp.status} {data}")
+    return data["access_token"]
+
+
+def _client_thread(port, deadline, users, seed, out):
+    rng = random.Random(seed)
+    auth = {"Authorization": f"Bearer {login(port)}"}
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while time.perf_counter() < deadline:
+        endpoint, method, path, body = _request(rng, users)
+        data = json.dumps(body).encode() if body is not None else None
+        headers = dict(auth, **({"Content-Type": "application/json"} if data else {}))
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+        except (OSError, http.client.HTTPException):
+            status = 0
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        out.append((endpoint, status, (time.perf_counter() - start) * 1000))
+    conn.close()
+
+
+def _client_process(port, duration, threads, users, seed, queue):
+    deadline = time.perf_counter() + duration
+    out = []
+    workers = [
+        threading.Thread(target=_client_thread, args=(port, deadline, users, seed * 1000 + i, out))
+        for i in range(threads)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    queue.put(out)
+
+
+def drive(port, duration, client_procs, threads, users):
+    queue = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_client_process, args=(port, duration, threads, users, i + 1, queue))
+        for i in range(client_procs)
+    ]
+    for p in procs:
+        p.start()
+    samples = []
+    for _ in procs:
+        samples.extend(queue.get())
+    for p in procs:
+        p.join()
+    return samples
+
+
+def summarise(samples, duration):
+    ok = sorted(ms for _, status, ms in samples if 200 <= status < 300)
+    errors = {}
+    for _, status, _ in samples:
+        if not 200 <= status < 300 and status != 409:   # 409 = booked slot, an expected answer
+            errors[status] = errors.get(status, 0) + 1
+
+    def pct(p):
+        return round(ok[min(len(ok) - 1, int(len(ok) * p / 100))], 2) if ok else None
+
+    return {
+        "requests": len(samples),
+        "rps": round(len(ok) / duration, 1),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "errors": errors,
+    }
+
+
+# -----------------------------
+# SERVER
+# -----------------------------
+def start_server(workers, port, db_path):
+    env = dict(os.environ, HEALTHCARE_DB=db_path, HEALTHCARE_ADMINS=seed_data.user_name(0))
+    proc = subprocess.Popen(
+        [sys.executable, "api.py", "--workers", str(workers), "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                # give the other workers a moment to finish starting
+                time.sleep(1 + 0.5 * workers)
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"api.py with {workers} workers did not start on port {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test api.py across worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, min(4, os.cpu_count() or 1)}))
+    parser.add_argument("--clients", type=int, default=16, help="threads per client process")
+    parser.add_argument("--client-procs", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="untimed seconds first, so every worker builds its models")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workdir", default=seed_data.WORKDIR)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    run_db = os.path.join(os.path.abspath(args.workdir), "api_run.db")
+    os.environ["HEALTHCARE_DB"] = run_db
+    manifest = seed_data.ensure_seeded(args.workdir)
+    users = manifest["params"]["users"]
+
+    results = {}
+    print(f"{'workers':>7} | {'req/s':>8} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | errors")
+    for workers in args.workers:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(run_db + suffix):
+                os.remove(run_db + suffix)
+        shutil.copyfile(manifest["db"], run_db)
+        server = start_server(workers, args.port, run_db)
+        try:
+            drive(args.port, args.warmup, args.client_procs, args.clients, users)
+            samples = drive(args.port, args.duration, args.client_procs, args.clients, users)
+        finally:
+            server.terminate()
+            server.wait(30)
+        r = results[workers] = summarise(samples, args.duration)
+        print(f"{workers:>7} | {r['rps']:>8.1f} | {r['p50_ms']:>7} | {r['p95_ms']:>7} | {r['p99_ms']:>7} | {r['errors'] or '-'}")
+
+    base = results[args.workers[0]]["rps"]
+    for workers, r in results.items():
+        print(f"{workers} workers: {r['rps'] / base:.2f}x the throughput of {args.workers[0]}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"cpus": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# benchmarks/run_suite.py — latency suite over the backend hot paths
+#
+# Run from the project root:
+#     python -m benchmarks.run_suite                          # run, compare with benchmarks/baseline.json
+#     python -m benchmarks.run_suite --out results.json       # also keep this run's JSON
+#     python -m benchmarks.run_suite --save-baseline          # make this run the new baseline
+#     python -m benchmarks.run_suite --only history --quick   # subset, fewer iterations
+#
+# The first run seeds a scratch directory (see benchmarks/seed_data.py): 1M
+# history rows, 100k appointments, 1000 users and scaled-up CSVs. Every run
+# copies the seeded database to run.db and points HEALTHCARE_DB at it before
+# any backend module is imported, so writes never touch backend/healthcare.db
+# and each run starts from the same data.
+#
+# Each case times individual calls and reports mean/p50/p95/p99 in ms. A case
+# regresses when its p50 (or --metric) exceeds baseline * (1 + threshold) by at
+# least MIN_REGRESSION_MS; regressions are printed and the exit status is 1.
+# So is a case the baseline has no figure for: a new case fails the comparison
+# until the baseline is regenerated, rather than going unchecked.
+# Baselines are machine-specific: regenerate them on the machine that
+# compares against them.
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks import seed_data
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+THRESHOLD = 0.20
+MIN_REGRESSION_MS = 0.05
+QUICK_FACTOR = 10       # --quick divides iteration counts by this
+
+CASES = []
+
+
+def case(name, n):
+    """Register a case. The function gets the context and returns (fn, [args, ...])."""
+    def register(setup):
+        CASES.append((name, n, setup))
+        return setup
+    return register
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def summarise(timings):
+    timings = sorted(timings)
+    total = sum(timings)
+    return {
+        "n": len(timings),
+        "mean_ms": round(total / len(timings), 4),
+        "p50_ms": round(percentile(timings, 50), 4),
+        "p95_ms": round(percentile(timings, 95), 4),
+        "p99_ms": round(percentile(timings, 99), 4),
+        "ops_per_sec": round(len(timings) / (total / 1000), 1) if total else None,
+    }
+
+
+class Context:
+    def __init__(self, manifest, seed):
+        self.manifest = manifest
+        self.params = manifest["params"]
+        self.data_dir = manifest["data_dir"]
+        self.rng = random.Random(seed)
+        from backend import symptom_classifier
+        self.symptom_words = sorted({w for t in symptom_classifier.read_dataset()[0] for w in t.split()})
+
+    def user(self):
+        return seed_data.user_name(self.rng.randrange(self.params["users"]))
+
+    def text(self, words=None, lo=3, hi=8):
+        words = words or self.symptom_words
+        return " ".join(self.rng.sample(words, self.rng.randint(lo, hi)))
+
+    def unique_texts(self, n, words=None):
+        # a numbered token keeps every text distinct, so nothing is served from the result cache
+        return [f"{self.text(words)} case{i}" for i in range(n)]
+
+
+# -----------------------------
+# CASES
+# -----------------------------
+@case("analyze_symptoms", 2000)
+def _analyze_symptoms(ctx, n):
+    from backend.ai_model import analyze_symptoms, classify_symptoms
+    classify_symptoms("warm up")    # load (or build) the classifier artifact outside the timings
+    return analyze_symptoms, [(t,) for t in ctx.unique_texts(n)]
+
+
+@case("analyze_symptoms_cached", 2000)
+def _analyze_symptoms_cached(ctx, n):
+    from backend.ai_model import analyze_symptoms
+    texts = ctx.unique_texts(20)
+    for t in texts:
+        analyze_symptoms(t)
+    return analyze_symptoms, [(ctx.rng.choice(texts),) for _ in range(n)]
+
+
+@case("analyze_mood", 2000)
+def _analyze_mood(ctx, n):
+    from backend import mood_model
+    from backend.ai_model import analyze_mood, predict_mood
+    predict_mood("warm up")         # load (or seed) the mood model snapshot
+    words = sorted({w for t in mood_model.read_dataset()[0] for w in t.split()})
+    return analyze_mood, [(t,) for t in ctx.unique_texts(n, words)]
+
+
+@case("chat_to_prescription", 2000)
+def _chat_to_prescription(ctx, n):
+    from backend.chat_prescription_ai import chat_to_prescription
+    return chat_to_prescription, [(t,) for t in ctx.unique_texts(n)]
+
+
+@case("classify_symptoms_scaled", 2000)
+def _classify_symptoms_scaled(ctx, n):
+    from backend import symptom_classifier as sc
+    texts, labels = sc.read_dataset(os.path.join(ctx.data_dir, "symptoms.csv"))
+    model = sc.fit(texts, labels)
+    queries = [ctx.rng.choice(texts) for _ in range(n)]
+    return (lambda q: sc.classify_symptoms(q, model=model)), [(q,) for q in queries]
+
+
+@case("fit_symptom_classifier_scaled", 5)
+def _fit_symptom_classifier_scaled(ctx, n):
+    from backend import symptom_classifier as sc
+    path = os.path.join(ctx.data_dir, "symptoms.csv")
+    return (lambda: sc.fit(*sc.read_dataset(path))), [()] * n
+
+
+@case("train_mood_model_scaled", 5)
+def _train_mood_model_scaled(ctx, n):
+    from backend import mood_model
+    path = os.path.join(ctx.data_dir, "mood_dataset.csv")
+    return (lambda: mood_model.train_initial(path)), [()] * n
+
+
+@case("prescribe_scaled", 2000)
+def _prescribe_scaled(ctx, n):
+    from backend.chat_prescription_ai import _prescribe, load_index
+    index = load_index(os.path.join(ctx.data_dir, "prescription_data.csv"))
+    keywords = [rule.keyword for rule in index.rules]
+    queries = [f"{ctx.text(lo=2, hi=5)} {ctx.rng.choice(keywords)} since yesterday" for _ in range(n)]
+    return (lambda q: _prescribe(index, q)), [(q,) for q in queries]
+
+
+@case("generate_pdf", 50)
+def _generate_pdf(ctx, n):
+    from backend.pdf_module import generate_pdf
+    return (lambda p, t: generate_pdf(p, t, use_cache=False)), [(ctx.user(), ctx.text(hi=40)) for _ in range(n)]
+
+
+@case("generate_prescription_pdf", 50)
+def _generate_prescription_pdf(ctx, n):
+    from backend.pdf_module import generate_prescription_pdf
+    meds = ["Paracetamol 500mg — twice daily", "ORS — 200 ml after meals", "Vitamin C — once daily"]
+    args = [(ctx.user(), "Dr. Bench", ctx.text(), "Viral Fever", meds) for _ in range(n)]
+    return (lambda *a: generate_prescription_pdf(*a, use_cache=False)), args
+
+
+@case("add_history", 2000)
+def _add_history(ctx, n):
+    from backend.database import add_history
+    return add_history, [(ctx.user(), "Symptom Check", ctx.text()) for _ in range(n)]
+
+
+@case("get_history_first_page", 1000)
+def _get_history_first_page(ctx, n):
+    from backend.database import HISTORY_PAGE_SIZE, get_history
+    return (lambda u: get_history(u, limit=HISTORY_PAGE_SIZE)), [(ctx.user(),) for _ in range(n)]
+
+
+@case("get_history_first_page_cached", 1000)
+def _get_history_first_page_cached(ctx, n):
+    from backend.database import HISTORY_PAGE_SIZE, get_history
+    users = [ctx.user() for _ in range(20)]
+    for u in users:
+        get_history(u, limit=HISTORY_PAGE_SIZE)
+    return (lambda u: get_history(u, limit=HISTORY_PAGE_SIZE)), [(ctx.rng.choice(users),) for _ in range(n)]
+
+
+@case("get_history_deep_page", 1000)
+def _get_history_deep_page(ctx, n):
+    from backend.database import HISTORY_PAGE_SIZE, get_history
+    start = seed_data.HISTORY_START
+    args = []
+    for _ in range(n):
+        ts = start + timedelta(seconds=ctx.rng.randrange(seed_data.HISTORY_DAYS * 86400))
+        args.append((ctx.user(), f"{ts:%Y-%m-%d %H:%M:%S}|{2 ** 62}"))
+    return (lambda u, before: get_history(u, limit=HISTORY_PAGE_SIZE, before=before)), args
+
+
+@case("get_history_filtered", 1000)
+def _get_history_filtered(ctx, n):
+    from backend.database import HISTORY_PAGE_SIZE, get_history
+    start = seed_data.HISTORY_START.date()
+    args = []
+    for _ in range(n):
+        day = start + timedelta(days=ctx.rng.randrange(seed_data.HISTORY_DAYS - 30))
+        args.append((ctx.user(), ctx.rng.choice(seed_data.EVENT_TYPES), day, day + timedelta(days=30)))
+    return (lambda u, e, s, t: get_history(u, limit=HISTORY_PAGE_SIZE, event_type=e, start=s, end=t)), args
+
+
+@case("save_appointment", 1000)
+def _save_appointment(ctx, n):
+    from backend.appointments import save_appointment
+    args = []
+    for _ in range(n):
+        day = date(2030, 1, 1) + timedelta(days=ctx.rng.randrange(365))
+        minute = 15 * ctx.rng.randrange(8 * 4, 20 * 4)
+        args.append((ctx.user(), str(day), f"{minute // 60:02d}:{minute % 60:02d}:00", "bench", 30))
+    return save_appointment, args
+
+
+@case("get_appointments", 1000)
+def _get_appointments(ctx, n):
+    from backend.appointments import PAGE_SIZE, get_appointments
+    start = seed_data.APPOINTMENT_START.date()
+    args = []
+    for _ in range(n):
+        day = start + timedelta(days=ctx.rng.randrange(seed_data.APPOINTMENT_DAYS))
+        args.append((day, day + timedelta(days=7)))
+    return (lambda s, e: get_appointments(start=s, end=e, limit=PAGE_SIZE)), args
+
+
+@case("get_appointments_cached", 1000)
+def _get_appointments_cached(ctx, n):
+    from backend.appointments import PAGE_SIZE, get_appointments
+    start = seed_data.APPOINTMENT_START.date()
+    days = [start + timedelta(days=ctx.rng.randrange(seed_data.APPOINTMENT_DAYS)) for _ in range(20)]
+    for day in days:
+        get_appointments(start=day, end=day + timedelta(days=7), limit=PAGE_SIZE)
+    args = [(day, day + timedelta(days=7)) for day in (ctx.rng.choice(days) for _ in range(n))]
+    return (lambda s, e: get_appointments(start=s, end=e, limit=PAGE_SIZE)), args
+
+
+@case("validate_user", 2000)
+def _validate_user(ctx, n):
+    from backend.database import validate_user
+    return validate_user, [(ctx.user(), seed_data.BENCH_PASSWORD) for _ in range(n)]
+
+
+# -----------------------------
+# RUNNER
+# -----------------------------
+def run_cases(ctx, only=None, quick=False):
+    results = {}
+    for name, n, setup in CASES:
+        if only and not any(o in name for o in only):
+            continue
+        n = max(1, n // QUICK_FACTOR) if quick else n
+        fn, calls = setup(ctx, n)
+        fn(*calls[0])   # warm up (imports, model loads, first connection)
+        timings = []
+        for args in calls:
+            start = time.perf_counter()
+            fn(*args)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = summarise(timings)
+        r = results[name]
+        print(f"{name:>30} | {r['n']:>5} | {r['mean_ms']:>9.3f} | {r['p50_ms']:>9.3f} | {r['p95_ms']:>9.3f} | {r['p99_ms']:>9.3f}")
+    return results
+
+
+def compare(results, baseline, metric="p50_ms", threshold=THRESHOLD):
+    """Return (regressions, missing): cases slower than baseline, and cases it has no figure for."""
+    regressions, missing = [], []
+    for name, res in results.items():
+        old = baseline.get("results", {}).get(name, {}).get(metric)
+        new = res.get(metric)
+        if old is None or new is None:
+            missing.append(name)
+            continue
+        if new > old * (1 + threshold) and new - old >= MIN_REGRESSION_MS:
+            regressions.append((name, old, new))
+    return regressions, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend benchmark suite")
+    parser.add_argument("--workdir", default=seed_data.WORKDIR, help="scratch directory for the seeded data")
+    parser.add_argument("--history", type=int, default=seed_data.HISTORY_ROWS)
+    parser.add_argument("--appointments", type=int, default=seed_data.APPOINTMENT_ROWS)
+    parser.add_argument("--seed", type=int, default=seed_data.SEED)
+    parser.add_argument("--only", nargs="*", help="run cases whose name contains any of these")
+    parser.add_argument("--quick", action="store_true", help=f"1/{QUICK_FACTOR} of the iterations")
+    parser.add_argument("--out", help="write this run's results to a JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write results to --baseline instead of comparing")
+    parser.add_argument("--metric", default="p50_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # must happen before the first backend.db_pool import (seeding included), which reads it
+    run_db = os.path.join(os.path.abspath(args.workdir), "run.db")
+    os.environ["HEALTHCARE_DB"] = run_db
+    os.environ.pop("HEALTHCARE_WRITE_BEHIND", None)
+
+    manifest = seed_data.ensure_seeded(args.workdir, args.history, args.appointments, seed=args.seed)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(run_db + suffix):
+            os.remove(run_db + suffix)
+    shutil.copyfile(manifest["db"], run_db)
+
+    ctx = Context(manifest, args.seed)
+    print(f"{'case':>30} | {'n':>5} | {'mean ms':>9} | {'p50 ms':>9} | {'p95 ms':>9} | {'p99 ms':>9}")
+    results = run_cases(ctx, args.only, args.quick)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": args.quick,
+            "params": manifest["params"],
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print("baseline written to", args.baseline)
+        return
+
+    if not os.path.exists(args.baseline):
+        print("no baseline at", args.baseline, "(run with --save-baseline)")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("params") != manifest["params"]:
+        print("warning: baseline was recorded with different data parameters")
+    regressions, missing = compare(results, baseline, args.metric, args.threshold)
+    for name, old, new in regressions:
+        print(f"REGRESSION {name}: {args.metric} {old:.3f} -> {new:.3f} ({(new / old - 1) * 100:+.0f}%)")
+    for name in missing:
+        print(f"NO BASELINE {name}: not in {args.baseline} (run with --save-baseline)")
+    if regressions or missing:
+        sys.exit(1)
+    print(f"no regressions ({args.metric}, threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# benchmarks/seed_data.py — seeded scratch database and scaled datasets
+#
+# Run from the project root:
+#     python -m benchmarks.seed_data [--workdir DIR] [--history 1000000] [--appointments 100000]
+#
+# Builds, in a scratch directory (never backend/healthcare.db):
+#   seed.db                  users, history and appointments at benchmark scale
+#   data/symptoms.csv        symptoms dataset scaled up by mixing per-diagnosis words
+#   data/mood_dataset.csv    mood dataset scaled up the same way
+#   data/prescription_data.csv  prescription rules with generated keywords
+#   manifest.json            the parameters used; ensure_seeded() reuses a
+#                            directory whose manifest matches
+# A reused seed.db is first brought up to the current schema, background steps
+# (e.g. the full-text backfill) included, so no run times them by accident.
+# The same seed always produces the same data.
+
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from benchmarks.bench_symptom_classifier import scale_dataset
+
+WORKDIR = os.path.join(tempfile.gettempdir(), "healthcare_bench")
+SEED = 42
+USERS = 1000
+HISTORY_ROWS = 1_000_000
+APPOINTMENT_ROWS = 100_000
+SYMPTOM_ROWS = 100_000
+MOOD_ROWS = 50_000
+PRESCRIPTION_ROWS = 5_000
+CHUNK = 50_000
+MANIFEST_VERSION = 1
+
+BENCH_PASSWORD = "bench-password"
+EVENT_TYPES = ["Symptom Check", "Mental Health", "PDF Analysis", "Chat Prescription", "mood_label", "Image Analysis"]
+HISTORY_START = datetime(2024, 1, 1)
+HISTORY_DAYS = 730
+APPOINTMENT_START = datetime(2025, 1, 1)
+APPOINTMENT_DAYS = 730
+DURATIONS = [15, 30, 30, 30, 45, 60]
+
+
+def user_name(i):
+    return f"user{i:05d}"
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# -----------------------------
+# DATABASE
+# -----------------------------
+def _history_rows(n, users, words, rng):
+    span = HISTORY_DAYS * 86400
+    for _ in range(n):
+        ts = HISTORY_START + timedelta(seconds=rng.randrange(span))
+        content = " ".join(rng.sample(words, rng.randint(3, 8)))
+        yield (user_name(rng.randrange(users)), rng.choice(EVENT_TYPES), content, ts.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def _appointment_rows(n, users, rng):
+    from backend.appointments import to_ts
+
+    for _ in range(n):
+        start = APPOINTMENT_START + timedelta(days=rng.randrange(APPOINTMENT_DAYS), minutes=15 * rng.randrange(8 * 4, 20 * 4))
+        yield (
+            user_name(rng.randrange(users)),
+            start.strftime("%Y-%m-%d"),
+            start.strftime("%H:%M:%S"),
+            "follow-up",
+            "2024-12-31 00:00:00",
+            to_ts(start),
+            rng.choice(DURATIONS),
+        )
+
+
+def seed_database(path, history=HISTORY_ROWS, appointments=APPOINTMENT_ROWS, users=USERS, seed=SEED, words=None):
+    from backend.database import hash_password
+    from backend.db_pool import get_pool
+    from backend.migrations import migrate
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng = random.Random(seed)
+    words = words or sorted({w for text in _base_symptoms()[0] for w in text.split()})
+    pool = get_pool(path)
+    migrate(pool)
+
+    with pool.transaction() as conn:
+        hashed = hash_password(BENCH_PASSWORD)
+        conn.executemany(
+            "INSERT INTO users (username, password, created_at) VALUES (?, ?, ?)",
+            [(user_name(i), hashed, "2024-01-01 00:00:00") for i in range(users)]
+        )
+    for chunk in _chunks(_history_rows(history, users, words, rng), CHUNK):
+        with pool.transaction() as conn:
+            conn.executemany("INSERT INTO history (username, event_type, content, timestamp) VALUES (?, ?, ?, ?)", chunk)
+    for chunk in _chunks(_appointment_rows(appointments, users, rng), CHUNK):
+        with pool.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO appointments (name, date, time, notes, created_at, start_ts, duration_min)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, chunk)
+    with pool.connection() as conn:
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    pool.close_all()
+
+
+def upgrade_database(path):
+    """Apply pending migrations and finish background steps on an existing seed.db."""
+    from backend.db_pool import get_pool
+    from backend.migrations import migrate, pending_background, run_background
+
+    pool = get_pool(path)
+    try:
+        changed = bool(migrate(pool))
+        if pending_background(pool):
+            print(f"finishing background schema steps on {path} ...")
+            run_background(pool)
+            changed = True
+        if changed:
+            with pool.connection() as conn:
+                conn.execute("ANALYZE")
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        pool.close_all()
+
+
+# -----------------------------
+# DATASETS
+# -----------------------------
+def _base_symptoms():
+    from backend import symptom_classifier
+    return symptom_classifier.read_dataset()
+
+
+def _write_csv(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_datasets(data_dir, symptom_rows=SYMPTOM_ROWS, mood_rows=MOOD_ROWS, prescription_rows=PRESCRIPTION_ROWS, seed=SEED):
+    from backend import mood_model
+    from backend.chat_prescription_ai import CSV_PATH as PRESCRIPTION_CSV
+
+    os.makedirs(data_dir, exist_ok=True)
+    rng = random.Random(seed)
+
+    texts, labels = scale_dataset(*_base_symptoms(), symptom_rows, rng)
+    _write_csv(os.path.join(data_dir, "symptoms.csv"), ["symptoms", "diagnosis"], zip(texts, labels))
+
+    texts, labels = scale_dataset(*mood_model.read_dataset(), mood_rows, rng)
+    _write_csv(os.path.join(data_dir, "mood_dataset.csv"), ["text", "status"], zip(texts, labels))
+
+    # every base rule gets keyword variants: two symptom words plus a number
+    with open(PRESCRIPTION_CSV, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        base = [row for row in reader if row]
+    words = sorted({w for text in _base_symptoms()[0] for w in text.split()})
+    rows = []
+    for i in range(prescription_rows):
+        row = list(base[i % len(base)])
+        row[0] = row[0] if i < len(base) else f"{rng.choice(words)} {rng.choice(words)}{i}"
+        rows.append(row)
+    _write_csv(os.path.join(data_dir, "prescription_data.csv"), header, rows)
+
+
+# -----------------------------
+# ENTRY POINTS
+# -----------------------------
+def ensure_seeded(workdir=WORKDIR, history=HISTORY_ROWS, appointments=APPOINTMENT_ROWS, users=USERS,
+                  symptom_rows=SYMPTOM_ROWS, mood_rows=MOOD_ROWS, prescription_rows=PRESCRIPTION_ROWS, seed=SEED,
+                  force=False):
+    """Seed workdir unless its manifest already matches; returns the manifest."""
+    params = {
+        "manifest_version": MANIFEST_VERSION,
+        "seed": seed,
+        "users": users,
+        "history": history,
+        "appointments": appointments,
+        "symptom_rows": symptom_rows,
+        "mood_rows": mood_rows,
+        "prescription_rows": prescription_rows,
+    }
+    manifest_path = os.path.join(workdir, "manifest.json")
+    db_path = os.path.join(workdir, "seed.db")
+    data_dir = os.path.join(workdir, "data")
+
+    if not force and os.path.exists(manifest_path) and os.path.exists(db_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("params") == params:
+            upgrade_database(db_path)
+            return manifest
+
+    os.makedirs(workdir, exist_ok=True)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    print(f"seeding {workdir}: {history} history rows, {appointments} appointments, {users} users ...")
+    write_datasets(data_dir, symptom_rows, mood_rows, prescription_rows, seed)
+    seed_database(db_path, history, appointments, users, seed)
+
+    manifest = {
+        "params": params,
+        "db": db_path,
+        "data_dir": data_dir,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a scratch healthcare.db and scaled CSVs for benchmarks")
+    parser.add_argument("--workdir", default=WORKDIR)
+    parser.add_argument("--history", type=int, default=HISTORY_ROWS)
+    parser.add_argument("--appointments", type=int, default=APPOINTMENT_ROWS)
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--force", action="store_true", help="reseed even if the manifest matches")
+    args = parser.parse_args()
+
+    manifest = ensure_seeded(args.workdir, args.history, args.appointments, args.users, seed=args.seed, force=args.force)
+    print(json.dumps({k: manifest[k] for k in ("db", "data_dir", "params")}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
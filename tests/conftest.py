@@ -0,0 +1,27 @@
+# tests/conftest.py — point every backend module at scratch files
+#
+# Backend modules read HEALTHCARE_DB and the cache directories at import
+# time, so they are set here before any test imports backend. All tests
+# share one scratch database; each test uses its own usernames/dates.
+import os
+import tempfile
+import uuid
+
+import pytest
+
+SCRATCH = tempfile.mkdtemp(prefix="healthcare-tests-")
+os.environ["HEALTHCARE_DB"] = os.path.join(SCRATCH, "healthcare.db")
+os.environ["PDF_CACHE_DIR"] = os.path.join(SCRATCH, "pdf-cache")
+os.environ.pop("HEALTHCARE_WRITE_BEHIND", None)
+os.environ.pop("HEALTHCARE_ADMINS", None)
+
+
+@pytest.fixture
+def user():
+    """A username no other test uses."""
+    return f"test_{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def db_path():
+    return os.environ["HEALTHCARE_DB"]
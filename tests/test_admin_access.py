@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from backend import metrics
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def pages_for(username, monkeypatch, admins=None):
+    if admins is None:
+        monkeypatch.delenv("HEALTHCARE_ADMINS", raising=False)
+    else:
+        monkeypatch.setenv("HEALTHCARE_ADMINS", admins)
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.session_state["logged_in"] = True
+    at.session_state["current_user"] = username
+    at.run()
+    assert not at.exception
+    return at.sidebar.radio[0].options
+
+
+def test_no_user_is_admin_by_default(monkeypatch):
+    assert "Admin" not in pages_for("admin", monkeypatch)
+
+
+def test_admins_come_from_the_environment(monkeypatch):
+    assert "Admin" in pages_for("ops", monkeypatch, admins="ops, other")
+    assert "Admin" not in pages_for("admin", monkeypatch, admins="ops")
+
+
+def test_prometheus_text_goes_to_the_configured_file(monkeypatch, tmp_path):
+    target = tmp_path / "metrics.prom"
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(target))
+    assert metrics.write_prometheus() == str(target)
+    assert target.exists()
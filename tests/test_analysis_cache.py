@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from backend import ai_model
+from backend.result_cache import ResultCache, get_result_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    get_result_cache().clear()
+    yield
+    ai_model.set_seed(None)
+    get_result_cache().clear()
+
+
+def uncached(kind, text):
+    return ai_model.RULE_SETS[kind].match(ai_model.rule_text(text))
+
+
+def test_punctuation_variants_do_not_share_a_cached_answer():
+    ai_model.analyze_symptoms("head,pain")
+    assert ai_model.analyze_symptoms("head pain") == uncached("symptoms", "head pain")
+    assert "headache" in ai_model.analyze_symptoms("head pain")
+
+
+def test_apostrophes_are_matched_as_written():
+    confused = uncached("mood", "I don't understand")
+    assert ai_model.analyze_mood("I don't understand") == confused
+    assert ai_model.analyze_mood("I don t understand") != confused
+
+
+def test_results_come_from_the_cache_on_repeat():
+    before = get_result_cache().stats()["hits"]
+    ai_model.analyze_symptoms("Sore throat since monday")
+    ai_model.analyze_symptoms("  sore THROAT since monday ")
+    assert get_result_cache().stats()["hits"] == before + 1
+
+
+def test_fallback_is_the_same_for_every_call_and_changes_with_the_seed():
+    rules = ai_model.MOOD_RULES
+    text = "qqqq zzzz xxxx"
+    if rules.match(text) is not None:
+        pytest.skip("the mood model answered this text")
+    texts = [f"{text} {i}" for i in range(20)]
+    default = [ai_model.analyze_mood(t) for t in texts]
+    get_result_cache().clear()
+    assert [ai_model.analyze_mood(t) for t in texts] == default
+    assert len(set(default)) > 1      # spread over the fallback answers
+
+    ai_model.set_seed(3)
+    seeded = [ai_model.analyze_mood(t) for t in texts]
+    assert seeded != default      # not served the default seed's cached answers
+    assert list(ai_model.analyze_mood_batch(texts, workers=1)) == seeded
+    ai_model.set_seed(None)
+    assert [ai_model.analyze_mood(t) for t in texts] == default
+
+
+def test_whitespace_runs_share_one_cached_answer():
+    before = get_result_cache().stats()["hits"]
+    answer = ai_model.analyze_symptoms("chest pain")
+    assert ai_model.analyze_symptoms("Chest  \t pain\n") == answer
+    assert get_result_cache().stats()["hits"] == before + 1
+
+
+def test_answers_come_from_the_rules_a_data_change_just_loaded(tmp_path, monkeypatch):
+    watched = tmp_path / "keyword_rules.json"
+    watched.write_text("v1")
+    cache = ResultCache(watched=[str(watched)])
+    monkeypatch.setattr(ai_model, "_cache", cache)
+
+    table = {"empty": "empty", "fallback": ["fallback"],
+             "rules": [{"keywords": ["zzyzx"], "response": "new rule"}]}
+    cache.on_change(lambda: monkeypatch.setitem(ai_model.RULE_SETS, "symptoms", ai_model.RuleSet(table)))
+    assert ai_model.analyze_symptoms("zzyzx") != "new rule"
+
+    watched.write_text("version 2")
+    cache._next_check = 0
+    assert ai_model.analyze_symptoms("zzyzx") == "new rule"
+
+
+def test_a_data_change_reloads_once_however_many_callers_see_it(tmp_path):
+    watched = tmp_path / "data.csv"
+    watched.write_text("v1")
+    cache = ResultCache(watched=[str(watched)])
+    reloads = []
+    cache.on_change(lambda: (reloads.append(1), time.sleep(0.05)))
+    watched.write_text("version 2")
+    cache._next_check = 0
+
+    start = threading.Barrier(8)
+
+    def call():
+        start.wait()
+        cache.get_or_compute("ns", "text", lambda: "answer")
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert reloads == [1]
+
+
+def test_a_value_computed_across_an_invalidation_is_not_stored():
+    cache = ResultCache(watched=[])
+
+    def compute():
+        cache.clear()       # the data changed while this ran
+        return "old answer"
+
+    assert cache.get_or_compute("ns", "text", compute) == "old answer"
+    assert cache.get_or_compute("ns", "text", lambda: "new answer") == "new answer"
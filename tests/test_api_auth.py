@@ -0,0 +1,93 @@
+# tests/test_api_auth.py — bearer tokens and per-user history access in api.py
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from backend.database import add_user
+
+PASSWORD = "pw-123456"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv(api.SECRET_ENV, "test-secret")
+    monkeypatch.setattr(api, "ADMIN_USERS", set())
+    with TestClient(api.app) as c:
+        yield c
+
+
+def login(client, username):
+    add_user(username, PASSWORD)
+    resp = client.post("/login", json={"username": username, "password": PASSWORD})
+    assert resp.status_code == 200
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+def test_endpoints_need_a_token(client, user):
+    assert client.get("/health").status_code == 200
+    assert client.get(f"/history/{user}").status_code == 401
+    assert client.post("/history", json={"username": user, "event_type": "x", "content": "y"}).status_code == 401
+    assert client.get("/appointments").status_code == 401
+    assert client.post("/symptoms", json={"text": "fever"}).status_code == 401
+    bad = {"Authorization": "Bearer not.a.token"}
+    assert client.get(f"/history/{user}", headers=bad).status_code == 401
+
+
+def test_wrong_password_is_refused(client, user):
+    add_user(user, PASSWORD)
+    assert client.post("/login", json={"username": user, "password": "nope"}).status_code == 401
+
+
+def test_history_is_limited_to_the_caller(client, user):
+    other = user + "_other"
+    auth = login(client, user)
+    login(client, other)
+
+    assert client.post("/history", json={"username": user, "event_type": "Note", "content": "mine"},
+                       headers=auth).status_code == 201
+    rows = client.get(f"/history/{user}", headers=auth).json()["rows"]
+    assert [r["content"] for r in rows] == ["mine"]
+
+    assert client.get(f"/history/{other}", headers=auth).status_code == 403
+    assert client.post("/history", json={"username": other, "event_type": "Note", "content": "forged"},
+                       headers=auth).status_code == 403
+
+
+def test_admin_reads_any_history(client, monkeypatch, user):
+    admin = user + "_admin"
+    monkeypatch.setattr(api, "ADMIN_USERS", {admin})
+    auth = login(client, admin)
+    assert client.get(f"/history/{user}", headers=auth).status_code == 200
+
+
+def test_tampered_or_expired_token_is_rejected(monkeypatch):
+    monkeypatch.setenv(api.SECRET_ENV, "test-secret")
+    token = api.issue_token("alice")
+    assert api.verify_token(token) == "alice"
+
+    name, expires, signature = token.split(".")
+    assert api.verify_token(f"{api.issue_token('bob').split('.')[0]}.{expires}.{signature}") is None
+    assert api.verify_token(api.issue_token("alice", ttl=-1)) is None
+
+    monkeypatch.setenv(api.SECRET_ENV, "other-secret")
+    assert api.verify_token(token) is None
+
+
+def test_refuses_to_start_without_a_secret(monkeypatch):
+    monkeypatch.delenv(api.SECRET_ENV, raising=False)
+    with pytest.raises(RuntimeError):
+        with TestClient(api.app):
+            pass
+
+
+def test_bulk_endpoints_are_admin_only(client, monkeypatch, user):
+    admin = user + "_admin"
+    auth = login(client, user)
+    assert client.get("/export/history", headers=auth).status_code == 403
+    assert client.post("/import/history", content=b"", headers=auth).status_code == 403
+
+    monkeypatch.setattr(api, "ADMIN_USERS", {admin})
+    auth = login(client, admin)
+    assert client.get("/export/history", headers=auth).status_code == 200
+    assert client.get("/export/users", headers=auth).status_code == 404
+    assert client.post("/import/users", content=b"", headers=auth).status_code == 404
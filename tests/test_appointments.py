@@ -0,0 +1,77 @@
+# tests/test_appointments.py — booking outcomes and overlap detection
+import itertools
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from backend import appointments
+from backend.appointments import BOOKED, DB_ERROR, INVALID, OVERLAP, find_conflicts, save_appointment
+
+# one calendar for every appointment, so each test books on days nobody else uses
+_days = itertools.count()
+
+
+@pytest.fixture
+def day():
+    return str(date(2050, 1, 1) + timedelta(days=next(_days)))
+
+
+def book(day, time, minutes=30, name="Patient"):
+    return save_appointment(name, day, time, "", minutes)
+
+
+def test_booking_returns_the_new_id(day):
+    booking = book(day, "09:00")
+    assert booking.reason == BOOKED and booking.id and booking.detail is None
+    assert [a["id"] for a in find_conflicts(day, "09:15")] == [booking.id]
+
+
+@pytest.mark.parametrize("time, minutes", [
+    ("09:00", 30),      # same slot
+    ("09:29", 30),      # starts inside
+    ("08:45", 30),      # ends inside
+    ("08:00", 240),     # covers it
+    ("09:10", 5),       # inside it
+])
+def test_overlaps_are_refused(day, time, minutes):
+    book(day, "09:00")
+    booking = book(day, time, minutes, name="Someone else")
+    assert booking == (None, OVERLAP, f"{day} 09:00")
+
+
+@pytest.mark.parametrize("time, minutes", [("08:30", 30), ("09:30", 30), ("06:00", 180)])
+def test_back_to_back_is_not_an_overlap(day, time, minutes):
+    book(day, "09:00")
+    assert book(day, time, minutes).reason == BOOKED
+
+
+def test_long_appointment_from_the_day_before(day):
+    prev = str(date.fromisoformat(day) - timedelta(days=1))
+    book(prev, "23:00", 120)
+    assert book(day, "00:30").reason == OVERLAP
+    assert book(day, "01:00").reason == BOOKED
+
+
+@pytest.mark.parametrize("time, minutes", [("not a time", 30), ("09:00", 0), ("09:00", appointments.MAX_DURATION_MIN + 1)])
+def test_invalid_input(day, time, minutes):
+    booking = book(day, time, minutes)
+    assert booking.reason == INVALID and booking.id is None and booking.detail
+
+
+def test_database_error(day, monkeypatch):
+    def broken():
+        raise RuntimeError("disk I/O error")
+
+    monkeypatch.setattr(appointments, "get_transaction", broken)
+    assert book(day, "09:00") == (None, DB_ERROR, "disk I/O error")
+
+
+def test_concurrent_bookings_of_one_slot(day):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(book(day, "10:00").reason)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(results) == [BOOKED] + [OVERLAP] * 7
@@ -0,0 +1,46 @@
+# tests/test_batch_analysis.py — the process-pool batch path answers like single calls
+import concurrent.futures
+import random
+
+import pytest
+
+from backend import ai_model
+from backend.result_cache import get_result_cache
+
+
+def texts(n=120, seed=11):
+    rng = random.Random(seed)
+    words = sorted({w for table in ai_model._RULES.values() for rule in table["rules"]
+                    for kw in rule["keywords"] for w in kw.split()})
+    noise = ["qqqq", "zzzz", "xxyy", "blorp", "wibble", "today", "and", "my"]
+    out = ["", "   ", "Chest  PAIN!!", "I don't understand", "qqqq zzzz"]
+    for i in range(n):
+        picked = rng.sample(words, rng.randint(0, 3)) + rng.sample(noise, rng.randint(1, 4))
+        rng.shuffle(picked)
+        out.append(" ".join(picked) + f" {i}")      # numbered: most unmatched texts differ
+    return out
+
+
+@pytest.mark.parametrize("analyze, batch", [
+    (ai_model.analyze_symptoms, ai_model.analyze_symptoms_batch),
+    (ai_model.analyze_mood, ai_model.analyze_mood_batch),
+])
+@pytest.mark.parametrize("seed", [None, 7])
+def test_pool_path_matches_single_calls(analyze, batch, seed, monkeypatch):
+    pools = []
+    real_pool = concurrent.futures.ProcessPoolExecutor
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", lambda **kw: pools.append(kw) or real_pool(**kw))
+    ai_model.set_seed(seed)
+    try:
+        items = texts()
+        get_result_cache().clear()
+        expected = [analyze(t) for t in items]
+        fallbacks = set(ai_model.RULE_SETS["mood" if analyze is ai_model.analyze_mood else "symptoms"].fallback)
+        assert sum(answer in fallbacks for answer in expected) >= 10   # fallback cases are covered
+
+        pooled = list(batch(iter(items), workers=2, threshold=20, chunk_size=9))
+        assert pooled == expected
+        assert pools == [{"max_workers": 2}]
+    finally:
+        ai_model.set_seed(None)
+        get_result_cache().clear()
@@ -0,0 +1,90 @@
+# tests/test_bulk_import.py — an interrupted import resumes with no gaps and no duplicates
+import json
+
+import pytest
+
+from backend import bulk_io
+from backend.database import get_connection
+
+ROWS = 95
+CHUNK = 10
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def write_history(path, username):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(ROWS):
+            f.write(json.dumps({"username": username, "event_type": "Import",
+                                "content": f"row {i}", "timestamp": f"2025-01-01 00:{i // 60:02d}:{i % 60:02d}"}) + "\n")
+
+
+def imported(username):
+    with get_connection() as conn:
+        return [r[0] for r in conn.execute(
+            "SELECT content FROM history WHERE username = ? ORDER BY id", (username,))]
+
+
+def index_names(conn):
+    return {r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'history' AND sql IS NOT NULL")}
+
+
+def test_interrupted_import_resumes_exactly(tmp_path, user):
+    path = str(tmp_path / "history.jsonl")
+    write_history(path, user)
+    with get_connection() as conn:
+        indexes = index_names(conn)
+
+    def stop_after_three_chunks(stats):
+        if stats["read"] >= 3 * CHUNK:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        bulk_io.import_file("history", path, chunk=CHUNK, defer_indexes=True, progress=stop_after_three_chunks)
+
+    assert len(imported(user)) == 3 * CHUNK
+    job = bulk_io.job_id("history", path)
+    pending = {j["job"]: j for j in bulk_io.pending_imports()}
+    assert pending[job]["rows_read"] == 3 * CHUNK
+    with get_connection() as conn:
+        assert index_names(conn) == indexes     # put back on the way out
+
+    stats = bulk_io.import_file("history", path, chunk=CHUNK, defer_indexes=True)
+
+    assert stats == {"read": ROWS - 3 * CHUNK, "imported": ROWS - 3 * CHUNK, "skipped": 3 * CHUNK, "rejected": 0}
+    assert imported(user) == [f"row {i}" for i in range(ROWS)]
+    assert job not in {j["job"] for j in bulk_io.pending_imports()}
+    with get_connection() as conn:
+        assert index_names(conn) == indexes
+
+
+def test_bad_records_are_rejected_not_fatal(tmp_path, user):
+    path = str(tmp_path / "history.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"username": user, "event_type": "Import", "content": "ok"}) + "\n")
+        f.write("{not json\n")
+        f.write(json.dumps({"username": user}) + "\n")
+
+    stats = bulk_io.import_file("history", path)
+
+    assert stats["imported"] == 1 and stats["rejected"] == 2
+    assert imported(user) == ["ok"]
+
+
+def test_appointment_durations_outside_the_booking_range_are_rejected(tmp_path, user):
+    path = str(tmp_path / "appointments.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for duration in (30, "", 240, 0, -15, 241, 600):
+            f.write(json.dumps({"name": user, "date": "2050-02-01", "time": "09:00",
+                                "duration_min": duration}) + "\n")
+
+    stats = bulk_io.import_file("appointments", path)
+
+    assert stats["imported"] == 3 and stats["rejected"] == 4
+    with get_connection() as conn:
+        durations = [r[0] for r in conn.execute(
+            "SELECT duration_min FROM appointments WHERE name = ? ORDER BY id", (user,))]
+    assert durations == [30, 30, 240]
@@ -0,0 +1,85 @@
+# tests/test_chat_prescription.py — keyword matching in the prescription index
+import os
+import time
+
+import pytest
+
+from backend.chat_prescription_ai import PrescriptionIndex
+
+ROWS = [
+    {"symptom_keyword": "fever", "diagnosis": "Fever"},
+    {"symptom_keyword": "cough", "diagnosis": "Cough"},
+    {"symptom_keyword": "cold", "diagnosis": "Cold"},
+    {"symptom_keyword": "stomach pain", "diagnosis": "Gastritis"},
+    {"symptom_keyword": "vomiting", "diagnosis": "Gastroenteritis"},
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return PrescriptionIndex(ROWS)
+
+
+def keywords(index, text):
+    return [rule.keyword for rule, _ in index.match(text)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I have been coughing all night", ["cough"]),
+    ("coughs and coughed", ["cough"]),
+    ("feeling feverish", ["fever"]),
+    ("fevers for a week", ["fever"]),
+    ("it is colder and I have a cold", ["cold"]),
+    ("stomach pains since lunch", ["stomach pain"]),
+    ("vomited twice", ["vomiting"]),
+    ("vomiting", ["vomiting"]),
+])
+def test_inflected_forms_match(index, text, expected):
+    assert keywords(index, text) == expected
+
+
+def test_keyword_inside_a_word_does_not_match(index):
+    assert keywords(index, "scolding the dog, no fee") == []
+
+
+def test_multi_word_keyword_needs_every_word(index):
+    assert keywords(index, "stomach ache") == []
+    assert keywords(index, "my stomach") == []
+
+
+def test_ranking_by_hits_then_first_mention(index):
+    assert keywords(index, "cold then fever then fever") == ["fever", "cold"]
+    assert keywords(index, "coughing with a fever") == ["cough", "fever"]
+
+
+def test_a_failed_load_is_retried_only_after_the_file_changes(tmp_path, monkeypatch):
+    from backend import chat_prescription_ai as cpa
+
+    broken = tmp_path / "prescription_data.csv"
+    broken.mkdir()      # stat works, open fails
+    os.utime(broken, ns=(1_000_000_000, 1_000_000_000))
+    fallback = cpa.load_index(str(broken))
+    assert fallback.mtime == 1_000_000_000
+    assert [rule.keyword for rule in fallback.rules] == ["fever"]
+
+    rebuilds = []
+
+    def rebuild():
+        rebuilds.append(1)
+        cpa._reloading.release()
+
+    monkeypatch.setattr(cpa, "CSV_PATH", str(broken))
+    monkeypatch.setattr(cpa, "_index", fallback)
+    monkeypatch.setattr(cpa, "_rebuild", rebuild)
+
+    def check():
+        monkeypatch.setattr(cpa, "_last_check", float("-inf"))
+        cpa.maybe_reload()
+        time.sleep(0.05)    # the reload runs on its own thread
+
+    check()
+    check()
+    assert rebuilds == []
+    os.utime(broken, ns=(2_000_000_000, 2_000_000_000))
+    check()
+    assert rebuilds == [1]
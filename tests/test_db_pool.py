@@ -0,0 +1,90 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from backend import db_pool
+from backend.db_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    p = ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    with p.transaction() as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+    yield p
+    p.close_all()
+
+
+def test_connections_are_reused(pool):
+    with pool.connection() as a:
+        pass
+    with pool.connection() as b:
+        pass
+    assert a is b
+    assert pool.stats()["open"] == 1
+    assert pool.stats()["in_use"] == 0
+
+
+def test_checkout_waits_when_every_connection_is_busy(pool):
+    got = []
+    with pool.connection() as a, pool.connection():
+        t = threading.Thread(target=lambda: got.append(pool._checkout()))
+        t.start()
+        time.sleep(0.1)
+        assert not got      # size 2: the third caller waits
+    t.join(5)
+    assert got and got[0] is not None
+    pool._checkin(got[0])
+    stats = pool.stats()
+    assert stats["waits"] == 1
+    assert stats["open"] == 2
+
+
+def test_transaction_rolls_back_on_error(pool):
+    with pytest.raises(ValueError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO t (v) VALUES ('lost')")
+            raise ValueError("boom")
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO t (v) VALUES ('kept')")
+    with pool.connection() as conn:
+        assert [r["v"] for r in conn.execute("SELECT v FROM t")] == ["kept"]
+        assert not conn.in_transaction
+
+
+def test_begin_retries_while_another_writer_holds_the_lock(pool, monkeypatch):
+    monkeypatch.setattr(db_pool, "LOCK_BACKOFF", 0.02)
+    with pool.connection() as conn:
+        conn.execute("PRAGMA busy_timeout = 0")     # fail fast so the pool's own retry runs
+
+    holder = sqlite3.connect(pool.path, isolation_level=None, check_same_thread=False)
+    holder.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.15, holder.rollback).start()
+
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO t (v) VALUES ('after wait')")
+    holder.close()
+    assert pool.stats()["lock_retries"] >= 1
+    assert pool.stats()["lock_failures"] == 0
+
+
+def test_a_broken_connection_is_discarded(pool):
+    with pool.connection() as conn:
+        pass
+    pool._checkout()
+    pool._checkin(conn, broken=True)
+    assert pool.stats()["open"] == 0
+    with pool.connection() as fresh:
+        assert fresh is not conn
+
+
+
+def test_database_pool_stats_is_the_per_path_view():
+    from backend import database
+
+    database.get_history("nobody", limit=1)
+    stats = database.pool_stats()
+    assert database.pool_stats is db_pool.pool_stats
+    assert stats[db_pool.get_pool().path]["open"] >= 1
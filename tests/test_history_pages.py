@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.database import _insert_history_rows, get_history, get_history_usernames, next_history_cursor
+from backend.history_archive import archive_history
+
+NOW = datetime(2030, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def history(user):
+    """400 days of events for one user, two per day, plus a same-second tie."""
+    rows = []
+    for day in range(400):
+        for hour, kind in ((9, "Symptom Check"), (18, "Mood Check")):
+            ts = NOW - timedelta(days=day, hours=hour)
+            rows.append((user, kind, f"day {day} {kind}", ts.strftime("%Y-%m-%d %H:%M:%S")))
+    rows.append((user, "Mood Check", "tie", rows[0][3]))
+    _insert_history_rows(rows)
+    return user
+
+
+def all_pages(user, limit, **filters):
+    out, cursor = [], None
+    while True:
+        page = get_history(user, limit=limit, before=cursor, **filters)
+        out.extend(page)
+        cursor = next_history_cursor(page, limit)
+        if cursor is None:
+            return out
+
+
+def keys(rows):
+    return [(r["timestamp"], r["id"]) for r in rows]
+
+
+def test_keyset_pages_cover_every_row_once_newest_first(history):
+    rows = all_pages(history, 37)
+    assert len(rows) == 801
+    assert keys(rows) == sorted(keys(rows), reverse=True)
+    assert len(set(keys(rows))) == 801
+    assert keys(rows) == keys(get_history(history))
+
+
+def test_filters_and_date_range(history):
+    start, end = (NOW - timedelta(days=30)).date(), NOW.date()
+    rows = get_history(history, event_type="Mood Check", start=start, end=end)
+    assert rows and all(r["event_type"] == "Mood Check" for r in rows)
+    assert all(str(start) <= r["timestamp"][:10] <= str(end) for r in rows)
+
+
+def test_archived_rows_merge_into_the_same_pages(history):
+    before = {
+        "all": all_pages(history, 50),
+        "mood": all_pages(history, 25, event_type="Mood Check"),
+        "range": get_history(history, start=(NOW - timedelta(days=300)).date(), end=(NOW - timedelta(days=100)).date()),
+    }
+    stats = archive_history(older_than_days=180, block_rows=64, chunk=200, now=NOW)
+    assert stats["rows"] >= 2 * 219
+
+    after = {
+        "all": all_pages(history, 50),
+        "mood": all_pages(history, 25, event_type="Mood Check"),
+        "range": get_history(history, start=(NOW - timedelta(days=300)).date(), end=(NOW - timedelta(days=100)).date()),
+    }
+    for name in before:
+        assert keys(after[name]) == keys(before[name]), name
+    assert [r["content"] for r in after["all"]] == [r["content"] for r in before["all"]]
+    assert history in get_history_usernames()
@@ -0,0 +1,80 @@
+# tests/test_history_search.py — full-text search over history (live rows and archive)
+from datetime import datetime
+
+import pytest
+
+from backend.database import _insert_history_rows, get_transaction, search_history
+from backend.history_archive import archive_history
+
+NOW = datetime(2030, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def notes(user):
+    _insert_history_rows([
+        (user, "Symptom Check", "Coughing badly since Monday", "2030-05-01 09:00:00"),
+        (user, "Symptom Check", "Chest pain after climbing stairs", "2030-05-02 09:00:00"),
+        (user, "Mood Check", "Pain, pain and more pain — chest feels tight", "2030-05-03 09:00:00"),
+        (user, "Symptom Check", "Headache and fever", "2030-05-04 09:00:00"),
+        (user + "x", "Symptom Check", "Chest pain too, but another user", "2030-05-05 09:00:00"),
+    ])
+    return user
+
+
+def contents(rows):
+    return [r["snippet"] for r in rows]
+
+
+def test_every_word_must_match(notes):
+    assert contents(search_history(notes, "chest pain", order="recent")) == [
+        "[Pain], [pain] and more [pain] — [chest] feels tight",
+        "[Chest] [pain] after climbing stairs",
+    ]
+    assert search_history(notes, "chest fever") == []
+
+
+def test_best_match_first(notes):
+    rows = search_history(notes, "pain")
+    assert [r["timestamp"] for r in rows] == ["2030-05-03 09:00:00", "2030-05-02 09:00:00"]
+    assert rows[0]["score"] < rows[1]["score"]
+
+
+def test_stemmed_and_case_insensitive(notes):
+    assert [r["timestamp"] for r in search_history(notes, "COUGH")] == ["2030-05-01 09:00:00"]
+    assert [r["timestamp"] for r in search_history(notes, "climb")] == ["2030-05-02 09:00:00"]
+
+
+@pytest.mark.parametrize("query", ["chest pain?", '"chest" pain:', "chest* (pain", "pain -"])
+def test_free_text_is_safe(notes, query):
+    assert len(search_history(notes, query)) == 2
+
+
+def test_only_the_callers_rows(notes):
+    assert all(r["username"] == notes for r in search_history(notes, "chest"))
+    assert [r["username"] for r in search_history(notes + "x", "chest")] == [notes + "x"]
+
+
+def test_empty_query_and_custom_marks(notes):
+    assert search_history(notes, "  ?! ") == []
+    assert contents(search_history(notes, "headache", marks=("<b>", "</b>"))) == ["<b>Headache</b> and fever"]
+
+
+def test_edits_and_deletes_keep_the_index_in_sync(notes):
+    with get_transaction() as conn:
+        conn.execute("UPDATE history SET content = 'Dry throat' WHERE username = ? AND content LIKE 'Coughing%'", (notes,))
+        conn.execute("DELETE FROM history WHERE username = ? AND content LIKE 'Headache%'", (notes,))
+    assert search_history(notes, "cough") == []
+    assert search_history(notes, "headache") == []
+    assert contents(search_history(notes, "throat")) == ["Dry [throat]"]
+
+
+def test_archived_rows_are_found_once(user):
+    _insert_history_rows([
+        (user, "Symptom Check", "old rash on arm", "2020-01-01 09:00:00"),
+        (user, "Symptom Check", "new rash on leg", "2030-05-30 09:00:00"),
+    ])
+    archive_history(older_than_days=180, now=NOW)
+    rows = search_history(user, "rash", order="recent")
+    assert [r["timestamp"] for r in rows] == ["2030-05-30 09:00:00", "2020-01-01 09:00:00"]
+    assert rows[1]["score"] is None     # from the archive scan
+    assert search_history(user, "rash", include_archive=False)[0]["timestamp"] == "2030-05-30 09:00:00"
@@ -0,0 +1,82 @@
+# tests/test_image_pipeline.py — bounded-memory decode, features and labels
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, JpegImagePlugin
+
+from backend import image_pipeline as ip
+
+
+def encode(img, fmt, **kw):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **kw)
+    return buf.getvalue()
+
+
+def photo(size):
+    # smooth gradients plus a bright centre: something for every feature
+    w, h = size
+    x = np.linspace(0, 1, w, dtype=np.float32)[None, :]
+    y = np.linspace(0, 1, h, dtype=np.float32)[:, None]
+    rgb = np.stack([x * np.ones_like(y), y * np.ones_like(x), (x + y) / 2], axis=-1)
+    rgb[h // 3: 2 * h // 3, w // 3: 2 * w // 3] = 0.9
+    return Image.fromarray((rgb * 255).astype(np.uint8))
+
+
+@pytest.fixture
+def decoded_sizes(monkeypatch):
+    """Pixel size each JPEG is decoded at, recorded as draft() picks the DCT scale."""
+    sizes = []
+    draft = JpegImagePlugin.JpegImageFile.draft
+
+    def recording_draft(self, mode, size):
+        result = draft(self, mode, size)
+        sizes.append(self.size)
+        return result
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", recording_draft)
+    return sizes
+
+
+def test_large_jpeg_is_decoded_in_draft_mode(decoded_sizes):
+    data = encode(photo((4000, 3000)), "JPEG", quality=85)
+    arr = ip.load_image(data)
+
+    assert arr.shape == (ip.IMAGE_SIZE, ip.IMAGE_SIZE, 3) and arr.dtype == np.float32
+    assert 0.0 <= arr.min() and arr.max() <= 1.0
+    assert decoded_sizes == [(500, 375)]     # 1/8 scale: full resolution never decoded
+
+
+@pytest.mark.parametrize("fmt, mode", [("PNG", "RGB"), ("PNG", "L"), ("GIF", "P"), ("BMP", "RGB")])
+def test_other_formats_decode_to_the_same_shape(fmt, mode, decoded_sizes):
+    data = encode(photo((1200, 900)).convert(mode), fmt)
+    arr = ip.load_image(io.BytesIO(data))
+    assert arr.shape == (ip.IMAGE_SIZE, ip.IMAGE_SIZE, 3) and arr.dtype == np.float32
+    assert decoded_sizes == []
+
+
+def test_file_objects_are_read_from_the_start():
+    f = io.BytesIO(encode(photo((300, 200)), "PNG"))
+    f.read()
+    np.testing.assert_array_equal(ip.load_image(f), ip.load_image(f.getvalue()))
+
+
+def test_same_image_gets_the_same_scan_label():
+    data = encode(photo((800, 600)), "JPEG")
+    first = ip.describe_scan(ip.extract_features(ip.load_image(data))[0])
+    again = ip.describe_scan(ip.extract_features(ip.load_image(io.BytesIO(data)))[0])
+    assert first == again
+    assert first[0] in {"Healthy", "Pneumonia", "Asthma", "Normal"} and 0.55 <= first[1] <= 0.97
+
+
+def test_batch_features_match_single_images():
+    images = [photo((320, 240)), photo((240, 320)).convert("L"), Image.new("RGB", (64, 64), (200, 30, 30))]
+    files = [encode(img, "PNG") for img in images]
+    batch = ip.extract_features(ip.load_batch(files))
+    single = [ip.extract_features(ip.load_image(f))[0] for f in files]
+    for b, s in zip(batch, single):
+        assert b.keys() == s.keys()
+        for name in b:
+            np.testing.assert_allclose(b[name], s[name], rtol=1e-5, atol=1e-6)
+    assert [ip.describe_scan(f) for f in batch] == [ip.describe_scan(f) for f in single]
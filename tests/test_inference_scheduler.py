@@ -0,0 +1,123 @@
+# tests/test_inference_scheduler.py — micro-batching, per-item errors and deadlines
+import io
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+from PIL import Image
+
+from backend.inference_scheduler import (
+    TEXT_UNAVAILABLE, UNREADABLE_IMAGE, MicroBatcher, MultimodalScheduler,
+)
+
+
+class Recorder:
+    """batch_fn that doubles each item and records the batches it was given."""
+
+    def __init__(self, fn=lambda x: x * 2):
+        self.fn = fn
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        return [self.fn(x) for x in items]
+
+
+def submit_all(batcher, items):
+    return [batcher.submit(x) for x in items]
+
+
+def test_requests_arriving_together_share_a_batch():
+    step = Recorder()
+    batcher = MicroBatcher(step, max_batch_size=16, max_wait_ms=200)
+    futures = submit_all(batcher, range(5))
+    assert [f.result(5) for f in futures] == [0, 2, 4, 6, 8]
+    assert step.batches == [[0, 1, 2, 3, 4]]
+    assert batcher.stats()["max_batch"] == 5
+
+
+def test_batches_are_capped_and_results_go_to_their_callers():
+    step = Recorder()
+    batcher = MicroBatcher(step, max_batch_size=4, max_wait_ms=50)
+    futures = submit_all(batcher, range(30))
+    assert [f.result(5) for f in futures] == [x * 2 for x in range(30)]
+    assert all(len(b) <= 4 for b in step.batches)
+    assert [x for b in step.batches for x in b] == list(range(30))
+
+
+def test_a_bad_item_fails_only_its_own_caller():
+    def fn(x):
+        if x == 3:
+            raise ValueError("bad item")
+        return x * 2
+
+    step = Recorder(fn)
+    batcher = MicroBatcher(step, max_batch_size=16, max_wait_ms=200)
+    futures = submit_all(batcher, range(6))
+    with pytest.raises(ValueError, match="bad item"):
+        futures[3].result(5)
+    assert [f.result(5) for i, f in enumerate(futures) if i != 3] == [0, 2, 4, 8, 10]
+    assert batcher.stats()["errors"] == 2     # the batch, then the item on its own
+
+
+def test_missing_results_fail_the_callers_instead_of_hanging():
+    batcher = MicroBatcher(lambda items: [1] * (len(items) - 1), max_batch_size=16, max_wait_ms=200)
+    futures = submit_all(batcher, range(3))
+    for f in futures:
+        with pytest.raises(RuntimeError, match="results for"):
+            f.result(5)
+
+
+def test_a_slow_step_times_out_for_the_caller_and_the_worker_carries_on():
+    release = threading.Event()
+
+    def slow(items):
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(slow, max_wait_ms=1)
+    future = batcher.submit("x")
+    with pytest.raises(TimeoutError):
+        future.result(0.05)
+    release.set()
+    assert future.result(5) == "x"
+    assert batcher.submit("y").result(5) == "y"
+
+
+# -----------------------------
+# MultimodalScheduler.run: fallbacks instead of failed requests
+# -----------------------------
+def png_bytes():
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (120, 120, 120)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def test_run_falls_back_when_a_branch_fails_or_is_late():
+    scheduler = MultimodalScheduler(max_wait_ms=1)
+    release = threading.Event()
+
+    def stuck(items):
+        release.wait(5)
+        return [("late", 1.0)] * len(items)
+
+    def broken(arrays):
+        raise RuntimeError("model crashed")
+
+    scheduler.text = MicroBatcher(stuck, max_wait_ms=1)
+    scheduler.image = MicroBatcher(broken, max_wait_ms=1)
+
+    started = time.monotonic()
+    result = scheduler.run(png_bytes(), "chest pain", timeout=0.2)
+    release.set()
+
+    assert time.monotonic() - started < 2
+    assert (result["text_diagnosis"], result["text_confidence"]) == TEXT_UNAVAILABLE
+    assert (result["medical_label"], result["medical_confidence"]) == UNREADABLE_IMAGE
+
+
+def test_run_with_both_branches_working():
+    result = MultimodalScheduler(max_wait_ms=1).run(png_bytes(), "chest pain")
+    assert result["medical_label"] != UNREADABLE_IMAGE[0]
+    assert result["text_diagnosis"] != TEXT_UNAVAILABLE[0]
@@ -0,0 +1,71 @@
+import random
+
+from backend.keyword_matcher import KeywordMatcher
+
+
+def naive_first(groups, text):
+    for i, words in enumerate(groups):
+        if any(w and w in text for w in words):
+            return i
+    return None
+
+
+def test_first_match_prefers_the_earliest_group():
+    m = KeywordMatcher([["chest pain"], ["pain"], ["fever"]])
+    assert m.first_match("sharp chest pain since morning") == 0
+    assert m.first_match("back pain and fever") == 1
+    assert m.first_match("mild fever") == 2
+    assert m.first_match("nothing to report") is None
+
+
+def test_overlapping_keywords_and_suffixes():
+    # "she" ends inside "ushers"; "hers" overlaps it; the fail links must
+    # report both
+    m = KeywordMatcher([["hers"], ["she"], ["his"], ["he"]])
+    assert m.matches("ushers") == {0, 1, 3}
+    assert m.first_match("ushers") == 0
+    assert m.first_match("ush") is None
+
+
+def test_punctuation_is_matched_literally():
+    m = KeywordMatcher([["don't understand"], ["understand"]])
+    assert m.first_match("i don't understand this") == 0
+    assert m.first_match("i don t understand this") == 1
+
+
+def test_empty_keywords_are_ignored():
+    m = KeywordMatcher([[""], ["a"]])
+    assert m.first_match("xyz") is None
+    assert m.first_match("cat") == 1
+
+
+def test_agrees_with_substring_matching():
+    rng = random.Random(7)
+    alphabet = "abc "
+    groups = [[
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+        for _ in range(rng.randint(1, 3))
+    ] for _ in range(12)]
+    m = KeywordMatcher(groups)
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        assert m.first_match(text) == naive_first(groups, text)
+        assert m.matches(text) == {i for i, ws in enumerate(groups) if any(w in text for w in ws)}
+
+
+def test_rule_set_answers_through_the_matcher():
+    from backend.ai_model import RuleSet
+
+    rules = RuleSet({
+        "empty": "say something",
+        "rules": [
+            {"keywords": ["chest pain"], "response": "cardiac"},
+            {"keywords": ["pain", "ache"], "response": "pain"},
+        ],
+        "fallback": ["a", "b"],
+    })
+    assert rules.respond("chest pain and headache") == "cardiac"
+    assert rules.respond("a dull ache") == "pain"
+    assert rules.respond("") == "say something"
+    assert rules.respond("zzzz") in ("a", "b")
+    assert rules.respond("zzzz", seed=1) == rules.respond("zzzz", seed=1)
@@ -0,0 +1,149 @@
+# tests/test_migrations.py — online table rebuilds and the background full-text backfill
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from backend import database, migrations
+from backend.db_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    p = ConnectionPool(str(tmp_path / "old.db"))
+    yield p
+    p.close_all()
+
+
+def rows(pool, sql):
+    with pool.connection() as conn:
+        return [tuple(r) for r in conn.execute(sql)]
+
+
+# -----------------------------
+# MIGRATION 9: appointments rebuilt with start_ts NOT NULL
+# -----------------------------
+def test_rebuild_migration_keeps_every_row(pool):
+    migrations.migrate(pool, target=8)
+    with pool.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO appointments (name, date, time, notes, created_at, start_ts, duration_min) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                ("Ann", "2025-03-01", "09:00", "a", "2025-01-01 00:00:00", 1740819600, 30),
+                ("Bob", "2025-03-01", "10:00", "", "2025-01-01 00:00:00", None, 45),       # written by old code
+                ("Cy", "someday", "later", "", "2025-01-01 00:00:00", None, 30),          # unparseable
+                ("Dee", "2025-03-02", "09:00", "", "2025-01-01 00:00:00", 1740906000, 30),
+            ],
+        )
+        conn.execute("DELETE FROM appointments WHERE name = 'Dee'")    # highest id, deleted
+    before = rows(pool, "SELECT id, name, date, time, notes, created_at, duration_min FROM appointments ORDER BY id")
+
+    assert migrations.migrate(pool) == [9]
+
+    assert rows(pool, "SELECT id, name, date, time, notes, created_at, duration_min FROM appointments ORDER BY id") == before
+    assert rows(pool, "SELECT name, start_ts FROM appointments ORDER BY id") == [
+        ("Ann", 1740819600), ("Bob", 1740823200), ("Cy", 0)
+    ]
+    with pool.connection() as conn:
+        notnull = {r["name"]: r["notnull"] for r in conn.execute("PRAGMA table_info(appointments)")}
+        assert notnull["start_ts"] == 1
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_appointments_start'").fetchone()
+        assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name LIKE 'appointments__new%'").fetchone()
+    with pool.transaction() as conn:
+        new_id = conn.execute(
+            "INSERT INTO appointments (name, date, time, start_ts) VALUES ('Eve', '2025-03-03', '09:00', 1)"
+        ).lastrowid
+    assert new_id == 5      # the deleted id 4 is not reused
+
+
+# -----------------------------
+# rebuild_table
+# -----------------------------
+class WritesDuringCopy(ConnectionPool):
+    """Runs `writes` on the old table in the transaction before the second copied chunk."""
+
+    def __init__(self, path, writes):
+        super().__init__(path)
+        self.writes = writes
+        self.calls = 0
+
+    @contextmanager
+    def transaction(self):
+        with super().transaction() as conn:
+            self.calls += 1
+            if self.calls == 3:     # 1 = new table and triggers, 2 = first chunk
+                for sql in self.writes:
+                    conn.execute(sql)
+            yield conn
+
+
+NEW_ITEMS = "CREATE TABLE IF NOT EXISTS items__new (id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT NOT NULL)"
+
+
+def make_items(path, n):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT)")
+    conn.executemany("INSERT INTO items (label) VALUES (?)", [(f"item {i}",) for i in range(1, n + 1)])
+    conn.commit()
+    conn.close()
+
+
+def test_writes_during_the_copy_land_in_the_new_table(tmp_path):
+    path = str(tmp_path / "items.db")
+    make_items(path, 6)
+    pool = WritesDuringCopy(path, [
+        "UPDATE items SET label = 'changed' WHERE id = 1",          # already copied
+        "UPDATE items SET label = 'changed late' WHERE id = 5",     # not copied yet
+        "DELETE FROM items WHERE id = 2",                           # already copied
+        "DELETE FROM items WHERE id = 4",                           # not copied yet
+        "INSERT INTO items (label) VALUES ('new')",
+    ])
+    expected_after_writes = [(1, "changed"), (3, "item 3"), (5, "changed late"), (6, "item 6"), (7, "new")]
+
+    migrations.rebuild_table(pool, "items", NEW_ITEMS, ["id", "label"], chunk=2)
+
+    assert rows(pool, "SELECT id, label FROM items ORDER BY id") == expected_after_writes
+    assert rows(pool, "SELECT name FROM sqlite_master WHERE type = 'trigger'") == []
+    pool.close_all()
+
+
+def test_rows_that_break_the_new_definition_fail_the_rebuild(tmp_path):
+    path = str(tmp_path / "items.db")
+    make_items(path, 3)
+    pool = ConnectionPool(path)
+    with pool.transaction() as conn:
+        conn.execute("UPDATE items SET label = NULL WHERE id = 2")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        migrations.rebuild_table(pool, "items", NEW_ITEMS, ["id", "label"], chunk=2)
+    assert rows(pool, "SELECT id, label FROM items ORDER BY id") == [(1, "item 1"), (2, None), (3, "item 3")]
+    pool.close_all()
+
+
+# -----------------------------
+# Full-text index: backfilled in the background, searchable meanwhile
+# -----------------------------
+def test_fts_backfill_runs_after_migrate_and_search_covers_the_gap(pool, monkeypatch, user):
+    migrations.migrate(pool, target=6)
+    with pool.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO history (username, event_type, content, timestamp) VALUES (?, ?, ?, ?)",
+            [(user, "Note", "chest pain at night", "2025-01-01 10:00:00"),
+             (user, "Note", "headache", "2025-01-02 10:00:00")],
+        )
+
+    migrations.migrate(pool)
+    assert rows(pool, "SELECT last_id FROM history_fts_state") == [(0,)]     # not done during migrate
+    assert migrations.pending_background(pool) == ["index existing history for full-text search"]
+
+    monkeypatch.setattr(database, "get_connection", pool.connection)
+    monkeypatch.setattr(database, "get_transaction", pool.transaction)
+    database.add_history(user, "Note", "pain in my arm")    # indexed by the trigger
+    found = database.search_history(user, "pain", include_archive=False)
+    assert [r["snippet"] for r in found] == ["[pain] in my arm", "chest [pain] at night"]
+    assert found[1]["score"] is None    # from the scan of rows not indexed yet
+
+    migrations.start_background(pool).join(30)
+    assert migrations.pending_background(pool) == []
+    found = database.search_history(user, "pain", include_archive=False)
+    assert len(found) == 2 and all(r["score"] is not None for r in found)
@@ -0,0 +1,71 @@
+# tests/test_mood_model.py — snapshots published by several processes stay consistent
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend import mood_model
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UPDATER = """
+import sys, time
+from backend import mood_model as m
+m.MODEL_DIR = sys.argv[1]
+m.CURRENT_PATH = m.os.path.join(m.MODEL_DIR, "CURRENT")
+m.LOCK_PATH = m.os.path.join(m.MODEL_DIR, "LOCK")
+target = int(sys.argv[2])
+learned = 0
+deadline = time.monotonic() + 60
+while m.refresh()["last_history_id"] < target and time.monotonic() < deadline:
+    learned += m.update_from_history(batch_size=4, max_batches=1)
+print(learned)
+"""
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(mood_model, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(mood_model, "CURRENT_PATH", str(tmp_path / "CURRENT"))
+    monkeypatch.setattr(mood_model, "LOCK_PATH", str(tmp_path / "LOCK"))
+    monkeypatch.setattr(mood_model, "_current", None)
+    monkeypatch.setattr(mood_model, "_current_file", None)
+    return tmp_path
+
+
+def label_rows(user, n):
+    status = mood_model.get_model()["classes"][0]
+    for i in range(n):
+        mood_model.record_mood_label(user, f"felt like this {i}", status)
+    from backend.database import get_history_since
+    rows = get_history_since(mood_model.LABEL_EVENT, 0, 100000)
+    return len(rows), rows[-1]["id"]
+
+
+def test_update_skips_while_another_publisher_holds_the_lock(model_dir, user):
+    label_rows(user, 3)
+    version = mood_model.get_model()["version"]
+    with mood_model.publish_lock():
+        assert mood_model.update_from_history() == 0
+    assert mood_model.get_model()["version"] == version
+    assert mood_model.update_from_history() == 3
+
+
+def test_concurrent_updaters_never_learn_a_row_twice(model_dir, user):
+    seeded = mood_model.get_model()
+    total, last_id = label_rows(user, 40)
+
+    procs = [
+        subprocess.Popen([sys.executable, "-c", UPDATER, str(model_dir), str(last_id)],
+                         cwd=ROOT, env=dict(os.environ), stdout=subprocess.PIPE, text=True)
+        for _ in range(2)
+    ]
+    learned = [int(p.communicate(timeout=120)[0]) for p in procs]
+
+    final = mood_model.refresh()
+    assert final["last_history_id"] == last_id
+    assert sum(learned) == total
+    # one version per batch of 4, each built on the one before
+    assert final["version"] == seeded["version"] + -(-total // 4)
+    assert not [f for f in os.listdir(model_dir) if f.endswith(".tmp")]
@@ -0,0 +1,42 @@
+# tests/test_pdf_bulk.py — bulk PDF rendering skips bad records and writes the zip atomically
+import os
+import zipfile
+
+import pytest
+
+from backend.pdf_module import generate_pdfs_bulk
+
+RECORDS = [("alice", "fine"), ("bob",), ("carol", "also fine")]     # bob is missing his text
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bad_record_is_skipped_and_reported(tmp_path, workers):
+    out = str(tmp_path / "reports.zip")
+    stats = generate_pdfs_bulk(RECORDS, out, workers=workers)
+
+    assert (stats["documents"], stats["failed"]) == (2, 1)
+    assert [(e["index"], e["patient"]) for e in stats["errors"]] == [(1, "bob")]
+    with zipfile.ZipFile(out) as zf:
+        assert zf.namelist() == ["000000_alice.pdf", "000002_carol.pdf"]
+    assert os.listdir(tmp_path) == ["reports.zip"]
+
+
+def test_failed_run_leaves_the_old_zip(tmp_path):
+    out = str(tmp_path / "reports.zip")
+    generate_pdfs_bulk(RECORDS[:1], out, workers=1)
+    before = open(out, "rb").read()
+
+    def records():
+        yield ("dave", "text")
+        raise RuntimeError("history query failed")
+
+    with pytest.raises(RuntimeError):
+        generate_pdfs_bulk(records(), out, workers=1)
+    assert open(out, "rb").read() == before
+    assert os.listdir(tmp_path) == ["reports.zip"]
+
+
+def test_directory_output(tmp_path):
+    stats = generate_pdfs_bulk(RECORDS, str(tmp_path / "out"), workers=1)
+    assert stats["documents"] == 2
+    assert sorted(os.listdir(tmp_path / "out")) == ["000000_alice.pdf", "000002_carol.pdf"]
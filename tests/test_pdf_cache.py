@@ -0,0 +1,82 @@
+# tests/test_pdf_cache.py — memory and disk tiers of the generated-PDF cache
+import os
+
+from backend.pdf_cache import PdfCache, make_key
+
+
+def keys(n):
+    return [make_key("test", 1, i) for i in range(n)]
+
+
+def disk_keys(cache):
+    return {os.path.basename(path)[:-4] for path, _, _ in cache._disk_files()}
+
+
+def test_memory_tier_stays_within_its_budget(tmp_path):
+    cache = PdfCache(str(tmp_path), memory_bytes=1000, disk_bytes=0)
+    k = keys(6)
+    for key in k[:3]:
+        cache.put(key, b"x" * 300)
+    cache.get(k[0])                     # k[0] is now the most recent
+    cache.put(k[3], b"x" * 300)         # evicts k[1], the least recent
+    cache.put(k[4], b"x" * 2000)        # larger than the whole tier: not kept
+
+    stats = cache.stats()
+    assert stats["memory_bytes"] == 900 <= 1000
+    assert stats["memory_entries"] == 3 and stats["memory_evictions"] == 1
+    assert cache.get(k[1]) is None and cache.get(k[4]) is None
+    assert cache.get(k[0]) == b"x" * 300
+
+
+def test_disk_tier_evicts_least_recently_used_down_to_90_percent(tmp_path):
+    cache = PdfCache(str(tmp_path), memory_bytes=0, disk_bytes=1000)
+    k = keys(11)
+    for i, key in enumerate(k[:10]):
+        cache.put(key, b"x" * 100)
+        os.utime(cache._path(key), (1_000_000 + i, 1_000_000 + i))     # k[0] oldest
+    assert cache.get(k[0]) == b"x" * 100     # a disk hit refreshes its mtime
+
+    cache.put(k[10], b"x" * 100)            # 1100 bytes > 1000: trim to 900
+
+    assert disk_keys(cache) == set(k) - {k[1], k[2]}
+    assert cache.stats()["disk_bytes"] == 900
+    assert cache.stats()["disk_evictions"] == 2
+
+
+def test_disk_hit_is_promoted_into_memory(tmp_path):
+    key = keys(1)[0]
+    PdfCache(str(tmp_path)).put(key, b"%PDF-1.4 cached")
+
+    cache = PdfCache(str(tmp_path))     # a new process: empty memory tier
+    assert cache.get(key) == b"%PDF-1.4 cached"
+    os.remove(cache._path(key))
+    assert cache.get(key) == b"%PDF-1.4 cached"    # served from memory now
+
+    stats = cache.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+    assert stats["memory_entries"] == 1
+
+
+def test_hit_and_miss_counters(tmp_path):
+    cache = PdfCache(str(tmp_path))
+    renders = []
+
+    def render():
+        renders.append(1)
+        return b"%PDF-1.4 new"
+
+    key = make_key("prescription", 1, "Ann", ["fever"])
+    assert cache.get_or_create(key, render) == b"%PDF-1.4 new"
+    assert cache.get_or_create(key, render) == b"%PDF-1.4 new"
+    assert cache.get(make_key("prescription", 1, "Bob", ["fever"])) is None
+
+    stats = cache.stats()
+    assert renders == [1]
+    assert (stats["misses"], stats["memory_hits"], stats["disk_hits"]) == (2, 1, 0)
+    assert stats["hit_ratio"] == round(1 / 3, 3)
+
+
+def test_keys_ignore_line_ending_and_edge_whitespace_only():
+    assert make_key("pdf", 1, " a\r\nb ") == make_key("pdf", 1, "a\nb")
+    assert make_key("pdf", 1, "a b") != make_key("pdf", 1, "a  b")
+    assert make_key("pdf", 1, "a") != make_key("pdf", 2, "a")
@@ -0,0 +1,73 @@
+# tests/test_pdf_extract.py — page extraction through the shared pool, and the deadline
+import io
+import multiprocessing
+import time
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from backend import pdf_extract
+
+
+def make_pdf(pages):
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for i in range(pages):
+        c.drawString(72, 720, f"page {i + 1} fever")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def stuck_range(path, start, end):
+    time.sleep(60)      # a page the parser never finishes
+
+
+@pytest.mark.parametrize("pages, workers", [(3, 1), (20, 2), (20, 0)])
+def test_pages_come_back_in_order(pages, workers):
+    result = pdf_extract.extract_pages(make_pdf(pages), workers=workers)
+    assert [n for n, _ in result.pages] == list(range(1, pages + 1))
+    assert all(f"page {n} fever" in text for n, text in result.pages)
+    assert (result.page_count, result.truncated, result.timed_out) == (pages, False, False)
+
+
+def test_page_limit():
+    result = pdf_extract.extract_pages(make_pdf(20), max_pages=5)
+    assert len(result.pages) == 5 and result.truncated
+
+
+def test_one_pool_is_shared_by_uploads():
+    pdf_extract.extract_pages(make_pdf(2))
+    pool = pdf_extract._get_pool()
+    pdf_extract.extract_pages(make_pdf(2))
+    assert pdf_extract._get_pool() is pool
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="workers must inherit the patched function")
+def test_deadline_kills_a_stuck_worker(monkeypatch):
+    pdf_extract._kill_pool(pdf_extract._get_pool())     # fresh workers see the patch
+    monkeypatch.setattr(pdf_extract, "_extract_range", stuck_range)
+    pool = pdf_extract._get_pool()
+    workers = []
+    kill = pdf_extract._kill_pool
+
+    def watch_kill(p):
+        workers.extend(p._processes.values())
+        kill(p)
+
+    monkeypatch.setattr(pdf_extract, "_kill_pool", watch_kill)
+
+    started = time.monotonic()
+    result = pdf_extract.extract_pages(make_pdf(3), timeout=1)
+
+    assert result.timed_out and result.pages == []
+    assert time.monotonic() - started < 5
+    assert workers
+    for process in workers:
+        process.join(5)
+        assert not process.is_alive()
+    assert pdf_extract._get_pool() is not pool
+
+    monkeypatch.undo()
+    assert len(pdf_extract.extract_pages(make_pdf(3)).pages) == 3   # a fresh pool serves the next upload
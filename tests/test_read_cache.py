@@ -0,0 +1,65 @@
+# tests/test_read_cache.py — read cache hits, and invalidation by writes from any process
+import os
+import subprocess
+import sys
+
+from backend import read_cache
+from backend.appointments import get_appointments
+from backend.database import add_history, get_history
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_elsewhere(code):
+    """Run backend code in a separate Python process on the same database."""
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=dict(os.environ), check=True, timeout=60)
+
+
+def test_repeat_read_is_a_hit_and_a_write_invalidates(user):
+    add_history(user, "Note", "one")
+    first = get_history(user, limit=10)
+    assert get_history(user, limit=10) is first
+
+    add_history(user, "Note", "two")
+    assert [r["content"] for r in get_history(user, limit=10)] == ["two", "one"]
+
+
+def test_write_from_another_process_invalidates(user):
+    add_history(user, "Note", "here")
+    assert len(get_history(user, limit=10)) == 1
+    day = "2031-03-04"
+    before = get_appointments(day, day)
+
+    run_elsewhere(
+        "from backend.database import add_history\n"
+        "from backend.appointments import save_appointment\n"
+        f"add_history({user!r}, 'Note', 'there')\n"
+        f"save_appointment({user!r}, {day!r}, '09:00', '')\n"
+    )
+
+    assert [r["content"] for r in get_history(user, limit=10)] == ["there", "here"]
+    assert [r["name"] for r in get_appointments(day, day)] == [r["name"] for r in before] + [user]
+
+
+class Rows(list):
+    def __eq__(self, other):
+        raise AssertionError("rows compared on lookup")
+
+    __hash__ = None
+
+
+def test_cached_frame_is_keyed_by_identity_without_comparing_rows():
+    built = []
+
+    def build(rows):
+        built.append(rows)
+        return object()
+
+    rows = Rows({"id": i} for i in range(100))
+    frame = read_cache.cached_frame(rows, build)
+    assert read_cache.cached_frame(rows, build) is frame
+    assert len(built) == 1
+
+    # equal contents in a new list are fresh rows: a new frame
+    assert read_cache.cached_frame(Rows(rows), build) is not frame
+    assert len(built) == 2
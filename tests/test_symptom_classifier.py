@@ -0,0 +1,82 @@
+# tests/test_symptom_classifier.py — hand-rolled query scoring and the pickled model
+import random
+import shutil
+
+import numpy as np
+import pytest
+
+from backend import symptom_classifier as sc
+
+
+@pytest.fixture(scope="module")
+def model():
+    return sc.fit(*sc.read_dataset())
+
+
+def reference_scores(model, text):
+    """What sklearn computes: the TF-IDF query vector times the centroid matrix."""
+    return (model["vectorizer"].transform([text.lower()]) @ model["centroids_t"]).toarray()[0]
+
+
+def queries():
+    texts, _ = sc.read_dataset()
+    words = sorted({w for t in texts for w in t.split()})
+    rng = random.Random(5)
+    out = texts[:10] + ["Fever fever FEVER and cough", "persistent dry-cough at night"]
+    out += [" ".join(rng.sample(words, rng.randint(1, 6))) for _ in range(200)]
+    return out
+
+
+def test_scores_match_sklearn(model):
+    for text in queries():
+        ours = sc._query_scores(model, text)
+        expected = reference_scores(model, text)
+        if ours is None:
+            assert not expected.any()
+        else:
+            np.testing.assert_allclose(ours, expected, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize("k", [1, 3, 5])
+def test_top_k_labels_and_scores_match_sklearn(model, k):
+    labels = model["labels"]
+    for text in queries():
+        result = sc.classify_symptoms(text, k=k, model=model)
+        expected = reference_scores(model, text)
+        order = [i for i in np.argsort(-expected, kind="stable")[:k] if expected[i] > 0]
+        if not order:
+            assert result == {"diagnosis": None, "confidence": 0.0, "alternatives": []}
+            continue
+        got = [(result["diagnosis"], result["confidence"])] + result["alternatives"]
+        assert [s for _, s in got] == [round(float(expected[i]), 3) for i in order]
+        # ties may come out in either order; each label must carry its own score
+        assert all(round(float(expected[labels.index(name)]), 3) == s for name, s in got)
+
+
+def test_unknown_words_give_no_diagnosis(model):
+    assert sc.classify_symptoms("qqqq zzzz", model=model)["diagnosis"] is None
+
+
+def test_saved_model_is_reused_until_the_csv_changes(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "symptoms.csv")
+    out = str(tmp_path / "model.pkl")
+    shutil.copyfile(sc.CSV_PATH, csv_path)
+
+    built = sc.load(csv_path, out)
+    sc.classify_symptoms("fever", model=built)     # fills the per-process cache
+    sc.save(built, out)
+
+    fits = []
+    real_fit = sc.fit
+    monkeypatch.setattr(sc, "fit", lambda *a: fits.append(1) or real_fit(*a))
+
+    loaded = sc.load(csv_path, out)
+    assert fits == []
+    assert "_fast" not in loaded
+    assert loaded["labels"] == built["labels"]
+    assert sc.classify_symptoms("fever cough", model=loaded) == sc.classify_symptoms("fever cough", model=built)
+
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("itchy eyes sneezing,Allergy\n")
+    sc.load(csv_path, out)
+    assert fits == [1]
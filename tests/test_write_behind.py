@@ -0,0 +1,90 @@
+import threading
+
+from backend import write_behind
+from backend.write_behind import WriteBehindQueue
+
+
+def test_rows_are_flushed_in_batches():
+    flushed = []
+    q = WriteBehindQueue(flushed.append, name="test-batches", batch_size=10, flush_interval_ms=20)
+    for i in range(25):
+        assert q.put(i)
+    q.flush()
+    q.close()
+    assert [r for batch in flushed for r in batch] == list(range(25))
+    assert max(len(b) for b in flushed) <= 10
+    assert q.stats()["flushed_rows"] == 25
+
+
+def test_failing_flush_does_not_kill_the_writer(monkeypatch):
+    monkeypatch.setattr(write_behind, "FLUSH_RETRY_DELAY", 0)
+    calls = []
+
+    def flush_fn(batch):
+        calls.append(list(batch))
+        if len(calls) <= write_behind.FLUSH_RETRIES:
+            raise RuntimeError("database is locked")
+
+    q = WriteBehindQueue(flush_fn, name="test-failing", batch_size=5, flush_interval_ms=10)
+    q.put("lost")
+    done = threading.Event()
+    threading.Thread(target=lambda: (q.flush(), done.set()), daemon=True).start()
+    assert done.wait(5), "flush() hung after a failed batch"
+
+    # the writer is still alive and later batches go through
+    q.put("kept")
+    q.flush()
+    q.close()
+    assert calls[-1] == ["kept"]
+    stats = q.stats()
+    assert stats["failed_rows"] == 1
+    assert stats["flushed_rows"] == 1
+
+
+def test_close_drains_queued_rows():
+    flushed = []
+    q = WriteBehindQueue(lambda b: flushed.extend(b), name="test-close", batch_size=1000, flush_interval_ms=1000)
+    for i in range(50):
+        q.put(i)
+    q.close()
+    assert flushed == list(range(50))
+    assert q.put("late") is False
+
+
+def test_a_batch_that_keeps_failing_goes_to_the_dead_letter(monkeypatch, tmp_path):
+    monkeypatch.setattr(write_behind, "FLUSH_RETRY_DELAY", 0)
+
+    def flush_fn(batch):
+        raise RuntimeError("disk I/O error")
+
+    q = WriteBehindQueue(flush_fn, name="test-dead-letter", batch_size=10, flush_interval_ms=10,
+                         dead_letter=str(tmp_path / "dead"))
+    for i in range(3):
+        q.put(("alice", "Symptom Check", f"row {i}", "2030-01-01 00:00:00"))
+    q.close()
+    stats = q.stats()
+    assert stats["failed_rows"] == 3
+    assert stats["dead_letter_rows"] == 3
+    assert "disk I/O error" in stats["last_failure"]
+    files = list((tmp_path / "dead").glob("*.jsonl"))
+    assert len(files) == 1
+    assert len(files[0].read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_dead_letter_rows_replay_into_history(monkeypatch, tmp_path, user):
+    from backend import database
+
+    monkeypatch.setattr(write_behind, "FLUSH_RETRY_DELAY", 0)
+    monkeypatch.setattr(database, "HISTORY_DEAD_LETTER", str(tmp_path / "history"))
+
+    def broken(rows):
+        raise RuntimeError("database is locked")
+
+    q = WriteBehindQueue(broken, name="test-replay", dead_letter=database.HISTORY_DEAD_LETTER)
+    q.put((user, "Symptom Check", "kept after all", "2030-01-01 00:00:00"))
+    q.close()
+    assert database.pending_history_dead_letter() == 1
+
+    assert database.replay_history_dead_letter() == 1
+    assert database.pending_history_dead_letter() == 0
+    assert [r["content"] for r in database.get_history(user)] == ["kept after all"]